@@ -2,7 +2,7 @@ import asyncio
 from logging.config import fileConfig
 
 from alembic import context
-from sqlalchemy import pool
+from sqlalchemy import pool, text
 from sqlalchemy.ext.asyncio import async_engine_from_config
 
 from app.core.settings import get_settings
@@ -58,6 +58,8 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection):
+    # trigram indexes of the user table depend on it
+    connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
     context.configure(connection=connection, target_metadata=target_metadata)
 
     with context.begin_transaction():
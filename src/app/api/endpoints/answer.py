@@ -1,16 +1,57 @@
-from typing import Optional
+import json
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import UUID4
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_active_user, get_current_active_user_or_none
+from app.api.routing import UnitOfWorkRoute
+from app.core.settings import get_settings
 from app.db.base import get_session
+from app.db.replicas import get_read_session
 from app.models import User
-from app.schemas.survey import BaseAnswer, AnswerCreateOut, AnswerRetrieve
+from app.schemas.survey import BaseAnswer, AnswerCreateOut, AnswerRetrieve, BatchAnswerReport
 from app.services import answer as services
 
-router = APIRouter()
+settings = get_settings()
+
+router = APIRouter(route_class=UnitOfWorkRoute)
+
+
+def _check_batch_size(items: List[Any]) -> None:
+    if len(items) > settings.ANSWER_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch can't contain more than {settings.ANSWER_BATCH_MAX_SIZE} answers.",
+        )
+
+
+def _parse_ndjson_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError:
+        return line.decode("utf-8", errors="replace")
+
+
+async def _read_batch_items(request: Request) -> List[Any]:
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        items, buffer = list(), b""
+        async for chunk in request.stream():
+            *lines, buffer = (buffer + chunk).split(b"\n")
+            items.extend(_parse_ndjson_line(line) for line in lines if line.strip())
+            _check_batch_size(items)
+        if buffer.strip():
+            items.append(_parse_ndjson_line(buffer))
+    else:
+        try:
+            items = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Body must be a JSON array or NDJSON stream.")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=422, detail="Body must be a JSON array or NDJSON stream.")
+    _check_batch_size(items)
+    return items
 
 
 @router.post("/{survey_id}", status_code=201, response_model=AnswerCreateOut)
@@ -29,6 +70,23 @@ async def add_answer(
     return answer
 
 
+@router.post("/{survey_id}/batch", status_code=200, response_model=BatchAnswerReport)
+async def add_answers_batch(
+        survey_id: UUID4,
+        request: Request,
+        session: AsyncSession = Depends(get_session),
+        current_user: User = Depends(get_current_active_user)
+):
+    items = await _read_batch_items(request=request)
+    report = await services.CreateAnswerBatch(
+        session=session,
+        items=items,
+        survey_id=survey_id,
+        user=current_user,
+    ).execute()
+    return report
+
+
 @router.delete("/{answer_id}", status_code=204)
 async def delete_answer(
         answer_id: UUID4,
@@ -46,7 +104,7 @@ async def delete_answer(
 @router.get("/{answer_id}", status_code=200, response_model=AnswerRetrieve)
 async def get_answer(
         answer_id: UUID4,
-        session: AsyncSession = Depends(get_session),
+        session: AsyncSession = Depends(get_read_session),
         current_user: Optional[User] = Depends(get_current_active_user_or_none)
 ):
     answer = await services.get_answer(session=session, answer_id=answer_id, user=current_user)
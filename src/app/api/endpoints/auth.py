@@ -1,11 +1,9 @@
-from uuid import UUID
-
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import EmailStr
 from sqlalchemy.ext.asyncio import AsyncSession
-from starlette.background import BackgroundTasks
 
 from app.api.deps import get_current_active_user
+from app.api.routing import UnitOfWorkRoute
 from app.core.jwt import create_access_token
 from app.db.base import get_session
 from app.forms.auth import LoginForm
@@ -16,12 +14,12 @@ from app.schemas.user import UserRegistrationIn
 from app.services import auth as auth_services
 from app.services import user as user_services
 
-router = APIRouter()
+router = APIRouter(route_class=UnitOfWorkRoute)
 
 
 @router.post("/registration", response_model=Message)
-async def registration(new_user: UserRegistrationIn, task: BackgroundTasks, session: AsyncSession = Depends(get_session)):
-    await user_services.create_user(session=session, new_user=new_user, task=task)
+async def registration(new_user: UserRegistrationIn, session: AsyncSession = Depends(get_session)):
+    await user_services.create_user(session=session, new_user=new_user)
     return Message(message="Verification email has just been sent.")
 
 
@@ -36,15 +34,15 @@ async def access_token(
     return Token(**create_access_token(user.id))
 
 
-@router.get("/confirm-registration/{verification_id}", response_model=Message)
-async def confirm_registration(verification_id: UUID, session: AsyncSession = Depends(get_session)):
-    await auth_services.verify_registration_user(session=session, verification_id=verification_id)
+@router.get("/confirm-registration/{verification_code}", response_model=Message)
+async def confirm_registration(verification_code: str, session: AsyncSession = Depends(get_session)):
+    await auth_services.confirm_registration(session=session, verification_code=verification_code)
     return Message(message="Successfully verify email")
 
 
 @router.get("/recover-password/{email}", response_model=Message)
-async def recover_password(email: EmailStr, task: BackgroundTasks, session: AsyncSession = Depends(get_session)):
-    await auth_services.recover_password(session=session, task=task, email=email)
+async def recover_password(email: EmailStr, session: AsyncSession = Depends(get_session)):
+    await auth_services.recover_password(session=session, email=email)
     return Message(message="Recovery email has been sent.")
 
 
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+from pydantic import UUID4
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_active_user
+from app.api.routing import UnitOfWorkRoute
+from app.db.base import get_session
+from app.models import User
+from app.schemas.deletion import DeletionJobOut
+from app.services import deletion as deletion_services
+
+router = APIRouter(route_class=UnitOfWorkRoute)
+
+
+@router.get("/{job_id}", response_model=DeletionJobOut)
+async def get_deletion_job(
+        job_id: UUID4,
+        session: AsyncSession = Depends(get_session),
+        current_user: User = Depends(get_current_active_user),
+):
+    job = await deletion_services.get_deletion_job(session=session, job_id=job_id, user=current_user)
+    return job
@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import render_metrics
+
+router = APIRouter()
+
+
+class PrometheusResponse(PlainTextResponse):
+    media_type = "text/plain; version=0.0.4"
+
+
+@router.get("", response_class=PrometheusResponse)
+async def get_metrics():
+    return render_metrics()
@@ -0,0 +1,36 @@
+from typing import List
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_superuser
+from app.api.routing import UnitOfWorkRoute
+from app.db.base import get_pool_stats, get_session
+from app.db.replicas import get_replica_stats
+from app.schemas.deletion import DeletionJobOut
+from app.schemas.monitoring import CacheStats, PoolStats, ReplicaStats
+from app.services import deletion as deletion_services
+from app.services.survey import survey_cache
+from app.services.user import user_cache
+
+router = APIRouter(route_class=UnitOfWorkRoute)
+
+
+@router.get("/pool", response_model=PoolStats, dependencies=[Depends(get_superuser)])
+async def get_pool():
+    return get_pool_stats()
+
+
+@router.get("/replicas", response_model=List[ReplicaStats], dependencies=[Depends(get_superuser)])
+async def get_replicas():
+    return get_replica_stats()
+
+
+@router.get("/caches", response_model=List[CacheStats], dependencies=[Depends(get_superuser)])
+async def get_caches():
+    return [{"namespace": cache.namespace, **cache.stats()} for cache in (user_cache, survey_cache)]
+
+
+@router.get("/deletions", response_model=List[DeletionJobOut], dependencies=[Depends(get_superuser)])
+async def get_deletions(session: AsyncSession = Depends(get_session)):
+    return await deletion_services.get_unfinished_deletion_jobs(session=session)
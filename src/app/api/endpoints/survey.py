@@ -1,19 +1,49 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi_pagination import Page, paginate
 from pydantic import UUID4
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_active_user, get_current_active_user_or_none
+from app.api.responses import page_response, raw_pages, serialized_response
+from app.api.routing import UnitOfWorkRoute
+from app.core.http_cache import is_not_modified, make_etag, to_http_date
+from app.core.settings import get_settings
 from app.db.base import get_session
+from app.db.replicas import get_read_session
 from app.models import User
+from app.schemas.deletion import DeletionJobOut
+from app.schemas.pagination import CursorPage, CursorParams
 from app.schemas.survey import SurveyCreate, SurveyOut, SurveyUpdate, SurveyAttributeUpdate, \
-    SurveyFilter, SurveyRetrieve, SurveyOwnerRetrieve, SurveyAttributeRetrieve, SurveyUpdateOut
+    SurveyFilter, SurveyRetrieve, SurveyOwnerRetrieve, SurveyAttributeRetrieve, SurveyUpdateOut, SurveyResults, \
+    AnswerExportFormat, AnswerFilter, SurveyAnswerOut
+from app.services import answer as answer_services
+from app.services import result as result_services
 from app.services import survey as survey_services
-from app.services.filtering.survey import filter_surveys
+from app.services.filtering.survey import filter_surveys_offset_page, filter_surveys_page
 
-router = APIRouter()
+settings = get_settings()
+
+router = APIRouter(route_class=UnitOfWorkRoute)
+
+
+def _get_survey_cache_headers(survey, is_owner: bool) -> dict:
+    """
+    The owner gets another representation than everyone else, so it's a part of the ETag.
+    Only available surveys seen by non owners may be stored by shared caches.
+    """
+    if survey.available and not is_owner:
+        cache_control = f"public, max-age={settings.SURVEY_HTTP_CACHE_MAX_AGE}"
+    else:
+        cache_control = "private, no-cache"
+    return {
+        "ETag": make_etag(survey.id, survey.version, "owner" if is_owner else "public"),
+        "Last-Modified": to_http_date(survey.updated_at),
+        "Cache-Control": cache_control,
+        "Vary": "Authorization",
+    }
 
 
 @router.post("", response_model=SurveyOwnerRetrieve, status_code=201)
@@ -33,37 +63,159 @@ async def get_current_user_surveys(
         current_user: User = Depends(get_current_active_user),
 ):
     surveys = await survey_services.get_current_user_surveys(session=session, user=current_user, available=available)
-    return paginate(surveys)
+    with raw_pages():
+        page = paginate(surveys)
+    return page_response(page=page, schema=SurveyOut)
+
+
+@router.get("/user/me/cursor", response_model=CursorPage[SurveyOut])
+async def get_current_user_surveys_by_cursor(
+        available: Optional[bool] = None,
+        params: CursorParams = Depends(),
+        session: AsyncSession = Depends(get_session),
+        current_user: User = Depends(get_current_active_user),
+):
+    page = await survey_services.get_current_user_surveys_page(
+        session=session,
+        user=current_user,
+        params=params,
+        available=available,
+    )
+    return page_response(page=page, schema=SurveyOut)
 
 
 @router.get("/user/{id_}", response_model=Page[SurveyOut])
-async def get_user_surveys(id_: UUID4, session: AsyncSession = Depends(get_session)):
+async def get_user_surveys(id_: UUID4, session: AsyncSession = Depends(get_read_session)):
     surveys = await survey_services.get_user_surveys(session=session, user_id=id_)
-    return paginate(surveys)
+    with raw_pages():
+        page = paginate(surveys)
+    return page_response(page=page, schema=SurveyOut)
+
+
+@router.get("/user/{id_}/cursor", response_model=CursorPage[SurveyOut])
+async def get_user_surveys_by_cursor(
+        id_: UUID4,
+        params: CursorParams = Depends(),
+        session: AsyncSession = Depends(get_read_session),
+):
+    page = await survey_services.get_user_surveys_page(session=session, user_id=id_, params=params)
+    return page_response(page=page, schema=SurveyOut)
 
 
 @router.get("/search", response_model=Page[SurveyOut])
-async def get_surveys_with_filtering(filter: SurveyFilter = Depends(), session: AsyncSession = Depends(get_session)):
-    surveys = await filter_surveys(session=session, filter=filter)
-    return paginate(surveys)
+async def get_surveys_with_filtering(
+        filter: SurveyFilter = Depends(),
+        session: AsyncSession = Depends(get_read_session),
+):
+    with raw_pages():
+        page = await filter_surveys_offset_page(session=session, filter=filter)
+    return page_response(page=page, schema=SurveyOut)
+
+
+@router.get("/search/cursor", response_model=CursorPage[SurveyOut])
+async def get_surveys_with_filtering_by_cursor(
+        filter: SurveyFilter = Depends(),
+        params: CursorParams = Depends(),
+        session: AsyncSession = Depends(get_read_session),
+):
+    page = await filter_surveys_page(session=session, filter=filter, params=params)
+    return page_response(page=page, schema=SurveyOut)
+
+
+@router.get("/cursor", response_model=CursorPage[SurveyOut])
+async def get_surveys_by_cursor(params: CursorParams = Depends(), session: AsyncSession = Depends(get_read_session)):
+    page = await survey_services.get_surveys_page(session=session, params=params)
+    return page_response(page=page, schema=SurveyOut)
 
 
 @router.get("/{id_}", response_model=SurveyRetrieve | SurveyOwnerRetrieve, status_code=200)
 async def get_survey(
         id_: UUID4,
+        request: Request,
+        response: Response,
         session: AsyncSession = Depends(get_session),
+        read_session: AsyncSession = Depends(get_read_session),
         current_user: Optional[User] = Depends(get_current_active_user_or_none),
 ):
-    survey = await survey_services.get_survey(session=session, user=current_user, id_=id_)
-    if current_user and current_user.id == survey.user_id:
+    # Only anonymous validators come from a replica. Signed in users read from the primary, so owners see
+    # their changes right away, and the cache is refilled from it, so a lagging replica can't put back
+    # a version that was just invalidated.
+    cached_survey = await survey_services.get_cached_survey(id_=id_)
+    validators = cached_survey or await survey_services.get_survey_validators(
+        session=read_session if current_user is None else session,
+        id_=id_,
+    )
+    is_owner = current_user is not None and current_user.id == validators.user_id
+    headers = _get_survey_cache_headers(survey=validators, is_owner=is_owner)
+    if is_not_modified(request=request, etag=headers["ETag"], last_modified=validators.updated_at):
+        return Response(status_code=304, headers=headers)
+    if is_owner:
+        survey = await survey_services.get_survey(session=session, user=current_user, id_=id_)
+        response.headers.update(_get_survey_cache_headers(survey=survey, is_owner=is_owner))
         return SurveyOwnerRetrieve.from_orm(survey)
-    return SurveyRetrieve.from_orm(survey)
+    if cached_survey is None:
+        survey = await survey_services.get_survey(session=session, id_=id_)
+        cached_survey = await survey_services.cache_survey(survey=survey)
+    return serialized_response(
+        content=cached_survey.data,
+        headers=_get_survey_cache_headers(survey=cached_survey, is_owner=is_owner),
+    )
+
+
+@router.get("/{id_}/results", response_model=SurveyResults, status_code=200)
+async def get_survey_results(
+        id_: UUID4,
+        top: int = Query(default=10, ge=1, le=100),
+        session: AsyncSession = Depends(get_read_session),
+        current_user: User = Depends(get_current_active_user),
+):
+    results = await result_services.get_survey_results(session=session, survey_id=id_, user=current_user, top=top)
+    return results
+
+
+@router.get("/{id_}/answers", response_model=CursorPage[SurveyAnswerOut], status_code=200)
+async def get_survey_answers(
+        id_: UUID4,
+        filter: AnswerFilter = Depends(),
+        params: CursorParams = Depends(),
+        session: AsyncSession = Depends(get_read_session),
+        current_user: User = Depends(get_current_active_user),
+):
+    page = await answer_services.get_survey_answers_page(
+        session=session,
+        survey_id=id_,
+        user=current_user,
+        params=params,
+        filter=filter,
+    )
+    return page_response(page=page, schema=SurveyAnswerOut)
+
+
+@router.get("/{id_}/export", response_class=StreamingResponse, status_code=200)
+async def export_survey_answers(
+        id_: UUID4,
+        format: AnswerExportFormat = Query(default=AnswerExportFormat.csv),
+        session: AsyncSession = Depends(get_read_session),
+        current_user: User = Depends(get_current_active_user),
+):
+    survey_attrs = await answer_services.get_survey_attrs_for_export(session=session, survey_id=id_, user=current_user)
+    exporters = {
+        AnswerExportFormat.csv: (answer_services.export_answers_csv, "text/csv"),
+        AnswerExportFormat.ndjson: (answer_services.export_answers_ndjson, "application/x-ndjson"),
+    }
+    exporter, media_type = exporters[format]
+    return StreamingResponse(
+        exporter(session=session, survey_id=id_, survey_attrs=survey_attrs),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="survey-{id_}-answers.{format.value}"'},
+    )
 
 
 @router.get("", response_model=Page[SurveyOut])
-async def get_surveys(session: AsyncSession = Depends(get_session)):
-    surveys = await survey_services.get_surveys(session=session)
-    return paginate(surveys)
+async def get_surveys(session: AsyncSession = Depends(get_read_session)):
+    with raw_pages():
+        page = await survey_services.get_surveys_offset_page(session=session)
+    return page_response(page=page, schema=SurveyOut)
 
 
 @router.patch("/{id_}", status_code=200, response_model=SurveyUpdateOut)
@@ -77,13 +229,14 @@ async def update_survey(
     return survey
 
 
-@router.delete("/{id_}", status_code=204)
+@router.delete("/{id_}", status_code=202, response_model=DeletionJobOut)
 async def delete_survey(
         id_: UUID4,
         session: AsyncSession = Depends(get_session),
         current_user: User = Depends(get_current_active_user)
 ):
-    await survey_services.delete_survey(session=session, user=current_user, id_=id_)
+    job = await survey_services.delete_survey(session=session, user=current_user, id_=id_)
+    return job
 
 
 @router.patch("/attr/{id_}")
@@ -114,7 +267,7 @@ async def delete_survey_attr(
 @router.get("/attr/{id_}", response_model=SurveyAttributeRetrieve, status_code=200)
 async def get_survey_attribute(
         id_: UUID4,
-        session: AsyncSession = Depends(get_session),
+        session: AsyncSession = Depends(get_read_session),
         current_user: Optional[User] = Depends(get_current_active_user_or_none)
 ):
     survey_attr = await survey_services.get_survey_attribute(session=session, id_=id_, user=current_user)
@@ -4,15 +4,20 @@ from pydantic import UUID4
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_active_user
+from app.api.responses import page_response, raw_pages
+from app.api.routing import UnitOfWorkRoute
 from app.db.base import get_session
+from app.db.replicas import get_read_session
 from app.forms.auth import LoginForm
 from app.models.user import User
 from app.schemas import user as user_schemas
+from app.schemas.deletion import DeletionJobOut
+from app.schemas.pagination import CursorPage, CursorParams
 from app.schemas.user import UserFilter
 from app.services import user as user_services
-from app.services.filtering.user import filter_users
+from app.services.filtering.user import filter_users_offset_page, filter_users_page
 
-router = APIRouter()
+router = APIRouter(route_class=UnitOfWorkRoute)
 
 
 @router.get("/me", response_model=user_schemas.UserRetrieve)
@@ -35,30 +40,50 @@ async def update_current_user(
 
 
 @router.get("", response_model=Page[user_schemas.UserList])
-async def get_users(session: AsyncSession = Depends(get_session)):
+async def get_users(session: AsyncSession = Depends(get_read_session)):
     users = await user_services.get_users(session=session)
-    return paginate(users)
+    with raw_pages():
+        page = paginate(users)
+    return page_response(page=page, schema=user_schemas.UserList)
+
+
+@router.get("/cursor", response_model=CursorPage[user_schemas.UserList])
+async def get_users_by_cursor(params: CursorParams = Depends(), session: AsyncSession = Depends(get_read_session)):
+    page = await user_services.get_users_page(session=session, params=params)
+    return page_response(page=page, schema=user_schemas.UserList)
 
 
 @router.get("/search", response_model=Page[user_schemas.UserList])
-async def get_users_with_filtering(filter: UserFilter = Depends(), session: AsyncSession = Depends(get_session)):
-    users = await filter_users(session=session, filter=filter)
-    return paginate(users)
+async def get_users_with_filtering(filter: UserFilter = Depends(), session: AsyncSession = Depends(get_read_session)):
+    with raw_pages():
+        page = await filter_users_offset_page(session=session, filter=filter)
+    return page_response(page=page, schema=user_schemas.UserList)
+
+
+@router.get("/search/cursor", response_model=CursorPage[user_schemas.UserList])
+async def get_users_with_filtering_by_cursor(
+    filter: UserFilter = Depends(),
+    params: CursorParams = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+):
+    page = await filter_users_page(session=session, filter=filter, params=params)
+    return page_response(page=page, schema=user_schemas.UserList)
 
 
 @router.get("/{user_id}", response_model=user_schemas.UserRetrieve)
-async def get_user(user_id: UUID4, session: AsyncSession = Depends(get_session)):
+async def get_user(user_id: UUID4, session: AsyncSession = Depends(get_read_session)):
     user = await user_services.get_user(session=session, where_statements=[User.id == user_id])
     return user
 
 
-@router.delete("", status_code=204)
+@router.delete("", status_code=202, response_model=DeletionJobOut)
 async def delete_user(
     login_form: LoginForm = Depends(),
     session: AsyncSession = Depends(get_session),
 ):
-    await user_services.delete_user(
+    job = await user_services.delete_user(
         session=session,
         login=login_form.login,
         password=login_form.password
     )
+    return job
@@ -0,0 +1,43 @@
+from typing import Any, ContextManager, Optional, Type, Union
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from fastapi_pagination import Page
+from fastapi_pagination.api import set_page
+from fastapi_pagination.bases import AbstractPage
+from pydantic import BaseModel
+
+from app.core.serialization import serialize_object
+from app.core.settings import get_settings
+from app.schemas.pagination import CursorPage
+
+settings = get_settings()
+
+
+def get_response_class() -> Type[JSONResponse]:
+    return ORJSONResponse if settings.ORJSON_RESPONSES else JSONResponse
+
+
+def serialized_response(content: Any, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """
+    Send already serialized content, FastAPI doesn't validate and encode a returned Response again.
+    orjson encodes UUIDs and datetimes by itself, so jsonable_encoder is only needed for the stdlib encoder.
+    """
+    response_class = get_response_class()
+    if response_class is JSONResponse:
+        content = jsonable_encoder(content)
+    return response_class(content=content, status_code=status_code, headers=headers)
+
+
+def raw_pages() -> ContextManager[None]:
+    """
+    Pages created by fastapi_pagination inside keep their items as they are instead of validating them
+    against the response model, page_response serializes them.
+    """
+    return set_page(Page[Any])
+
+
+def page_response(page: Union[AbstractPage, CursorPage], schema: Type[BaseModel]) -> Response:
+    content = {name: getattr(page, name) for name in page.__fields__}
+    content["items"] = [serialize_object(item, schema) for item in page.items]
+    return serialized_response(content)
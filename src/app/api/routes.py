@@ -2,8 +2,14 @@ from fastapi import APIRouter
 
 from app.api.endpoints.answer import router as answer_router
 from app.api.endpoints.auth import router as auth_router
+from app.api.endpoints.deletion import router as deletion_router
+from app.api.endpoints.metrics import router as metrics_router
+from app.api.endpoints.monitoring import router as monitoring_router
 from app.api.endpoints.survey import router as survey_router
 from app.api.endpoints.user import router as user_router
+from app.core.settings import get_settings
+
+settings = get_settings()
 
 router = APIRouter()
 
@@ -11,3 +17,7 @@ router.include_router(auth_router, prefix="/auth", tags=["auth"])
 router.include_router(user_router, prefix="/user", tags=["user"])
 router.include_router(survey_router, prefix="/survey", tags=["survey"])
 router.include_router(answer_router, prefix="/answer", tags=["answer"])
+router.include_router(deletion_router, prefix="/deletion", tags=["deletion"])
+router.include_router(monitoring_router, prefix="/monitoring", tags=["monitoring"])
+if settings.METRICS_ENABLED:
+    router.include_router(metrics_router, prefix="/metrics", tags=["monitoring"])
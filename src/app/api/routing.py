@@ -0,0 +1,25 @@
+from typing import Callable
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from app.db.base import commit_unit_of_work
+
+
+class UnitOfWorkRoute(APIRoute):
+    """
+    Commits the unit of work session of the request (see get_session) after the endpoint succeeded
+    and before the response is sent, so a failed commit is still reported to the client.
+    """
+
+    def get_route_handler(self) -> Callable:
+        route_handler = super().get_route_handler()
+
+        async def unit_of_work_route_handler(request: Request) -> Response:
+            response = await route_handler(request)
+            session = getattr(request.state, "session", None)
+            if session is not None and response.status_code < 400:
+                await commit_unit_of_work(session)
+            return response
+
+        return unit_of_work_route_handler
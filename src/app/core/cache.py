@@ -0,0 +1,104 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class CacheBackend(ABC):
+    """
+    Storage used by Cache. Implement it to share cached values between workers (e.g. on top of redis).
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        ...
+
+    @abstractmethod
+    async def clear(self) -> None:
+        ...
+
+
+class LRUCacheBackend(CacheBackend):
+    """
+    In-process backend. Evicts least recently used entries once maxsize is reached and expired ones on read.
+    """
+
+    def __init__(self, maxsize: int):
+        self._maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class Cache:
+    def __init__(self, namespace: str, backend: CacheBackend, ttl: float, enabled: bool = True):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    def _make_key(self, key: Any) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: Any) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        value = await self.backend.get(self._make_key(key))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: Any, value: Any) -> None:
+        if self.enabled:
+            await self.backend.set(self._make_key(key), value, self.ttl)
+
+    async def invalidate(self, *keys: Any) -> None:
+        await self.backend.delete(*[self._make_key(key) for key in keys])
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "hit_ratio": self.hit_ratio}
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.settings import get_settings
+from app.db.base import SessionLocal, run_after_commit
+from app.models import DeletionJob
+from app.services import deletion as deletion_services
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+
+class DeletionWorker:
+    """
+    Purges soft deleted surveys and users one job at a time. Every batch of at most batch_size rows
+    is its own short transaction, with batch_pause seconds between them to leave room for other writes.
+    Polls every poll_interval seconds and right away when woken up after a deletion is requested.
+    """
+
+    def __init__(
+            self,
+            session_maker: sessionmaker,
+            batch_size: int,
+            batch_pause: float,
+            poll_interval: float,
+            lease_seconds: float,
+    ):
+        self._session_maker = session_maker
+        self._batch_size = batch_size
+        self._batch_pause = batch_pause
+        self._poll_interval = poll_interval
+        self._lease_seconds = lease_seconds
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    async def wake_async(self) -> None:
+        self.wake()
+
+    async def run_job(self) -> bool:
+        """
+        Claim the next due job and purge it to the end, False when there was nothing to do.
+        """
+        async with self._session_maker() as session:
+            job = await deletion_services.claim_deletion_job(session=session, lease_seconds=self._lease_seconds)
+            if job is None:
+                return False
+            try:
+                while True:
+                    job = await deletion_services.purge_deletion_job_batch(
+                        session=session,
+                        job=job,
+                        batch_size=self._batch_size,
+                        lease_seconds=self._lease_seconds,
+                    )
+                    if job.status == "done":
+                        return True
+                    await asyncio.sleep(self._batch_pause)
+            except Exception as exception:
+                await session.rollback()
+                await deletion_services.mark_deletion_job_failed(session=session, job=job, error=repr(exception))
+                raise
+
+    async def run(self) -> None:
+        while True:
+            try:
+                processed = await self.run_job()
+            except Exception:
+                logger.exception("Deletion job failed")
+                processed = False
+            if processed:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+deletion_worker = DeletionWorker(
+    session_maker=SessionLocal,
+    batch_size=settings.DELETION_BATCH_SIZE,
+    batch_pause=settings.DELETION_BATCH_PAUSE,
+    poll_interval=settings.DELETION_POLL_INTERVAL,
+    lease_seconds=settings.DELETION_LEASE_SECONDS,
+)
+
+
+async def request_deletion(session: AsyncSession, target: str, target_id: UUID, user_id: UUID) -> DeletionJob:
+    """
+    Queue the purge of a soft deleted survey or user, the worker is woken once it's committed.
+    """
+    job = await deletion_services.create_deletion_job(
+        session=session,
+        target=target,
+        target_id=target_id,
+        user_id=user_id,
+    )
+    await run_after_commit(session, deletion_worker.wake_async)
+    return job
@@ -1,55 +1,255 @@
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from smtplib import SMTP
+import asyncio
+import logging
+import math
+from email.message import EmailMessage
+from typing import List, Optional
 
-from jinja2 import Environment, FileSystemLoader
+import aiosmtplib
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 
 from app.core.settings import get_settings
+from app.db.base import SessionLocal, run_after_commit
+from app.models import EmailOutbox
+from app.services import email as email_services
 
 settings = get_settings()
 
+logger = logging.getLogger(__name__)
 
-def send_email(email_to: str, subject: str, template_name: str, environment: dict) -> None:
-    env = Environment(loader=FileSystemLoader(settings.EMAIL_TEMPLATES_DIR))
-    template = env.get_template(template_name)
-    output = template.render(environment)
-    from_email = settings.SMTP_USER
-    message = MIMEMultipart()
-    message["Subject"] = subject
-    message["From"] = from_email
-    message["To"] = email_to
-    message.attach(MIMEText(output, "html"))
-    message_body = message.as_string()
-    with SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as smtp_server:
-        smtp_server.starttls()
-        smtp_server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-        smtp_server.sendmail(from_email, email_to, message_body)
-
-
-def send_new_account_email(email_to: str, username: str, password: str, uuid: str) -> None:
-    verification_link = f"{settings.BASE_APP_URI}/auth/confirm-registration/{uuid}"
+
+def create_template_environment() -> Environment:
+    """
+    Templates are compiled once and kept by the environment. With EMAIL_TEMPLATES_AUTO_RELOAD
+    changed files are picked up on the next render, which costs a stat() per render.
+    """
+    bytecode_cache = None
+    if settings.EMAIL_TEMPLATES_BYTECODE_CACHE_DIR:
+        bytecode_cache = FileSystemBytecodeCache(settings.EMAIL_TEMPLATES_BYTECODE_CACHE_DIR)
+    return Environment(
+        loader=FileSystemLoader(settings.EMAIL_TEMPLATES_DIR),
+        auto_reload=settings.EMAIL_TEMPLATES_AUTO_RELOAD,
+        bytecode_cache=bytecode_cache,
+    )
+
+
+template_environment = create_template_environment()
+
+
+def compile_templates() -> None:
+    for template_name in template_environment.list_templates(extensions=["html"]):
+        template_environment.get_template(template_name)
+
+
+def render_template(template_name: str, environment: dict) -> str:
+    template = template_environment.get_template(template_name)
+    return template.render(environment)
+
+
+def build_message(email: EmailOutbox) -> EmailMessage:
+    message = EmailMessage()
+    message["Subject"] = email.subject
+    message["From"] = settings.SMTP_USER
+    message["To"] = email.email_to
+    message.set_content(email.body, subtype="html")
+    return message
+
+
+class SMTPPool:
+    """
+    Keeps up to size authenticated SMTP connections open and reuses them between messages,
+    so STARTTLS and login happen once per connection instead of once per email.
+    A send is cut after send_timeout seconds, so n messages take at most ceil(n / size) * send_timeout.
+    """
+
+    def __init__(self, size: int, send_timeout: float):
+        self.size = size
+        self.send_timeout = send_timeout
+        self._semaphore = asyncio.Semaphore(size)
+        self._idle: List[aiosmtplib.SMTP] = list()
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(
+            hostname=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            username=settings.SMTP_USER,
+            password=settings.SMTP_PASSWORD,
+            start_tls=settings.SMTP_TLS,
+            timeout=settings.SMTP_TIMEOUT,
+        )
+        await client.connect()
+        return client
+
+    async def _get_client(self) -> aiosmtplib.SMTP:
+        while self._idle:
+            client = self._idle.pop()
+            if client.is_connected:
+                return client
+        return await self._connect()
+
+    async def _send(self, message: EmailMessage) -> None:
+        client = await self._get_client()
+        try:
+            try:
+                await client.send_message(message)
+            except aiosmtplib.SMTPServerDisconnected:
+                # the server may drop idle connections, one fresh connection is worth a try
+                client = await self._connect()
+                await client.send_message(message)
+        except BaseException:
+            # cancelled by the send timeout too, the connection is left in an unknown state
+            client.close()
+            raise
+        self._idle.append(client)
+
+    async def send(self, message: EmailMessage) -> None:
+        async with self._semaphore:
+            await asyncio.wait_for(self._send(message), timeout=self.send_timeout)
+
+    async def close(self) -> None:
+        while self._idle:
+            client = self._idle.pop()
+            try:
+                await client.quit()
+            except aiosmtplib.SMTPException:
+                client.close()
+
+
+class EmailOutboxWorker:
+    """
+    Delivers emails from the outbox in batches through the SMTP pool.
+    Polls every poll_interval seconds and right away when woken up after an email is enqueued.
+    """
+
+    def __init__(self, session_maker: sessionmaker, pool: SMTPPool, batch_size: int, poll_interval: float):
+        self._session_maker = session_maker
+        self._pool = pool
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def lease_seconds(self) -> float:
+        # a full batch goes through the pool in ceil(batch_size / size) rounds of sends,
+        # the margin covers marking the results, emails must not be claimed again before that
+        rounds = math.ceil(self._batch_size / self._pool.size)
+        return rounds * self._pool.send_timeout + settings.SMTP_TIMEOUT
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    async def wake_async(self) -> None:
+        self.wake()
+
+    async def deliver_batch(self) -> int:
+        async with self._session_maker() as session:
+            emails = await email_services.claim_emails(
+                session=session,
+                limit=self._batch_size,
+                lease_seconds=self.lease_seconds,
+            )
+            if not emails:
+                return 0
+            results = await asyncio.gather(
+                *[self._pool.send(build_message(email)) for email in emails],
+                return_exceptions=True,
+            )
+            await email_services.mark_emails_sent(
+                session=session,
+                email_ids=[email.id for email, result in zip(emails, results) if not isinstance(result, Exception)],
+            )
+            for email, result in zip(emails, results):
+                if isinstance(result, Exception):
+                    await email_services.mark_email_failed(session=session, email=email, error=repr(result))
+            return len(emails)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                delivered = await self.deliver_batch()
+            except Exception:
+                logger.exception("Email outbox delivery failed")
+                delivered = 0
+            if delivered == self._batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._pool.close()
+
+
+outbox_worker = EmailOutboxWorker(
+    session_maker=SessionLocal,
+    # connecting and sending may take SMTP_TIMEOUT each
+    pool=SMTPPool(size=settings.SMTP_POOL_SIZE, send_timeout=settings.SMTP_TIMEOUT * 2),
+    batch_size=settings.EMAIL_OUTBOX_BATCH_SIZE,
+    poll_interval=settings.EMAIL_OUTBOX_POLL_INTERVAL,
+)
+
+
+async def send_email(
+        session: AsyncSession,
+        email_to: str,
+        subject: str,
+        template_name: str,
+        environment: dict,
+) -> EmailOutbox:
+    """
+    Render the email and put it into the outbox, it's delivered by outbox_worker.
+    """
+    email = await email_services.enqueue_email(
+        session=session,
+        email_to=email_to,
+        subject=subject,
+        body=render_template(template_name=template_name, environment=environment),
+    )
+    await run_after_commit(session, outbox_worker.wake_async)
+    return email
+
+
+async def send_new_account_email(session: AsyncSession, email_to: str, username: str, verification_code: str) -> None:
+    # the password isn't sent back, as it would be stored in the outbox as plain text
+    verification_link = f"{settings.BASE_APP_URI}/auth/confirm-registration/{verification_code}"
     subject = "New user."
-    send_email(
+    await send_email(
+        session=session,
         email_to=email_to,
         template_name="new_account.html",
         subject=subject,
         environment={
             "project_name": settings.PROJECT_NAME,
             "username": username,
-            "password": password,
             "email": email_to,
             "link": verification_link,
         },
     )
 
 
-def send_reset_password_email(username: str, email: str, token: str) -> None:
+async def send_reset_password_email(session: AsyncSession, username: str, email: str, token: str) -> None:
     if hasattr(token, "decode"):
         use_token = token.decode()
     else:
         use_token = token
     subject = f"Password recovery for user {username}."
-    send_email(
+    await send_email(
+        session=session,
         email_to=email,
         template_name="reset_password.html",
         subject=subject,
@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request
+
+
+def make_etag(*parts) -> str:
+    # weak, as equal versions give equal JSON but not necessarily the same bytes (e.g. compression)
+    return 'W/"{}"'.format("-".join(str(part) for part in parts))
+
+
+def to_http_date(value: datetime) -> str:
+    # naive datetimes are local time, like the ones stored by the models
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _strip_weakness(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """
+    Evaluate If-None-Match, or If-Modified-Since when there is no If-None-Match (RFC 9110, 13.2.2).
+    ETags are compared weakly.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        etags = {_strip_weakness(value.strip()) for value in if_none_match.split(",")}
+        return _strip_weakness(etag) in etags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        since = _parse_http_date(if_modified_since)
+        if since is None:
+            return False
+        return last_modified.astimezone(timezone.utc).replace(microsecond=0) <= since
+    return False
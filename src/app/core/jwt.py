@@ -4,6 +4,7 @@ from uuid import UUID
 import jwt
 from fastapi import HTTPException
 from jwt import PyJWTError
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.status import HTTP_403_FORBIDDEN
 
@@ -39,12 +40,14 @@ def create_jwt_token(*, data: dict, expires_delta: timedelta = None) -> str:
 async def get_user_by_jwt_token(token: str, session: AsyncSession) -> User:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.TOKEN_ENCODE_ALGORITHM])
+        if payload.get("sub") != settings.ACCESS_TOKEN_JWT_SUBJECT:
+            raise PyJWTError("Not an access token")
         token_data = TokenPayload(**payload)
-    except PyJWTError:
+    except (PyJWTError, ValidationError):
         raise HTTPException(
             status_code=HTTP_403_FORBIDDEN, detail="Could not validate credentials.",
         )
-    user = await user_services.get_user(session=session, where_statements=[User.id == token_data.user_id])
+    user = await user_services.get_cached_user(session=session, user_id=token_data.user_id)
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return user
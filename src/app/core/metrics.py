@@ -0,0 +1,145 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+
+
+class Histogram:
+    """
+    Prometheus histogram kept in process memory, one series per combination of label values.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> (counts per bucket, sum)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], float]] = dict()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        counts, total = self._series.get(labels) or ([0] * (len(self.buckets) + 1), 0.0)
+        counts[bisect_left(self.buckets, value)] += 1
+        self._series[labels] = (counts, total + value)
+
+    def clear(self) -> None:
+        self._series.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            label_string = _format_labels(self.labelnames, labels)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_string},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_string}}} {total}")
+            lines.append(f"{self.name}_count{{{label_string}}} {cumulative}")
+        return lines
+
+
+request_duration = Histogram(
+    name="http_request_duration_seconds",
+    documentation="Time spent handling requests.",
+    labelnames=("method", "route", "status"),
+    buckets=LATENCY_BUCKETS,
+)
+request_db_statements = Histogram(
+    name="http_request_db_statements",
+    documentation="SQL statements executed per request.",
+    labelnames=("method", "route"),
+    buckets=STATEMENT_BUCKETS,
+)
+request_db_duration = Histogram(
+    name="http_request_db_duration_seconds",
+    documentation="Time spent in SQL statements per request.",
+    labelnames=("method", "route"),
+    buckets=LATENCY_BUCKETS,
+)
+HISTOGRAMS = (request_duration, request_db_statements, request_db_duration)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+# Shared by reference with the tasks and greenlets running the request, so the SQL hooks can add to it
+current_request_metrics: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request_metrics", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    context._metrics_started_at = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    request_metrics = current_request_metrics.get()
+    if request_metrics is not None:
+        request_metrics.statements += 1
+        request_metrics.db_seconds += time.perf_counter() - context._metrics_started_at
+
+
+class MetricsMiddleware:
+    """
+    Records latency, SQL statement count and SQL time of every request under its route template,
+    requests matching no route are put together under "unmatched" to keep the number of series bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Dict[object, str] = dict()
+
+    def _get_route(self, scope: dict) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if endpoint not in self._route_paths:
+            for route in scope["app"].routes:
+                self._route_paths.setdefault(getattr(route, "endpoint", None), route.path)
+        return self._route_paths.get(endpoint, "unmatched")
+
+    async def __call__(self, scope: dict, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        request_metrics = RequestMetrics()
+        token = current_request_metrics.set(request_metrics)
+
+        async def send_with_status(message: dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started_at
+            current_request_metrics.reset(token)
+            method, route = scope["method"], self._get_route(scope)
+            request_duration.observe((method, route, str(status)), duration)
+            request_db_statements.observe((method, route), request_metrics.statements)
+            request_db_duration.observe((method, route), request_metrics.db_seconds)
+
+
+def render_metrics() -> str:
+    return "\n".join(line for histogram in HISTOGRAMS for line in histogram.render()) + "\n"
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy.orm import sessionmaker
+
+from app.core.settings import get_settings
+from app.db.base import SessionLocal
+from app.services import result as result_services
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+
+class SurveyResultWorker:
+    """
+    Folds the result deltas appended by the answer services into the summary tables, batch_size deltas
+    per transaction. Polls every poll_interval seconds and right away while a batch comes back full.
+    """
+
+    def __init__(self, session_maker: sessionmaker, batch_size: int, poll_interval: float, max_texts: int):
+        self._session_maker = session_maker
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._max_texts = max_texts
+        self._task: Optional[asyncio.Task] = None
+
+    async def fold_batch(self) -> int:
+        async with self._session_maker() as session:
+            return await result_services.fold_results_batch(
+                session=session,
+                batch_size=self._batch_size,
+                max_texts=self._max_texts,
+            )
+
+    async def run(self) -> None:
+        while True:
+            try:
+                folded = await self.fold_batch()
+            except Exception:
+                logger.exception("Folding survey results failed")
+                folded = 0
+            if folded == self._batch_size:
+                continue
+            await asyncio.sleep(self._poll_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+survey_result_worker = SurveyResultWorker(
+    session_maker=SessionLocal,
+    batch_size=settings.SURVEY_RESULTS_BATCH_SIZE,
+    poll_interval=settings.SURVEY_RESULTS_POLL_INTERVAL,
+    max_texts=settings.SURVEY_RESULTS_MAX_TEXTS,
+)
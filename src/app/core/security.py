@@ -1,7 +1,22 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Optional, TypeVar
+from uuid import UUID
+
+import jwt
+from fastapi import HTTPException
 from passlib.context import CryptContext
 
+from app.core.settings import get_settings
+
+settings = get_settings()
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+ResultType = TypeVar("ResultType")
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -9,3 +24,107 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a bounded thread pool so hashing doesn't block the event loop.
+    bcrypt releases the GIL, so threads give real parallelism here.
+    Calls beyond workers + max_queue are rejected with 503 instead of piling up.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = None
+        self.in_flight = 0
+        self.calls = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hasher")
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self.in_flight - self.workers, 0)
+
+    async def _run(self, function: Callable[..., ResultType], *args) -> ResultType:
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Server is busy, try again later.")
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.in_flight -= 1
+            self.calls += 1
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "avg_seconds": self.total_seconds / self.calls if self.calls else 0.0,
+            "max_seconds": self.max_seconds,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASHING_WORKERS,
+    max_queue=settings.PASSWORD_HASHING_MAX_QUEUE,
+)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.hash(password)
+
+
+def generate_verification_token(user_id: UUID) -> str:
+    """
+    Signed, expiring replacement for a Verification row, it's what the confirmation link carries
+    when EMAIL_VERIFICATION_STATELESS is set. The user id goes under its own claim, so the token
+    can't pass for an access token.
+    """
+    now = datetime.utcnow()
+    expires = now + timedelta(hours=settings.EMAIL_VERIFICATION_TOKEN_EXPIRE)
+    return jwt.encode(
+        {"exp": expires, "nbf": now, "sub": settings.VERIFICATION_JWT_SUBJECT, "verified_user_id": str(user_id)},
+        settings.SECRET_KEY,
+        algorithm=settings.TOKEN_ENCODE_ALGORITHM,
+    )
+
+
+def verify_verification_token(token: str) -> Optional[UUID]:
+    try:
+        decoded_token = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.TOKEN_ENCODE_ALGORITHM])
+        if decoded_token.get("sub") != settings.VERIFICATION_JWT_SUBJECT:
+            return None
+        return UUID(decoded_token["verified_user_id"])
+    except (jwt.InvalidTokenError, KeyError, ValueError):
+        return None
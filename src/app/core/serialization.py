@@ -0,0 +1,28 @@
+from collections.abc import Mapping
+from typing import Any, Type
+
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON
+from pydantic.utils import lenient_issubclass
+
+
+def _get_value(obj: Any, name: str) -> Any:
+    return obj[name] if isinstance(obj, Mapping) else getattr(obj, name)
+
+
+def serialize_object(obj: Any, schema: Type[BaseModel]) -> dict:
+    """
+    Pick the fields of schema from an ORM object, a row or a mapping, like schema.from_orm(obj).dict()
+    but without validation, so only for data that is valid by construction, as what comes from the database.
+    Nested schemas are followed for single and list fields.
+    """
+    data = dict()
+    for name, field in schema.__fields__.items():
+        value = _get_value(obj, field.alias)
+        if value is not None and lenient_issubclass(field.type_, BaseModel):
+            if field.shape == SHAPE_LIST:
+                value = [serialize_object(item, field.type_) for item in value]
+            elif field.shape == SHAPE_SINGLETON:
+                value = serialize_object(value, field.type_)
+        data[name] = value
+    return data
@@ -1,6 +1,7 @@
 import datetime
 from functools import lru_cache
 from pathlib import Path
+from typing import List, Optional
 
 from pydantic import BaseSettings, PostgresDsn, EmailStr
 
@@ -15,6 +16,7 @@ class Settings(BaseSettings):
     TOKEN_ENCODE_ALGORITHM = "HS256"
     ACCESS_TOKEN_JWT_SUBJECT = "access"
     PASSWORD_RESET_JWT_SUBJECT = "preset"
+    VERIFICATION_JWT_SUBJECT = "verify"
 
     SQL_ENGINE: str
     SQL_USER: str
@@ -22,9 +24,24 @@ class Settings(BaseSettings):
     SQL_HOST: str
     SQL_PORT: str
     SQL_DATABASE: str
+    SQL_POOL_SIZE: int = 10
+    SQL_MAX_OVERFLOW: int = 10
+    SQL_POOL_TIMEOUT: float = 30
+    SQL_POOL_RECYCLE: int = 1800
+    SQL_POOL_PRE_PING: bool = True
+    SQL_STATEMENT_CACHE_SIZE: int = 500
+    SQL_COMMAND_TIMEOUT: float = 60
+    SQL_UNIT_OF_WORK: bool = True
+    SQL_REPLICA_URIS: List[str] = []
+    SQL_REPLICA_MAX_LAG: float = 5
+    SQL_REPLICA_CHECK_INTERVAL: float = 5
 
     EMAIL_RESET_TOKEN_EXPIRE = 48
+    EMAIL_VERIFICATION_STATELESS: bool = False
+    EMAIL_VERIFICATION_TOKEN_EXPIRE = 48
     EMAIL_TEMPLATES_DIR: str
+    EMAIL_TEMPLATES_AUTO_RELOAD: bool = False
+    EMAIL_TEMPLATES_BYTECODE_CACHE_DIR: Optional[str] = None
     EMAILS_FROM_EMAIL: EmailStr
     EMAIL_TEST_USER: EmailStr
 
@@ -33,9 +50,49 @@ class Settings(BaseSettings):
     SMTP_HOST: str
     SMTP_USER: EmailStr
     SMTP_PASSWORD: str
+    SMTP_POOL_SIZE: int = 4
+    SMTP_TIMEOUT: float = 30
+
+    EMAIL_OUTBOX_WORKER_ENABLED: bool = True
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_POLL_INTERVAL: float = 5
+    EMAIL_MAX_ATTEMPTS: int = 5
+    EMAIL_RETRY_BASE_DELAY: float = 30
+    EMAIL_RETRY_MAX_DELAY: float = 3600
 
     ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7
 
+    ORJSON_RESPONSES: bool = False
+    METRICS_ENABLED: bool = True
+
+    PASSWORD_HASHING_WORKERS: int = 4
+    PASSWORD_HASHING_MAX_QUEUE: int = 64
+
+    ANSWER_BATCH_MAX_SIZE: int = 10_000
+    ANSWER_BATCH_CHUNK_SIZE: int = 1000
+    ANSWER_EXPORT_CHUNK_SIZE: int = 1000
+
+    SURVEY_RESULTS_WORKER_ENABLED: bool = True
+    SURVEY_RESULTS_BATCH_SIZE: int = 5000
+    SURVEY_RESULTS_POLL_INTERVAL: float = 1
+    SURVEY_RESULTS_MAX_TEXTS: int = 100
+
+    DELETION_WORKER_ENABLED: bool = True
+    DELETION_BATCH_SIZE: int = 1000
+    DELETION_BATCH_PAUSE: float = 0.05
+    DELETION_POLL_INTERVAL: float = 10
+    DELETION_LEASE_SECONDS: float = 60
+    DELETION_RETRY_DELAY: float = 60
+
+    USER_CACHE_ENABLED: bool = True
+    USER_CACHE_TTL: float = 60
+    USER_CACHE_MAXSIZE: int = 10_000
+
+    SURVEY_HTTP_CACHE_MAX_AGE: int = 60
+    SURVEY_CACHE_ENABLED: bool = True
+    SURVEY_CACHE_TTL: float = 60
+    SURVEY_CACHE_MAXSIZE: int = 10_000
+
     ADMIN_FIXTURE_USERNAME: str
     ADMIN_FIXTURE_EMAIL: str
     ADMIN_FIXTURE_PASSWORD: str
@@ -1,15 +1,181 @@
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict
+
+from fastapi import Request
+from greenlet import getcurrent, greenlet
+from sqlalchemy import exc
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.settings import get_settings
 
 settings = get_settings()
 
 
-engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI)
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.connects = 0
+        self.connect_errors = 0
+        self.total_connect_seconds = 0.0
+        self.max_connect_seconds = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        self.checkouts += 1
+        self.timeouts += int(timed_out)
+        self.total_wait_seconds += seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def record_connect(self, seconds: float, failed: bool = False) -> None:
+        self.connects += 1
+        self.connect_errors += int(failed)
+        self.total_connect_seconds += seconds
+        self.max_connect_seconds = max(self.max_connect_seconds, seconds)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that measures how long a checkout waited for a free connection and, apart from that,
+    how long opening new connections took. Only the pool's TimeoutError counts as a checkout timeout.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+        # connect seconds of the checkouts in progress, by the greenlet running each of them
+        self._checkouts: Dict[greenlet, float] = dict()
+
+    def _do_get(self):
+        current = getcurrent()
+        if current in self._checkouts:
+            # QueuePool retries by calling _do_get again, it's the same checkout
+            return super()._do_get()
+        self._checkouts[current] = 0.0
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            connect_seconds = self._checkouts.pop(current)
+            self.stats.record_wait(time.perf_counter() - started - connect_seconds, timed_out=timed_out)
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        failed = True
+        try:
+            connection = super()._create_connection()
+            failed = False
+            return connection
+        finally:
+            seconds = time.perf_counter() - started
+            self.stats.record_connect(seconds, failed=failed)
+            current = getcurrent()
+            if current in self._checkouts:
+                self._checkouts[current] += seconds
+
+
+def get_engine_options() -> dict:
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.SQL_POOL_SIZE,
+        "max_overflow": settings.SQL_MAX_OVERFLOW,
+        "pool_timeout": settings.SQL_POOL_TIMEOUT,
+        "pool_recycle": settings.SQL_POOL_RECYCLE,
+        "pool_pre_ping": settings.SQL_POOL_PRE_PING,
+        "connect_args": {
+            "prepared_statement_cache_size": settings.SQL_STATEMENT_CACHE_SIZE,
+            "command_timeout": settings.SQL_COMMAND_TIMEOUT,
+        },
+    }
+
+
+engine = create_async_engine(settings.SQLALCHEMY_DATABASE_URI, **get_engine_options())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False, class_=AsyncSession)
 
 
-async def get_session() -> AsyncSession:
+def get_pool_stats() -> dict:
+    pool = engine.sync_engine.pool
+    stats = pool.stats
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.SQL_MAX_OVERFLOW,
+        "checkouts": stats.checkouts,
+        "timeouts": stats.timeouts,
+        "avg_wait_seconds": stats.total_wait_seconds / stats.checkouts if stats.checkouts else 0.0,
+        "max_wait_seconds": stats.max_wait_seconds,
+        "connects": stats.connects,
+        "connect_errors": stats.connect_errors,
+        "avg_connect_seconds": stats.total_connect_seconds / stats.connects if stats.connects else 0.0,
+        "max_connect_seconds": stats.max_connect_seconds,
+    }
+
+
+# session.info keys of a session whose transaction is committed once, by whoever opened it
+UNIT_OF_WORK = "unit_of_work"
+AFTER_COMMIT = "after_commit"
+
+
+def is_unit_of_work(session: AsyncSession) -> bool:
+    return session.info.get(UNIT_OF_WORK, False)
+
+
+async def commit(session: AsyncSession) -> None:
+    """
+    Services end their changes with it: a unit of work is only flushed, it's committed at its end.
+    """
+    if is_unit_of_work(session):
+        await session.flush()
+    else:
+        await session.commit()
+
+
+async def run_after_commit(session: AsyncSession, callback: Callable[[], Awaitable]) -> None:
+    """
+    Run callback once the changes made so far are committed, e.g. to drop cached values
+    only when other readers can't load the old ones again.
+    """
+    if is_unit_of_work(session):
+        session.info.setdefault(AFTER_COMMIT, list()).append(callback)
+    else:
+        await callback()
+
+
+async def commit_unit_of_work(session: AsyncSession) -> None:
+    await session.commit()
+    for callback in session.info.pop(AFTER_COMMIT, list()):
+        await callback()
+
+
+@asynccontextmanager
+async def unit_of_work(session_maker: sessionmaker = SessionLocal) -> AsyncIterator[AsyncSession]:
+    """
+    Session for background jobs that opt in to a single transaction: committed when the block exits
+    normally, rolled back when it raises.
+    """
+    async with session_maker() as session:
+        session.info[UNIT_OF_WORK] = True
+        yield session
+        await commit_unit_of_work(session)
+
+
+async def get_session(request: Request) -> AsyncSession:
+    """
+    With SQL_UNIT_OF_WORK the session is a unit of work of the request, UnitOfWorkRoute commits it
+    before the response is sent. An exception or an error response leaves it to be rolled back on close.
+    """
     async with SessionLocal() as session:
+        if settings.SQL_UNIT_OF_WORK:
+            session.info[UNIT_OF_WORK] = True
+            request.state.session = session
         yield session
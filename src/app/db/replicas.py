@@ -0,0 +1,143 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.settings import get_settings
+from app.db.base import SessionLocal, get_engine_options
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+# Zero while the replica streams WAL and has replayed everything it received, so an idle primary
+# doesn't look like lag. Without a WAL receiver the received position is stale, the age of the last
+# replayed transaction is used then, NULL (unhealthy) when nothing was replayed yet.
+LAG_STATEMENT = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN EXISTS (SELECT FROM pg_stat_wal_receiver)
+            AND pg_last_wal_receive_lsn() IS NOT NULL
+            AND pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+
+class Replica:
+    def __init__(self, uri: str):
+        self.host = make_url(uri).host
+        self.engine = create_async_engine(uri, **get_engine_options())
+        self.session_maker = sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            bind=self.engine,
+            expire_on_commit=False,
+            class_=AsyncSession,
+        )
+        self.healthy = False
+        self.lag_seconds: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def record_check(self, lag_seconds: Optional[float], max_lag_seconds: float, error: Optional[str] = None) -> None:
+        self.lag_seconds = lag_seconds
+        self.last_error = error
+        self.checked_at = time.monotonic()
+        self.healthy = error is None and lag_seconds is not None and lag_seconds <= max_lag_seconds
+
+    async def check(self, max_lag_seconds: float) -> None:
+        try:
+            async with self.engine.connect() as connection:
+                lag_seconds = await connection.scalar(LAG_STATEMENT)
+        except Exception as exception:
+            self.record_check(lag_seconds=None, max_lag_seconds=max_lag_seconds, error=repr(exception))
+        else:
+            lag_seconds = float(lag_seconds) if lag_seconds is not None else None
+            self.record_check(lag_seconds=lag_seconds, max_lag_seconds=max_lag_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "host": self.host,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "last_error": self.last_error,
+        }
+
+
+class ReplicaRouter:
+    """
+    Spreads read-only sessions over the replicas round robin. Replicas are checked every check_interval
+    seconds and skipped while unreachable or lagging more than max_lag_seconds; without a healthy
+    replica reads go to the primary.
+    """
+
+    def __init__(self, replicas: List[Replica], max_lag_seconds: float, check_interval: float):
+        self.replicas = replicas
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self._counter = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def choose(self) -> Optional[Replica]:
+        healthy_replicas = [replica for replica in self.replicas if replica.healthy]
+        if not healthy_replicas:
+            return None
+        return healthy_replicas[next(self._counter) % len(healthy_replicas)]
+
+    def get_session_maker(self) -> sessionmaker:
+        replica = self.choose()
+        return replica.session_maker if replica else SessionLocal
+
+    async def check(self) -> None:
+        await asyncio.gather(*[replica.check(max_lag_seconds=self.max_lag_seconds) for replica in self.replicas])
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("Replica health check failed")
+            await asyncio.sleep(self.check_interval)
+
+    def start(self) -> None:
+        if self.replicas and self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+replica_router = ReplicaRouter(
+    replicas=[Replica(uri) for uri in settings.SQL_REPLICA_URIS],
+    max_lag_seconds=settings.SQL_REPLICA_MAX_LAG,
+    check_interval=settings.SQL_REPLICA_CHECK_INTERVAL,
+)
+
+
+def get_replica_stats() -> List[dict]:
+    return [replica.stats() for replica in replica_router.replicas]
+
+
+async def get_read_session() -> AsyncSession:
+    """
+    Session for read-only endpoints, bound to a healthy replica or to the primary.
+    """
+    async with replica_router.get_session_maker()() as session:
+        yield session
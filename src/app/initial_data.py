@@ -5,7 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.security import get_password_hash
 from app.core.settings import get_settings
-from app.db.base import SessionLocal
+from app.db.base import unit_of_work
 from app.models import User
 from app.services import base as base_services
 
@@ -47,7 +47,7 @@ async def create_admin_user(
 
 
 async def main() -> None:
-    async with SessionLocal() as session:
+    async with unit_of_work() as session:
         await create_admin_user(session=session)
 
 
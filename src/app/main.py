@@ -1,9 +1,42 @@
 from fastapi import FastAPI
 from fastapi_pagination import add_pagination
 
+from app.api.responses import get_response_class
 from app.api.routes import router
+from app.core.deletions import deletion_worker
+from app.core.emails import compile_templates, outbox_worker
+from app.core.metrics import MetricsMiddleware
+from app.core.results import survey_result_worker
+from app.core.security import password_hasher
+from app.core.settings import get_settings
+from app.db.replicas import replica_router
 
-app = FastAPI()
+settings = get_settings()
+
+app = FastAPI(default_response_class=get_response_class())
 app.include_router(router)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 add_pagination(app)
+
+
+@app.on_event("startup")
+async def startup() -> None:
+    compile_templates()
+    replica_router.start()
+    if settings.EMAIL_OUTBOX_WORKER_ENABLED:
+        outbox_worker.start()
+    if settings.DELETION_WORKER_ENABLED:
+        deletion_worker.start()
+    if settings.SURVEY_RESULTS_WORKER_ENABLED:
+        survey_result_worker.start()
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    password_hasher.shutdown()
+    await outbox_worker.stop()
+    await deletion_worker.stop()
+    await survey_result_worker.stop()
+    await replica_router.stop()
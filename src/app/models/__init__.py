@@ -1,4 +1,8 @@
 from .auth import Verification
-from .base import Base, UUIDMixin
-from .survey import Answer, AnswerAttribute, Survey, SurveyAttribute
+from .base import Base, SoftDeleteMixin, UUIDMixin
+from .deletion import DeletionJob
+from .email import EmailOutbox
+from .survey import (
+    Answer, AnswerAttribute, Survey, SurveyAttribute, SurveyAttributeResult, SurveyResult, SurveyResultDelta,
+)
 from .user import User
@@ -1,10 +1,11 @@
 import uuid
 from typing import Any, TypeVar
 
-from sqlalchemy import Column, inspect
+from sqlalchemy import Column, DateTime, event, inspect, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.exc import NoInspectionAvailable
 from sqlalchemy.ext.declarative import as_declarative, declared_attr
+from sqlalchemy.orm import ORMExecuteState, Session, with_loader_criteria
 
 
 @as_declarative()
@@ -41,8 +42,37 @@ class Base:
         return to_return
 
 
+# Rendered inline rather than bound, otherwise PostgreSQL can't match queries to the expression indexes
+SEARCH_CONFIG = text("'simple'::regconfig")
+
+
 class UUIDMixin:
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
 
+class SoftDeleteMixin:
+    """
+    Rows marked with deleted_at are hidden from every ORM SELECT until they are purged. Queries that
+    have to see them, like the purge itself, opt out with execution_options(include_deleted=True).
+    """
+    deleted_at = Column(DateTime)
+
+
+INCLUDE_DELETED = "include_deleted"
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _hide_deleted_rows(execute_state: ORMExecuteState) -> None:
+    # UPDATE and DELETE statements aren't filtered, they have to exclude deleted rows themselves
+    if (
+        execute_state.is_select
+        and not execute_state.is_column_load
+        and not execute_state.is_relationship_load
+        and not execute_state.execution_options.get(INCLUDE_DELETED, False)
+    ):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(SoftDeleteMixin, lambda cls: cls.deleted_at.is_(None), include_aliases=True)
+        )
+
+
 BaseModel = TypeVar("BaseModel", bound=Base)
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+from sqlalchemy.dialects.postgresql import UUID
+
+from .base import Base, UUIDMixin
+
+
+class DeletionJob(UUIDMixin, Base):
+    """
+    Purge of a soft deleted survey or user, done in batches by the deletion worker.
+    The counters are updated with every batch and rows are kept once done to report progress.
+    """
+    target = Column(String(length=16), nullable=False)
+    target_id = Column(UUID(as_uuid=True), nullable=False)
+    # who asked for the deletion, the user itself for user deletions
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    status = Column(String(length=16), nullable=False, default="pending")
+    deleted_surveys = Column(Integer, nullable=False, default=0)
+    deleted_survey_attrs = Column(Integer, nullable=False, default=0)
+    deleted_answers = Column(Integer, nullable=False, default=0)
+    deleted_answer_attrs = Column(Integer, nullable=False, default=0)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.now)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.now)
+    finished_at = Column(DateTime)
+
+
+# the worker only looks for unfinished jobs which are due
+Index(
+    "ix_deletionjob_unfinished_next_attempt_at",
+    DeletionJob.next_attempt_at,
+    postgresql_where=DeletionJob.status != "done",
+)
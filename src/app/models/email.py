@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+
+from .base import Base, UUIDMixin
+
+
+class EmailOutbox(UUIDMixin, Base):
+    """
+    Rendered emails waiting for delivery. Rows are claimed by the outbox worker and kept once sent or failed,
+    without their body, which may hold password reset or verification links.
+    """
+    email_to = Column(String(length=255), nullable=False)
+    subject = Column(String(length=255), nullable=False)
+    body = Column(Text)
+    status = Column(String(length=16), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.now)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.now)
+    sent_at = Column(DateTime)
+
+
+# the worker only looks for pending emails which are due
+Index(
+    "ix_emailoutbox_pending_next_attempt_at",
+    EmailOutbox.next_attempt_at,
+    postgresql_where=EmailOutbox.status == "pending",
+)
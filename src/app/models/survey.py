@@ -1,18 +1,38 @@
 from datetime import datetime
 
-from sqlalchemy import Column, String, DateTime, Text, Boolean, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Boolean, Column, Computed, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint, and_, column,
+    func, text,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
+from sqlalchemy.orm import deferred, relationship
 
-from .base import Base, UUIDMixin
+from .base import Base, SoftDeleteMixin, UUIDMixin, SEARCH_CONFIG
 from .user import User
 
 
-class Survey(UUIDMixin, Base):
-    name = Column(String(length=255))
+def _weighted_search_vector(column_name: str, weight: str):
+    return func.setweight(
+        func.to_tsvector(SEARCH_CONFIG, func.coalesce(column(column_name), text("''"))),
+        text(f"'{weight}'"),
+    )
+
+
+class Survey(SoftDeleteMixin, UUIDMixin, Base):
+    # not nullable: lists are paged by a (name, created_at, id) row comparison, which skips NULLs
+    name = Column(String(length=255), nullable=False)
     available = Column(Boolean)
     description = Column(Text)
-    created_at = Column(DateTime, default=datetime.now)
+    created_at = Column(DateTime, default=datetime.now, server_default=func.now(), nullable=False)
+    # Name lexemes are weighted A and description ones B, so a tsquery can target either of them.
+    # Stored, so searches neither tokenize the texts nor need them to rank; deferred, as only searches read it.
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(_weighted_search_vector("name", "A").op("||")(_weighted_search_vector("description", "B"))),
+    ))
+    # bumped by every change of the survey or its attributes, validators for conditional GETs
+    updated_at = Column(DateTime, default=datetime.now, server_default=func.now(), nullable=False)
+    version = Column(Integer, default=1, server_default=text("1"), nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey(User.id), nullable=False)
     user = relationship("User", back_populates="surveys")
     attrs = relationship("SurveyAttribute", passive_deletes=True)
@@ -20,7 +40,8 @@ class Survey(UUIDMixin, Base):
 
 
 class Answer(UUIDMixin, Base):
-    created_at = Column(DateTime, default=datetime.now)
+    # not nullable: answers are paged by a (created_at, id) row comparison, which skips NULLs
+    created_at = Column(DateTime, default=datetime.now, server_default=func.now(), nullable=False)
     available = Column(Boolean)
     survey_id = Column(UUID(as_uuid=True), ForeignKey(Survey.id), nullable=False)
     survey = relationship("Survey", back_populates="answers")
@@ -28,18 +49,92 @@ class Answer(UUIDMixin, Base):
     user = relationship("User", back_populates="answers")
     attrs = relationship("AnswerAttribute", passive_deletes=True)
 
+    # one answer per user and survey, also serves lookups by user_id
+    __table_args__ = (UniqueConstraint("user_id", "survey_id", name="uq_answer_user_id_survey_id"),)
+
 
 class SurveyAttribute(UUIDMixin, Base):
     question = Column(Text)
     required = Column(Boolean)
     available = Column(Boolean, default=True)
-    survey_id = Column(UUID(as_uuid=True), ForeignKey(Survey.id, ondelete="CASCADE"), nullable=False)
+    survey_id = Column(UUID(as_uuid=True), ForeignKey(Survey.id, ondelete="CASCADE"), nullable=False, index=True)
     survey = relationship("Survey", back_populates="attrs")
     answer_attrs = relationship("AnswerAttribute", passive_deletes=True)
 
 
 class AnswerAttribute(UUIDMixin, Base):
     text = Column(String(length=255))
-    survey_attr_id = Column(UUID(as_uuid=True), ForeignKey(SurveyAttribute.id, ondelete="CASCADE"), nullable=False)
-    answer_id = Column(UUID(as_uuid=True), ForeignKey(Answer.id, ondelete="CASCADE"), nullable=False)
+    survey_attr_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey(SurveyAttribute.id, ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    answer_id = Column(UUID(as_uuid=True), ForeignKey(Answer.id, ondelete="CASCADE"), nullable=False, index=True)
     answer = relationship("Answer", back_populates="attrs")
+
+
+class SurveyResult(UUIDMixin, Base):
+    """
+    Running totals of a survey, folded in from SurveyResultDelta by the results worker.
+    """
+    survey_id = Column(UUID(as_uuid=True), ForeignKey(Survey.id, ondelete="CASCADE"), nullable=False, unique=True)
+    answers_count = Column(Integer, nullable=False, default=0)
+
+
+class SurveyAttributeResult(UUIDMixin, Base):
+    """
+    How many times each distinct text was given to a survey attribute. Only the first SURVEY_RESULTS_MAX_TEXTS
+    texts of an attribute get a row, the rest are counted together in the row without text.
+    """
+    survey_attr_id = Column(UUID(as_uuid=True), ForeignKey(SurveyAttribute.id, ondelete="CASCADE"), nullable=False)
+    text = Column(String(length=255))
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("survey_attr_id", "text", name="uq_surveyattributeresult_survey_attr_id_text"),
+    )
+
+
+class SurveyResultDelta(UUIDMixin, Base):
+    """
+    Change of the results not folded into the summary tables yet. The answer services only append these,
+    so concurrent answers to one survey don't queue on its summary rows. Either survey_id (a change of
+    answers_count) or survey_attr_id (a change of the count of text) is set.
+    """
+    survey_id = Column(UUID(as_uuid=True), ForeignKey(Survey.id, ondelete="CASCADE"), index=True)
+    survey_attr_id = Column(UUID(as_uuid=True), ForeignKey(SurveyAttribute.id, ondelete="CASCADE"), index=True)
+    text = Column(String(length=255))
+    count = Column(Integer, nullable=False)
+
+
+# Survey lists are always ordered by (name, created_at, id), so the indexes carry the whole ordering.
+# Every read excludes deleted surveys, so the partial index doesn't keep them.
+Index("ix_survey_user_id_ordering", Survey.user_id, Survey.name, Survey.created_at, Survey.id)
+Index(
+    "ix_survey_available_ordering",
+    Survey.name,
+    Survey.created_at,
+    Survey.id,
+    postgresql_where=and_(Survey.available.is_(True), Survey.deleted_at.is_(None)),
+)
+Index("ix_answer_survey_id_ordering", Answer.survey_id, Answer.created_at, Answer.id)
+# NULLs aren't equal for uq_surveyattributeresult_survey_attr_id_text, the other texts row needs its own arbiter
+Index(
+    "uq_surveyattributeresult_survey_attr_id_others",
+    SurveyAttributeResult.survey_attr_id,
+    unique=True,
+    postgresql_where=SurveyAttributeResult.text.is_(None),
+)
+
+Index("ix_survey_search_vector", Survey.search_vector, postgresql_using="gin")
+
+# Trigram indexes serve the substring (LIKE '%value%') searches of /survey/search. pg_trgm is created
+# with the user table, which survey references and so is created first.
+for column_name in ("name", "description"):
+    Index(
+        f"ix_survey_{column_name}_trgm",
+        getattr(Survey, column_name),
+        postgresql_using="gin",
+        postgresql_ops={column_name: "gin_trgm_ops"},
+    )
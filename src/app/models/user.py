@@ -1,12 +1,12 @@
 from datetime import datetime
 
-from sqlalchemy import Column, String, DATE, DateTime, Boolean
+from sqlalchemy import Column, String, DATE, DateTime, Boolean, DDL, Index, event
 from sqlalchemy.orm import relationship
 
-from .base import UUIDMixin, Base
+from .base import SoftDeleteMixin, UUIDMixin, Base
 
 
-class User(UUIDMixin, Base):
+class User(SoftDeleteMixin, UUIDMixin, Base):
     username = Column(String(length=255), unique=True)
     email = Column(String(length=255), unique=True)
     password = Column(String(length=100))
@@ -19,3 +19,15 @@ class User(UUIDMixin, Base):
     is_superuser = Column(Boolean, default=False)
     surveys = relationship("Survey", back_populates="user")
     answers = relationship("Answer", back_populates="user")
+
+
+event.listen(User.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+# Trigram indexes serve the substring (LIKE '%value%') searches of /user/search
+for column_name in ("username", "email", "first_name", "last_name"):
+    Index(
+        f"ix_user_{column_name}_trgm",
+        getattr(User, column_name),
+        postgresql_using="gin",
+        postgresql_ops={column_name: "gin_trgm_ops"},
+    )
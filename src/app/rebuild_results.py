@@ -0,0 +1,30 @@
+import argparse
+import asyncio
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import SessionLocal
+from app.models import Survey
+from app.services import result as result_services
+
+
+async def main(survey_ids: Optional[List[UUID]] = None, session_maker: sessionmaker = SessionLocal) -> None:
+    """
+    Recount the results of the given surveys, or of every survey, one survey per transaction.
+    """
+    if not survey_ids:
+        async with session_maker() as session:
+            result = await session.execute(select(Survey.id).order_by(Survey.id))
+            survey_ids = result.scalars().all()
+    for survey_id in survey_ids:
+        async with session_maker() as session:
+            await result_services.rebuild_survey_results(session=session, survey_id=survey_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild survey results from the stored answers.")
+    parser.add_argument("survey_ids", nargs="*", type=UUID)
+    asyncio.run(main(survey_ids=parser.parse_args().survey_ids))
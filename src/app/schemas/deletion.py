@@ -0,0 +1,21 @@
+import datetime
+from typing import Optional
+
+from pydantic import BaseModel, UUID4
+
+
+class DeletionJobOut(BaseModel):
+    id: UUID4
+    target: str
+    target_id: UUID4
+    status: str
+    deleted_surveys: int
+    deleted_survey_attrs: int
+    deleted_answers: int
+    deleted_answer_attrs: int
+    last_error: Optional[str]
+    created_at: datetime.datetime
+    finished_at: Optional[datetime.datetime]
+
+    class Config:
+        orm_mode = True
@@ -0,0 +1,33 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class PoolStats(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    max_overflow: int
+    checkouts: int
+    timeouts: int
+    avg_wait_seconds: float
+    max_wait_seconds: float
+    connects: int
+    connect_errors: int
+    avg_connect_seconds: float
+    max_connect_seconds: float
+
+
+class ReplicaStats(BaseModel):
+    host: Optional[str]
+    healthy: bool
+    lag_seconds: Optional[float]
+    last_error: Optional[str]
+
+
+class CacheStats(BaseModel):
+    namespace: str
+    hits: int
+    misses: int
+    hit_ratio: float
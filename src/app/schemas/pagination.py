@@ -0,0 +1,17 @@
+from typing import Generic, List, Optional, TypeVar
+
+from pydantic import BaseModel, conint
+from pydantic.generics import GenericModel
+
+ItemType = TypeVar("ItemType")
+
+
+class CursorParams(BaseModel):
+    cursor: Optional[str] = None
+    size: conint(ge=1, le=100) = 50
+
+
+class CursorPage(GenericModel, Generic[ItemType]):
+    items: List[ItemType]
+    size: int
+    next_cursor: Optional[str]
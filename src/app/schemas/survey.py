@@ -1,4 +1,5 @@
 import datetime
+from enum import Enum
 from typing import List, Optional
 
 from pydantic import BaseModel, constr, UUID4
@@ -91,6 +92,23 @@ class AnswerCreateOut(BaseAnswer):
     id: UUID4
 
 
+class BatchAnswer(BaseAnswer):
+    user_id: UUID4
+
+
+class BatchAnswerItemResult(BaseModel):
+    index: int
+    status_code: int
+    id: Optional[UUID4]
+    detail: Optional[str]
+
+
+class BatchAnswerReport(BaseModel):
+    created: int
+    failed: int
+    items: List[BatchAnswerItemResult]
+
+
 class AnswerAttributeRetrieve(BaseModel):
     id: UUID4
     text: constr(max_length=255)
@@ -107,3 +125,38 @@ class AnswerRetrieve(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class SurveyAnswerOut(AnswerRetrieve):
+    user_id: UUID4
+    created_at: datetime.datetime
+
+
+class AnswerFilter(BaseModel):
+    created_from: Optional[datetime.datetime]
+    created_to: Optional[datetime.datetime]
+
+
+class AnswerTextCount(BaseModel):
+    text: str
+    count: int
+
+
+class SurveyAttributeResults(BaseModel):
+    survey_attr_id: UUID4
+    question: str
+    responses: int
+    # responses with texts past SURVEY_RESULTS_MAX_TEXTS, which aren't counted one by one
+    others: int = 0
+    answers: List[AnswerTextCount]
+
+
+class SurveyResults(BaseModel):
+    survey_id: UUID4
+    answers_count: int
+    attrs: List[SurveyAttributeResults]
+
+
+class AnswerExportFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
@@ -1,28 +1,65 @@
-from typing import List, Optional
-from uuid import UUID
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
 
+from asyncpg.exceptions import UniqueViolationError
 from fastapi import HTTPException
-from sqlalchemy import select, delete
-from sqlalchemy.exc import NoResultFound
+from pydantic import ValidationError
+from sqlalchemy import select, delete, exists, func, insert
+from sqlalchemy.exc import IntegrityError, NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import subqueryload
+from sqlalchemy.orm import selectinload, subqueryload
 from sqlalchemy.orm.collections import InstrumentedList
 
 from app.core.exceptions import raise_404
+from app.core.settings import get_settings
+from app.db.base import commit
 from app.models import Answer, Survey, SurveyAttribute, User, AnswerAttribute
 from app.schemas import survey as schemas
+from app.schemas.pagination import CursorPage, CursorParams
 from app.services import base as base_services
+from app.services import result as result_services
+from app.services.pagination import paginate_by_keyset
 
+settings = get_settings()
 
-async def create_answer_attrs(session: AsyncSession, attrs: List[schemas.AnswerAttribute], answer_id: UUID):
+ANSWER_ORDERING = (Answer.created_at, Answer.id)
+
+
+async def insert_answer_attrs(
+    session: AsyncSession,
+    attrs: List[schemas.AnswerAttribute],
+    answer_id: UUID,
+) -> List[AnswerAttribute]:
+    if not attrs:
+        return list()
     to_insert = list()
     for attr in attrs:
         attr = attr.dict()
         attr["answer_id"] = answer_id
-        to_insert.append(AnswerAttribute(**attr))
-    session.add_all(to_insert)
-    await session.commit()
-    return to_insert
+        to_insert.append(attr)
+    result = await session.execute(insert(AnswerAttribute).values(to_insert).returning(AnswerAttribute))
+    attrs = [AnswerAttribute(**dict(row)) for row in result.all()]
+    await result_services.add_answer_attrs_to_results(
+        session=session,
+        attrs=[(attr.survey_attr_id, attr.text) for attr in attrs],
+    )
+    return attrs
+
+
+async def create_answer_attrs(session: AsyncSession, attrs: List[schemas.AnswerAttribute], answer_id: UUID):
+    attrs = await insert_answer_attrs(session=session, attrs=attrs, answer_id=answer_id)
+    await commit(session)
+    return attrs
+
+
+def get_duplicate_survey_attr_ids(attrs: List[schemas.AnswerAttribute]) -> List[str]:
+    survey_attr_ids = [str(attr.survey_attr_id) for attr in attrs]
+    if len(set(survey_attr_ids)) == len(survey_attr_ids):
+        return list()
+    return sorted({id_ for id_ in survey_attr_ids if survey_attr_ids.count(id_) > 1})
 
 
 class CreateAnswer:
@@ -40,27 +77,31 @@ class CreateAnswer:
         return inserted_answer
 
     async def _validate_answer(self):
-        statement = select(Survey).where(Survey.id == self._survey_id)
-        if not await base_services.is_object_exists(session=self._session, where_statement=statement):
-            await raise_404()
-        statement = select(Answer).where(Answer.user_id == self._user_id, Answer.survey_id == self._survey_id)
-        if await base_services.is_object_exists(session=self._session, where_statement=statement):
-            raise HTTPException(status_code=409, detail="Answer is already exists")
         survey_attr_ids = [answer_attr.survey_attr_id for answer_attr in self._answer.attrs]
-        statement = select(SurveyAttribute).where(
-            SurveyAttribute.id.in_(
-                survey_attr_ids
+        duplicate_survey_attrs = get_duplicate_survey_attr_ids(self._answer.attrs)
+        if duplicate_survey_attrs:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Got duplicate survey attributes with ids: [{', '.join(duplicate_survey_attrs)}]"
             )
+        statement = select(
+            exists().where(Survey.id == self._survey_id, Survey.deleted_at.is_(None)),
+            select(func.array_agg(SurveyAttribute.id)).where(
+                SurveyAttribute.survey_id == self._survey_id,
+                SurveyAttribute.id.in_(survey_attr_ids),
+            ).scalar_subquery(),
         )
         result = await self._session.execute(statement)
-        attrs = result.scalars().all()
-        if len(self._answer.attrs) != len(attrs):
-            not_exist_survey_attrs = ", ".join(
-                [str(id_) for id_ in (set(survey_attr_ids).difference([attr.id for attr in attrs]))]
-            )
+        is_survey_exists, found_attr_ids = result.one()
+        if not is_survey_exists:
+            await raise_404()
+        not_exist_survey_attrs = {str(id_) for id_ in survey_attr_ids}.difference(
+            str(id_) for id_ in found_attr_ids or list()
+        )
+        if not_exist_survey_attrs:
             raise HTTPException(
                 status_code=404,
-                detail=f"Got not exist survey attributes with ids: [{not_exist_survey_attrs}]"
+                detail=f"Got not exist survey attributes with ids: [{', '.join(not_exist_survey_attrs)}]"
             )
 
     async def _prepare_data(self) -> dict:
@@ -70,16 +111,170 @@ class CreateAnswer:
         return data
 
     async def _insert_answer(self, data: dict, attrs: List[schemas.AnswerAttribute]) -> Answer:
-        answer = await base_services.insert_object(
-            session=self._session,
-            model=Answer,
-            to_insert=data,
-        )
-        attrs = await create_answer_attrs(session=self._session, attrs=attrs, answer_id=answer.id)
+        # uq_answer_user_id_survey_id rejects a second answer of the same user. Only the savepoint is
+        # rolled back then, the transaction of the caller and the objects it loaded are left as they are.
+        try:
+            async with self._session.begin_nested():
+                result = await self._session.execute(insert(Answer).values(**data).returning(Answer))
+                answer = Answer(**dict(result.one()))
+                attrs = await insert_answer_attrs(session=self._session, attrs=attrs, answer_id=answer.id)
+                await result_services.add_answers_to_results(
+                    session=self._session,
+                    survey_id=self._survey_id,
+                    count=1,
+                )
+        except IntegrityError as exception:
+            if isinstance(exception.orig.__cause__, UniqueViolationError):
+                raise HTTPException(status_code=409, detail="Answer is already exists")
+            raise
+        await commit(self._session)
         answer.__dict__["attrs"] = InstrumentedList(attrs)
         return answer
 
 
+class CreateAnswerBatch:
+    """
+    Bulk counterpart of CreateAnswer for survey owners uploading answers collected elsewhere.
+    Items are validated set-wise against the survey attributes, existing users and existing answers,
+    every valid item is inserted in one transaction and each item gets its own result.
+    """
+
+    def __init__(self, session: AsyncSession, items: List[Any], survey_id: UUID, user: User):
+        self._session = session
+        self._items = items
+        self._survey_id = survey_id
+        self._user = user
+        self._parse_errors = dict()
+
+    async def execute(self) -> schemas.BatchAnswerReport:
+        survey_attr_ids = await self._validate_survey()
+        answers = self._parse_items()
+        user_ids = {answer.user_id for answer in answers.values()}
+        existing_user_ids, answered_user_ids = await self._load_users(user_ids=user_ids)
+        results = dict()
+        answers_to_insert, attrs_to_insert = list(), list()
+        for index, answer in answers.items():
+            error = self._validate_item(
+                answer=answer,
+                survey_attr_ids=survey_attr_ids,
+                existing_user_ids=existing_user_ids,
+                answered_user_ids=answered_user_ids,
+            )
+            if error:
+                results[index] = schemas.BatchAnswerItemResult(index=index, status_code=error[0], detail=error[1])
+                continue
+            answer_id = uuid4()
+            answered_user_ids.add(str(answer.user_id))
+            data = await self._prepare_data(answer=answer, answer_id=answer_id)
+            answers_to_insert.append(data)
+            attrs_to_insert.extend({**attr.dict(), "answer_id": answer_id} for attr in answer.attrs)
+            results[index] = schemas.BatchAnswerItemResult(index=index, status_code=201, id=answer_id)
+        await self._insert_answers(answers=answers_to_insert, attrs=attrs_to_insert)
+        for index, error in self._parse_errors.items():
+            results[index] = schemas.BatchAnswerItemResult(index=index, status_code=422, detail=error)
+        items = [results[index] for index in sorted(results)]
+        created = len(answers_to_insert)
+        return schemas.BatchAnswerReport(created=created, failed=len(items) - created, items=items)
+
+    async def _validate_survey(self) -> set:
+        statement = select(
+            Survey.user_id,
+            select(func.array_agg(SurveyAttribute.id)).where(
+                SurveyAttribute.survey_id == Survey.id,
+            ).scalar_subquery(),
+        ).where(Survey.id == self._survey_id)
+        result = await self._session.execute(statement)
+        try:
+            owner_id, survey_attr_ids = result.one()
+        except NoResultFound:
+            await raise_404()
+        if owner_id != self._user.id and not self._user.is_superuser:
+            raise HTTPException(status_code=403, detail="You can't add answers to this survey.")
+        return {str(id_) for id_ in survey_attr_ids or list()}
+
+    def _parse_items(self) -> dict:
+        answers = dict()
+        for index, item in enumerate(self._items):
+            try:
+                answers[index] = schemas.BatchAnswer.parse_obj(item)
+            except ValidationError as exception:
+                self._parse_errors[index] = str(exception)
+        return answers
+
+    async def _load_users(self, user_ids: set) -> tuple[set, set]:
+        if not user_ids:
+            return set(), set()
+        statement = select(
+            User.id,
+            exists().where(Answer.user_id == User.id, Answer.survey_id == self._survey_id),
+        ).where(User.id.in_(user_ids))
+        result = await self._session.execute(statement)
+        existing_user_ids, answered_user_ids = set(), set()
+        for user_id, is_answered in result.all():
+            existing_user_ids.add(str(user_id))
+            if is_answered:
+                answered_user_ids.add(str(user_id))
+        return existing_user_ids, answered_user_ids
+
+    @staticmethod
+    def _validate_item(
+            answer: schemas.BatchAnswer,
+            survey_attr_ids: set,
+            existing_user_ids: set,
+            answered_user_ids: set,
+    ) -> Optional[tuple[int, str]]:
+        if str(answer.user_id) not in existing_user_ids:
+            return 404, f"User with id: {answer.user_id} doesn't exist."
+        if str(answer.user_id) in answered_user_ids:
+            return 409, "Answer is already exists"
+        duplicate_survey_attrs = get_duplicate_survey_attr_ids(answer.attrs)
+        if duplicate_survey_attrs:
+            return 400, f"Got duplicate survey attributes with ids: [{', '.join(duplicate_survey_attrs)}]"
+        not_exist_survey_attrs = {str(attr.survey_attr_id) for attr in answer.attrs}.difference(survey_attr_ids)
+        if not_exist_survey_attrs:
+            return 404, f"Got not exist survey attributes with ids: [{', '.join(not_exist_survey_attrs)}]"
+        return None
+
+    async def _prepare_data(self, answer: schemas.BatchAnswer, answer_id: UUID) -> dict:
+        data = answer.dict(exclude={"attrs"})
+        data["id"] = answer_id
+        data["survey_id"] = self._survey_id
+        return data
+
+    async def _insert_answers(self, answers: List[dict], attrs: List[dict]) -> None:
+        if not answers:
+            return
+        # a conflict only rolls back the savepoint, as in CreateAnswer
+        try:
+            async with self._session.begin_nested():
+                await base_services.bulk_insert_objects(
+                    session=self._session,
+                    model=Answer,
+                    to_insert=answers,
+                    chunk_size=settings.ANSWER_BATCH_CHUNK_SIZE,
+                )
+                await base_services.bulk_insert_objects(
+                    session=self._session,
+                    model=AnswerAttribute,
+                    to_insert=attrs,
+                    chunk_size=settings.ANSWER_BATCH_CHUNK_SIZE,
+                )
+                await result_services.add_answers_to_results(
+                    session=self._session,
+                    survey_id=self._survey_id,
+                    count=len(answers),
+                )
+                await result_services.add_answer_attrs_to_results(
+                    session=self._session,
+                    attrs=[(attr["survey_attr_id"], attr["text"]) for attr in attrs],
+                )
+        except IntegrityError as exception:
+            if isinstance(exception.orig.__cause__, UniqueViolationError):
+                raise HTTPException(status_code=409, detail="Some answers were added concurrently, retry the batch.")
+            raise
+        await commit(self._session)
+
+
 async def delete_answer(session: AsyncSession, user: User, answer_id: UUID) -> None:
     try:
         statement = select(Answer.user_id).where(Answer.id == answer_id)
@@ -87,16 +282,27 @@ async def delete_answer(session: AsyncSession, user: User, answer_id: UUID) -> N
         answer_user_id = result.one()[0]
         if answer_user_id != user.id:
             raise HTTPException(status_code=403, detail="You aren't author of this answer")
-        statement = delete(Answer).where(Answer.id == answer_id)
-        await session.execute(statement)
-        await session.commit()
+        # attributes are deleted explicitly to subtract exactly the rows removed by this transaction
+        statement = delete(AnswerAttribute).where(AnswerAttribute.answer_id == answer_id).returning(
+            AnswerAttribute.survey_attr_id, AnswerAttribute.text,
+        )
+        result = await session.execute(statement)
+        deleted_attrs = result.all()
+        statement = delete(Answer).where(Answer.id == answer_id).returning(Answer.survey_id)
+        result = await session.execute(statement)
+        survey_id = result.scalar_one()
+        await result_services.add_answer_attrs_to_results(session=session, attrs=deleted_attrs, sign=-1)
+        await result_services.add_answers_to_results(session=session, survey_id=survey_id, count=-1)
+        await commit(session)
     except NoResultFound:
         await raise_404()
 
 
 async def get_answer(session: AsyncSession, answer_id: UUID, user: Optional[User] = None) -> Answer:
     try:
-        statement = select(Answer).options(subqueryload(Answer.attrs)).where(Answer.id == answer_id)
+        # joined to hide answers of deleted surveys and users until they are purged
+        statement = select(Answer).options(subqueryload(Answer.attrs)).join(Answer.survey).join(Answer.user) \
+            .where(Answer.id == answer_id)
         result = await session.execute(statement)
         answer = result.one()[0]
         if not answer.available:
@@ -105,3 +311,141 @@ async def get_answer(session: AsyncSession, answer_id: UUID, user: Optional[User
         return answer
     except NoResultFound:
         await raise_404()
+
+
+async def _check_answers_access(session: AsyncSession, survey_id: UUID, user: User, forbidden_detail: str) -> None:
+    # answers of a survey are read in bulk only by its author and superusers
+    statement = select(Survey.user_id).where(Survey.id == survey_id)
+    result = await session.execute(statement)
+    try:
+        owner_id = result.one()[0]
+    except NoResultFound:
+        await raise_404()
+    if owner_id != user.id and not user.is_superuser:
+        raise HTTPException(status_code=403, detail=forbidden_detail)
+
+
+async def get_survey_answers_page(
+        session: AsyncSession,
+        survey_id: UUID,
+        user: User,
+        params: CursorParams,
+        filter: schemas.AnswerFilter,
+) -> CursorPage:
+    """
+    Page through answers of the survey in (created_at, id) order, which ix_answer_survey_id_ordering
+    serves for any date range. Attributes of the whole page are loaded by one extra SELECT ... IN.
+    """
+    await _check_answers_access(
+        session=session,
+        survey_id=survey_id,
+        user=user,
+        forbidden_detail="You can't see answers of this survey.",
+    )
+    # joined to User only to hide answers of deleted users until they are purged,
+    # unavailable answers are hidden from the survey owner as get_answer does
+    statement = select(Answer).options(selectinload(Answer.attrs)).join(Answer.user) \
+        .where(Answer.survey_id == survey_id, Answer.available.is_(True))
+    if filter.created_from:
+        statement = statement.where(Answer.created_at >= filter.created_from)
+    if filter.created_to:
+        statement = statement.where(Answer.created_at <= filter.created_to)
+    page = await paginate_by_keyset(session=session, statement=statement, ordering=ANSWER_ORDERING, params=params)
+    return page
+
+
+async def get_survey_attrs_for_export(session: AsyncSession, survey_id: UUID, user: User) -> List[SurveyAttribute]:
+    """
+    Check that user may export answers of the survey and return the attributes that become export columns.
+    Done before the response starts, as errors can't be reported once streaming has begun.
+    """
+    await _check_answers_access(
+        session=session,
+        survey_id=survey_id,
+        user=user,
+        forbidden_detail="You can't export answers of this survey.",
+    )
+    statement = select(SurveyAttribute).where(SurveyAttribute.survey_id == survey_id).order_by(SurveyAttribute.id)
+    result = await session.execute(statement)
+    return result.scalars().all()
+
+
+async def _stream_answers(session: AsyncSession, survey_id: UUID) -> AsyncIterator[Tuple[tuple, Dict[UUID, str]]]:
+    """
+    Read answers of the survey through a server side cursor and pivot their attributes into one
+    {survey_attr_id: text} dict per answer, so memory doesn't depend on the number of answers.
+    """
+    statement = select(
+        Answer.id,
+        Answer.user_id,
+        Answer.created_at,
+        AnswerAttribute.survey_attr_id,
+        AnswerAttribute.text,
+    ).join(
+        Answer.user,
+    ).outerjoin(
+        AnswerAttribute, AnswerAttribute.answer_id == Answer.id,
+    ).where(
+        Answer.survey_id == survey_id,
+        # the same answers get_survey_answers_page lists: available ones of not deleted users
+        Answer.available.is_(True),
+    ).order_by(Answer.created_at, Answer.id)
+    result = await session.stream(statement)
+    answer, attrs = None, dict()
+    async for rows in result.partitions(settings.ANSWER_EXPORT_CHUNK_SIZE):
+        for answer_id, user_id, created_at, survey_attr_id, text in rows:
+            if answer is None or answer[0] != answer_id:
+                if answer is not None:
+                    yield answer, attrs
+                answer, attrs = (answer_id, user_id, created_at), dict()
+            if survey_attr_id is not None:
+                attrs[survey_attr_id] = text
+    if answer is not None:
+        yield answer, attrs
+
+
+async def export_answers_csv(
+        session: AsyncSession,
+        survey_id: UUID,
+        survey_attrs: List[SurveyAttribute],
+) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["id", "user_id", "created_at", *[survey_attr.question for survey_attr in survey_attrs]])
+    count = 0
+    async for (answer_id, user_id, created_at), attrs in _stream_answers(session=session, survey_id=survey_id):
+        writer.writerow(
+            [
+                answer_id,
+                user_id,
+                created_at.isoformat() if created_at else "",
+                *[attrs.get(survey_attr.id, "") for survey_attr in survey_attrs],
+            ]
+        )
+        count += 1
+        if count % settings.ANSWER_EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+async def export_answers_ndjson(
+        session: AsyncSession,
+        survey_id: UUID,
+        survey_attrs: List[SurveyAttribute],
+) -> AsyncIterator[str]:
+    lines = list()
+    async for (answer_id, user_id, created_at), attrs in _stream_answers(session=session, survey_id=survey_id):
+        line = {
+            "id": str(answer_id),
+            "user_id": str(user_id),
+            "created_at": created_at.isoformat() if created_at else None,
+            "attrs": {str(survey_attr_id): text for survey_attr_id, text in attrs.items()},
+        }
+        lines.append(json.dumps(line))
+        if len(lines) == settings.ANSWER_EXPORT_CHUNK_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = list()
+    if lines:
+        yield "\n".join(lines) + "\n"
@@ -3,12 +3,12 @@ from typing import Optional
 from uuid import UUID
 
 import jwt
-from fastapi import BackgroundTasks, HTTPException
+from fastapi import HTTPException
 from sqlalchemy import select, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.emails import send_reset_password_email
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_password_async, verify_verification_token
 from app.core.settings import get_settings
 from app.models.auth import Verification
 from app.models.user import User
@@ -21,7 +21,7 @@ settings = get_settings()
 async def authenticate(session: AsyncSession, login: str, password: str) -> User:
     statement = select(User).where(or_(User.username == login, User.email == login))
     user = await base_services.get_object(session=session, statement=statement)
-    if not verify_password(password, user.password):
+    if not await verify_password_async(password, user.password):
         raise HTTPException(
             status_code=400,
             detail="Provided password is incorrect",
@@ -39,6 +39,7 @@ async def create_verification(session: AsyncSession, user_id: UUID) -> Verificat
 
 
 async def verify_registration_user(session: AsyncSession, verification_id: UUID) -> None:
+    # update_user drops the cached user, so the activated account is seen on the next request
     statement = select(Verification).where(Verification.id == verification_id)
     verification = await base_services.get_object(session=session, statement=statement)
     await user_services.update_user(
@@ -54,11 +55,31 @@ async def verify_registration_user(session: AsyncSession, verification_id: UUID)
     )
 
 
-async def recover_password(session: AsyncSession, task: BackgroundTasks, email: str) -> str:
+async def verify_registration_token(session: AsyncSession, token: str) -> None:
+    user_id = verify_verification_token(token)
+    if not user_id:
+        raise HTTPException(status_code=400, detail="Invalid token")
+    await user_services.activate_user(session=session, user_id=user_id)
+
+
+async def confirm_registration(session: AsyncSession, verification_code: str) -> None:
+    """
+    The code is a Verification id or, with EMAIL_VERIFICATION_STATELESS, a signed token.
+    Both are accepted whatever the setting, so links sent before it was switched keep working.
+    """
+    try:
+        verification_id = UUID(verification_code)
+    except ValueError:
+        await verify_registration_token(session=session, token=verification_code)
+    else:
+        await verify_registration_user(session=session, verification_id=verification_id)
+
+
+async def recover_password(session: AsyncSession, email: str) -> str:
     user = await user_services.get_user(session=session, where_statements=[User.email == email])
     password_reset_token = generate_password_reset_token(email)
-    task.add_task(
-        send_reset_password_email, username=user.username, email=email, token=password_reset_token
+    await send_reset_password_email(
+        session=session, username=user.username, email=email, token=password_reset_token
     )
     return password_reset_token
 
@@ -92,11 +113,12 @@ async def reset_password(session: AsyncSession, token: str, new_password: str) -
     user = await user_services.get_user(session=session, where_statements=[User.email == email])
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    password_hash = get_password_hash(new_password)
+    password_hash = await get_password_hash_async(new_password)
     user = await base_services.update_object(
         session=session,
         where_statements=[User.id == user.id],
         model=User,
         to_update={"password": password_hash},
     )
+    await user_services.invalidate_cached_user(session=session, user_id=user.id)
     return user
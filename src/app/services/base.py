@@ -1,16 +1,30 @@
-from typing import Optional, Type, Union, List
+from typing import Optional, Sequence, Type, Union, List
 
 from asyncpg.exceptions import UniqueViolationError, ForeignKeyViolationError
 from fastapi import HTTPException
 from sqlalchemy import delete, exists, insert, update, select
+from sqlalchemy.engine import Row
 from sqlalchemy.exc import NoResultFound, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import Executable
 
 from app.core.exceptions import raise_404
+from app.db.base import commit
 from app.models.base import BaseModel
 
 
+def with_column_defaults(model: Type[BaseModel], values: dict) -> dict:
+    """
+    Python side column defaults aren't applied to an INSERT inside a CTE, so they are filled in beforehand.
+    """
+    defaults = dict()
+    for column in model.__table__.columns:
+        if column.default is None or column.name in values:
+            continue
+        defaults[column.name] = column.default.arg(None) if column.default.is_callable else column.default.arg
+    return {**defaults, **values}
+
+
 async def is_object_exists(session: AsyncSession, where_statement) -> bool:
     where_statement = exists(where_statement).select()
     result = await session.execute(where_statement)
@@ -29,7 +43,7 @@ async def update_object(
     if return_object:
         statement = statement.returning(model)
     result = await session.execute(statement)
-    await session.commit()
+    await commit(session)
     if return_object:
         try:
             object_ = model(**dict(result.one()))
@@ -50,7 +64,7 @@ async def insert_object(
         statement = statement.returning(model)
     try:
         result = await session.execute(statement)
-        await session.commit()
+        await commit(session)
         if return_object:
             object_ = model(**dict(result.one()))
             return object_
@@ -62,6 +76,20 @@ async def insert_object(
             raise HTTPException(status_code=409, detail="Already exists")
 
 
+async def bulk_insert_objects(
+    session: AsyncSession,
+    model: Type[BaseModel],
+    to_insert: List[dict],
+    chunk_size: int = 1000,
+) -> None:
+    """
+    Insert rows with multi-row INSERT statements of at most chunk_size rows each.
+    Doesn't commit, so the caller decides where the transaction ends.
+    """
+    for start in range(0, len(to_insert), chunk_size):
+        await session.execute(insert(model).values(to_insert[start:start + chunk_size]))
+
+
 async def delete_object(
     session: AsyncSession,
     model: Type[BaseModel],
@@ -70,7 +98,7 @@ async def delete_object(
 ) -> Optional[Union[BaseModel, bool]]:
     statement = delete(model).where(*where_statements).returning(model)
     result = await session.execute(statement)
-    await session.commit()
+    await commit(session)
     if return_object:
         try:
             object_ = model(**dict(result.one()))
@@ -89,7 +117,17 @@ async def get_object(session: AsyncSession, statement: Executable) -> BaseModel:
         await raise_404()
 
 
-async def get_objects(session: AsyncSession, model: Type[BaseModel]) -> List[BaseModel]:
+async def get_objects(
+    session: AsyncSession,
+    model: Type[BaseModel],
+    columns: Optional[Sequence] = None,
+) -> Union[List[BaseModel], List[Row]]:
+    """
+    All objects of model, or only rows of columns to not hydrate whole objects.
+    """
+    if columns:
+        result = await session.execute(select(*columns).order_by(model.id))
+        return result.all()
     statement = select(model).order_by(model.id)
     result = await session.execute(statement=statement)
     objects = result.scalars().all()
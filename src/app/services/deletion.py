@@ -0,0 +1,190 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.exceptions import raise_404
+from app.core.settings import get_settings
+from app.models import Answer, AnswerAttribute, DeletionJob, Survey, SurveyAttribute, User, Verification
+from app.models.base import INCLUDE_DELETED
+from app.services import base as base_services
+from app.services import result as result_services
+
+settings = get_settings()
+
+
+async def create_deletion_job(session: AsyncSession, target: str, target_id: UUID, user_id: UUID) -> DeletionJob:
+    job = await base_services.insert_object(
+        session=session,
+        model=DeletionJob,
+        to_insert={"target": target, "target_id": target_id, "user_id": user_id},
+    )
+    return job
+
+
+async def get_deletion_job(session: AsyncSession, job_id: UUID, user: User) -> DeletionJob:
+    statement = select(DeletionJob).where(DeletionJob.id == job_id)
+    job = await base_services.get_object(session=session, statement=statement)
+    if job.user_id != user.id and not user.is_superuser:
+        await raise_404()
+    return job
+
+
+async def get_unfinished_deletion_jobs(session: AsyncSession) -> List[DeletionJob]:
+    statement = select(DeletionJob).where(DeletionJob.status != "done").order_by(DeletionJob.created_at)
+    result = await session.execute(statement)
+    return result.scalars().all()
+
+
+async def claim_deletion_job(session: AsyncSession, lease_seconds: float) -> Optional[DeletionJob]:
+    """
+    Take the next due job. It's pushed lease_seconds into the future, so other workers skip it,
+    and comes back on its own if this worker dies before finishing it.
+    """
+    now = datetime.now()
+    due_job = select(DeletionJob.id).where(
+        DeletionJob.status != "done",
+        DeletionJob.next_attempt_at <= now,
+    ).order_by(DeletionJob.next_attempt_at).limit(1).with_for_update(skip_locked=True)
+    statement = update(DeletionJob).where(DeletionJob.id.in_(due_job)).values(
+        status="running",
+        attempts=DeletionJob.attempts + 1,
+        next_attempt_at=now + timedelta(seconds=lease_seconds),
+    ).returning(DeletionJob).execution_options(synchronize_session=False)
+    result = await session.execute(statement)
+    await session.commit()
+    row = result.one_or_none()
+    return DeletionJob(**dict(row)) if row else None
+
+
+async def _delete_answers_batch(
+        session: AsyncSession,
+        where_statement,
+        batch_size: int,
+        progress: Counter,
+        update_results: bool,
+) -> bool:
+    """
+    Delete up to batch_size answers with their attributes, False when there was none left.
+    """
+    result = await session.execute(select(Answer.id).where(where_statement).limit(batch_size))
+    answer_ids = result.scalars().all()
+    if not answer_ids:
+        return False
+    statement = delete(AnswerAttribute).where(AnswerAttribute.answer_id.in_(answer_ids)).returning(
+        AnswerAttribute.survey_attr_id, AnswerAttribute.text,
+    )
+    result = await session.execute(statement)
+    deleted_attrs = result.all()
+    result = await session.execute(delete(Answer).where(Answer.id.in_(answer_ids)).returning(Answer.survey_id))
+    survey_ids = result.scalars().all()
+    if update_results:
+        await result_services.add_answer_attrs_to_results(session=session, attrs=deleted_attrs, sign=-1)
+        for survey_id, count in Counter(survey_ids).items():
+            await result_services.add_answers_to_results(session=session, survey_id=survey_id, count=-count)
+    progress["deleted_answer_attrs"] += len(deleted_attrs)
+    progress["deleted_answers"] += len(survey_ids)
+    return True
+
+
+async def _purge_survey_step(session: AsyncSession, target_id: UUID, batch_size: int, progress: Counter) -> bool:
+    """
+    Delete a batch of answers of the survey, once they are gone a batch of its attributes and at last
+    the survey itself, which takes its results along. True when the survey is gone.
+    """
+    if await _delete_answers_batch(
+        session=session,
+        where_statement=Answer.survey_id == target_id,
+        batch_size=batch_size,
+        progress=progress,
+        update_results=False,
+    ):
+        return False
+    survey_attrs = select(SurveyAttribute.id).where(SurveyAttribute.survey_id == target_id).limit(batch_size)
+    statement = delete(SurveyAttribute).where(SurveyAttribute.id.in_(survey_attrs)) \
+        .execution_options(synchronize_session=False)
+    result = await session.execute(statement)
+    if result.rowcount:
+        progress["deleted_survey_attrs"] += result.rowcount
+        return False
+    result = await session.execute(delete(Survey).where(Survey.id == target_id))
+    progress["deleted_surveys"] += result.rowcount
+    return True
+
+
+async def _purge_user_step(session: AsyncSession, target_id: UUID, batch_size: int, progress: Counter) -> bool:
+    """
+    Purge the surveys of the user one after another, then delete its answers to surveys of others
+    in batches, keeping their results in sync, and at last the user itself. True when the user is gone.
+    """
+    statement = select(Survey.id).where(Survey.user_id == target_id).limit(1) \
+        .execution_options(**{INCLUDE_DELETED: True})
+    result = await session.execute(statement)
+    survey_id = result.scalar_one_or_none()
+    if survey_id is not None:
+        await _purge_survey_step(session=session, target_id=survey_id, batch_size=batch_size, progress=progress)
+        return False
+    if await _delete_answers_batch(
+        session=session,
+        where_statement=Answer.user_id == target_id,
+        batch_size=batch_size,
+        progress=progress,
+        update_results=True,
+    ):
+        return False
+    await session.execute(delete(Verification).where(Verification.user_id == target_id))
+    await session.execute(delete(User).where(User.id == target_id))
+    return True
+
+
+PURGE_STEPS = {
+    "survey": _purge_survey_step,
+    "user": _purge_user_step,
+}
+
+
+async def purge_deletion_job_batch(
+        session: AsyncSession,
+        job: DeletionJob,
+        batch_size: int,
+        lease_seconds: float,
+) -> DeletionJob:
+    """
+    Run one bounded step of the job and add what it deleted to the job counters in the same transaction,
+    so progress is never lost or counted twice. The lease is extended, a finished job is marked done.
+    """
+    progress = Counter()
+    finished = await PURGE_STEPS[job.target](
+        session=session,
+        target_id=job.target_id,
+        batch_size=batch_size,
+        progress=progress,
+    )
+    now = datetime.now()
+    to_update = {name: getattr(DeletionJob, name) + count for name, count in progress.items()}
+    if finished:
+        to_update.update(status="done", finished_at=now, last_error=None)
+    else:
+        to_update["next_attempt_at"] = now + timedelta(seconds=lease_seconds)
+    statement = update(DeletionJob).where(DeletionJob.id == job.id).values(**to_update).returning(DeletionJob)
+    result = await session.execute(statement)
+    await session.commit()
+    return DeletionJob(**dict(result.one()))
+
+
+async def mark_deletion_job_failed(session: AsyncSession, job: DeletionJob, error: str) -> None:
+    # batches done so far stay committed, the job goes on from where it stopped
+    await base_services.update_object(
+        session=session,
+        model=DeletionJob,
+        where_statements=[DeletionJob.id == job.id],
+        to_update={
+            "status": "pending",
+            "last_error": error,
+            "next_attempt_at": datetime.now() + timedelta(seconds=settings.DELETION_RETRY_DELAY),
+        },
+        return_object=False,
+    )
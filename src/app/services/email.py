@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+from typing import List
+from uuid import UUID
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import get_settings
+from app.models import EmailOutbox
+from app.services import base as base_services
+
+settings = get_settings()
+
+
+async def enqueue_email(session: AsyncSession, email_to: str, subject: str, body: str) -> EmailOutbox:
+    email = await base_services.insert_object(
+        session=session,
+        model=EmailOutbox,
+        to_insert={"email_to": email_to, "subject": subject, "body": body},
+    )
+    return email
+
+
+async def claim_emails(session: AsyncSession, limit: int, lease_seconds: float) -> List[EmailOutbox]:
+    """
+    Take up to limit due emails for delivery. Claimed emails are pushed lease_seconds into the future,
+    so other workers skip them, and come back on their own if this worker dies before marking them.
+    """
+    now = datetime.now()
+    due_emails = select(EmailOutbox.id).where(
+        EmailOutbox.status == "pending",
+        EmailOutbox.next_attempt_at <= now,
+    ).order_by(EmailOutbox.next_attempt_at).limit(limit).with_for_update(skip_locked=True)
+    statement = update(EmailOutbox).where(EmailOutbox.id.in_(due_emails)).values(
+        attempts=EmailOutbox.attempts + 1,
+        next_attempt_at=now + timedelta(seconds=lease_seconds),
+    ).returning(EmailOutbox).execution_options(synchronize_session=False)
+    result = await session.execute(statement)
+    await session.commit()
+    return [EmailOutbox(**dict(row)) for row in result.all()]
+
+
+async def mark_emails_sent(session: AsyncSession, email_ids: List[UUID]) -> None:
+    if not email_ids:
+        return
+    statement = update(EmailOutbox).where(EmailOutbox.id.in_(email_ids)).values(
+        status="sent",
+        sent_at=datetime.now(),
+        last_error=None,
+        body=None,
+    )
+    await session.execute(statement)
+    await session.commit()
+
+
+def get_retry_delay(attempts: int) -> float:
+    return min(settings.EMAIL_RETRY_BASE_DELAY * 2 ** (attempts - 1), settings.EMAIL_RETRY_MAX_DELAY)
+
+
+async def mark_email_failed(session: AsyncSession, email: EmailOutbox, error: str) -> None:
+    if email.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+        to_update = {"status": "failed", "last_error": error, "body": None}
+    else:
+        next_attempt_at = datetime.now() + timedelta(seconds=get_retry_delay(email.attempts))
+        to_update = {"next_attempt_at": next_attempt_at, "last_error": error}
+    await base_services.update_object(
+        session=session,
+        model=EmailOutbox,
+        where_statements=[EmailOutbox.id == email.id],
+        to_update=to_update,
+        return_object=False,
+    )
@@ -1,18 +1,72 @@
-from typing import List
+import re
+from typing import List, Optional, Tuple
 
-from sqlalchemy import column, select
+from fastapi_pagination.bases import AbstractPage
+from sqlalchemy import Float, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
 
 from app.models import Survey
+from app.models.base import SEARCH_CONFIG
+from app.schemas.pagination import CursorPage, CursorParams
 from app.schemas.survey import SurveyFilter
 from app.services.filtering.common import validate_filter
+from app.services.pagination import paginate_by_keyset, paginate_by_offset
+from app.services.survey import SURVEY_ORDERING
 
+SEARCH_WEIGHTS = {"name": "A", "description": "B"}
 
-async def filter_surveys(session: AsyncSession, filter: SurveyFilter) -> list | List[Survey]:
+
+def _build_tsquery(column_name: str, column_value: str) -> Optional[str]:
+    """
+    Turn a filter value into a tsquery where every word is a prefix limited to the lexemes of its column,
+    e.g. ("name", "Daily que") -> "daily:*A & que:*A".
+    """
+    terms = [f"{word}:*{SEARCH_WEIGHTS[column_name]}" for word in re.findall(r"\w+", column_value.lower())]
+    return " & ".join(terms) or None
+
+
+async def _filter_surveys_statement(filter: SurveyFilter) -> Tuple[Select, tuple]:
     validated_filter = await validate_filter(filter=filter)
-    columns = [column(column_name).contains(column_value) for column_name, column_value in validated_filter.items()]
+    # Every value matches whole words and word prefixes in any case through ix_survey_search_vector,
+    # and the substring, inside words too, through the trigram indexes. Postgres ORs the two bitmaps.
+    columns, tsquery_texts = list(), list()
+    for column_name, column_value in validated_filter.items():
+        matches = getattr(Survey, column_name).contains(column_value, autoescape=True)
+        tsquery_text = _build_tsquery(column_name=column_name, column_value=column_value)
+        if tsquery_text:
+            matches = or_(matches, Survey.search_vector.op("@@")(func.to_tsquery(SEARCH_CONFIG, tsquery_text)))
+            tsquery_texts.append(tsquery_text)
+        columns.append(matches)
     statement = select(Survey).where(*columns)
+    if not tsquery_texts:
+        return statement.order_by(*SURVEY_ORDERING), SURVEY_ORDERING
+    # the rank puts rows matching whole words or word prefixes first, it's read from the stored vector
+    tsquery = func.to_tsquery(SEARCH_CONFIG, " & ".join(tsquery_texts))
+    rank = func.ts_rank(Survey.search_vector, tsquery, type_=Float)
+    ordering = (-rank, Survey.id)
+    return statement.order_by(*ordering), ordering
+
+
+async def filter_surveys(session: AsyncSession, filter: SurveyFilter) -> list | List[Survey]:
+    statement, _ = await _filter_surveys_statement(filter=filter)
     result = await session.execute(statement)
     surveys = result.scalars().all()
     return surveys
 
+
+async def filter_surveys_offset_page(session: AsyncSession, filter: SurveyFilter) -> AbstractPage:
+    statement, _ = await _filter_surveys_statement(filter=filter)
+    page = await paginate_by_offset(session=session, statement=statement)
+    return page
+
+
+async def filter_surveys_page(session: AsyncSession, filter: SurveyFilter, params: CursorParams) -> CursorPage:
+    statement, ordering = await _filter_surveys_statement(filter=filter)
+    page = await paginate_by_keyset(
+        session=session,
+        statement=statement,
+        ordering=ordering,
+        params=params,
+    )
+    return page
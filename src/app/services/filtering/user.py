@@ -1,17 +1,58 @@
-from typing import List
+import operator
+from functools import reduce
+from typing import List, Tuple
 
-from sqlalchemy import select, column
+from fastapi_pagination.bases import AbstractPage
+from sqlalchemy import Float, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
 
 from app.models import User
+from app.schemas.pagination import CursorPage, CursorParams
 from app.schemas.user import UserFilter
 from app.services.filtering.common import validate_filter
+from app.services.pagination import paginate_by_keyset, paginate_by_offset
 
 
-async def filter_users(session: AsyncSession, filter: UserFilter) -> List[User]:
+async def _filter_users_statement(filter: UserFilter) -> Tuple[Select, tuple]:
     validated_filter = await validate_filter(filter=filter)
-    columns = [column(column_name).contains(column_value) for column_name, column_value in validated_filter.items()]
-    statement = select(User).where(*columns)
+    if not validated_filter:
+        return select(User).order_by(User.id), (User.id,)
+    # LIKE '%value%' is served by the trigram indexes, similarity ranks closer matches first
+    columns = [
+        getattr(User, column_name).contains(column_value, autoescape=True)
+        for column_name, column_value in validated_filter.items()
+    ]
+    rank = reduce(
+        operator.add,
+        [
+            func.similarity(getattr(User, column_name), column_value, type_=Float)
+            for column_name, column_value in validated_filter.items()
+        ],
+    )
+    ordering = (-rank, User.id)
+    return select(User).where(*columns).order_by(*ordering), ordering
+
+
+async def filter_users(session: AsyncSession, filter: UserFilter) -> List[User]:
+    statement, _ = await _filter_users_statement(filter=filter)
     result = await session.execute(statement)
     users = result.scalars().all()
     return users
+
+
+async def filter_users_offset_page(session: AsyncSession, filter: UserFilter) -> AbstractPage:
+    statement, _ = await _filter_users_statement(filter=filter)
+    page = await paginate_by_offset(session=session, statement=statement)
+    return page
+
+
+async def filter_users_page(session: AsyncSession, filter: UserFilter, params: CursorParams) -> CursorPage:
+    statement, ordering = await _filter_users_statement(filter=filter)
+    page = await paginate_by_keyset(
+        session=session,
+        statement=statement,
+        ordering=ordering,
+        params=params,
+    )
+    return page
@@ -0,0 +1,100 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence
+from uuid import UUID
+
+from fastapi import HTTPException
+from fastapi_pagination import create_page, resolve_params
+from fastapi_pagination.bases import AbstractPage, AbstractParams
+from sqlalchemy import func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from app.schemas.pagination import CursorPage, CursorParams
+
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def _load_value(expression, value: Any) -> Any:
+    python_type = expression.type.python_type
+    if value is None or isinstance(value, python_type):
+        return value
+    if python_type in (datetime, date):
+        return python_type.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw_cursor = json.dumps([_dump_value(value) for value in values])
+    return urlsafe_b64encode(raw_cursor.encode("utf-8")).decode("utf-8")
+
+
+def decode_cursor(cursor: str, ordering: Sequence) -> List[Any]:
+    try:
+        values = json.loads(urlsafe_b64decode(cursor.encode("utf-8")))
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise ValueError("Cursor doesn't match ordering")
+        return [_load_value(expression, value) for expression, value in zip(ordering, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def paginate_by_keyset(
+    session: AsyncSession,
+    statement: Select,
+    ordering: Sequence,
+    params: CursorParams,
+) -> CursorPage:
+    """
+    Fetch one page of statement ordered by ordering (all ascending, unique as a whole).
+    The position of the last row is encoded into next_cursor, so only size + 1 rows are read
+    no matter how deep the page is.
+    Items are entities for a statement of one entity and rows for a statement of columns,
+    ordering expressions missing from the columns are added at the end of the rows.
+    """
+    is_entity = len(statement.column_descriptions) == 1
+    columns = list() if is_entity else list(statement.selected_columns)
+    width = 1 if is_entity else len(columns)
+    positions, keys = list(), list()
+    for index, expression in enumerate(ordering):
+        position = next((position for position, column in enumerate(columns) if expression.compare(column)), None)
+        if position is None:
+            position = width + len(keys)
+            keys.append(expression.label(f"keyset_{index}"))
+        positions.append(position)
+    statement = statement.add_columns(*keys).order_by(None).order_by(*ordering).limit(params.size + 1)
+    if params.cursor:
+        values = decode_cursor(cursor=params.cursor, ordering=ordering)
+        cursor_values = [literal(value, expression.type) for expression, value in zip(ordering, values)]
+        statement = statement.where(tuple_(*ordering) > tuple_(*cursor_values))
+    result = await session.execute(statement)
+    rows = result.all()
+    next_cursor = None
+    if len(rows) > params.size:
+        rows = rows[:params.size]
+        next_cursor = encode_cursor([rows[-1][position] for position in positions])
+    items = [row[0] for row in rows] if is_entity else rows
+    return CursorPage[Any](items=items, size=params.size, next_cursor=next_cursor)
+
+
+async def paginate_by_offset(
+    session: AsyncSession,
+    statement: Select,
+    params: Optional[AbstractParams] = None,
+) -> AbstractPage:
+    """
+    Database side counterpart of fastapi_pagination.paginate: counts the rows and reads only the requested page.
+    """
+    params = resolve_params(params)
+    raw_params = params.to_raw_params()
+    total = await session.scalar(select(func.count()).select_from(statement.order_by(None).subquery()))
+    result = await session.execute(statement.limit(raw_params.limit).offset(raw_params.offset))
+    items = result.scalars().all() if len(statement.column_descriptions) == 1 else result.all()
+    return create_page(items, total, params)
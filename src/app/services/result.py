@@ -0,0 +1,301 @@
+from collections import Counter, defaultdict
+from typing import Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import case, delete, func, literal_column, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import NoResultFound
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.exceptions import raise_404
+from app.core.settings import get_settings
+from app.db.base import commit
+from app.models import (
+    Answer, AnswerAttribute, Survey, SurveyAttribute, SurveyAttributeResult, SurveyResult, SurveyResultDelta, User,
+)
+from app.schemas import survey as schemas
+
+settings = get_settings()
+
+
+async def lock_survey_results(session: AsyncSession, survey_id: UUID, exclusive: bool = False) -> None:
+    """
+    Take the advisory lock of the survey results until the end of the transaction. Answer writers take it
+    shared, rebuild_survey_results exclusively, so a rebuild never sees an answer without its deltas.
+    """
+    key = int.from_bytes(survey_id.bytes[:8], "big", signed=True)
+    lock = func.pg_advisory_xact_lock if exclusive else func.pg_advisory_xact_lock_shared
+    await session.execute(select(lock(key)))
+
+
+async def add_answers_to_results(session: AsyncSession, survey_id: UUID, count: int) -> None:
+    """
+    Shift answers_count of the survey by count (negative when answers are deleted). Doesn't commit.
+    Every answer writer calls it, so it takes the results lock for the writer's transaction.
+    """
+    if not count:
+        return
+    await lock_survey_results(session=session, survey_id=survey_id)
+    await session.execute(insert(SurveyResultDelta).values(survey_id=survey_id, count=count))
+
+
+async def add_answer_attrs_to_results(
+        session: AsyncSession,
+        attrs: Iterable[Tuple[UUID, Optional[str]]],
+        sign: int = 1,
+) -> None:
+    """
+    Add (or subtract with sign=-1) (survey_attr_id, text) pairs to the distributions of survey attributes.
+    Pairs are counted here, so a delta row is appended once per pair and statement. Doesn't commit.
+    """
+    counter = Counter((survey_attr_id, text or "") for survey_attr_id, text in attrs)
+    if not counter:
+        return
+    rows = [
+        {"survey_attr_id": survey_attr_id, "text": text, "count": count * sign}
+        for (survey_attr_id, text), count in counter.items()
+    ]
+    chunk_size = settings.ANSWER_BATCH_CHUNK_SIZE
+    for start in range(0, len(rows), chunk_size):
+        await session.execute(insert(SurveyResultDelta).values(rows[start:start + chunk_size]))
+
+
+async def _fold_answers_counts(session: AsyncSession, answers_counts: Counter) -> None:
+    # sorted, so concurrent workers lock the summary rows in the same order
+    rows = [
+        {"survey_id": survey_id, "answers_count": count}
+        for survey_id, count in sorted(answers_counts.items()) if count
+    ]
+    if not rows:
+        return
+    statement = insert(SurveyResult).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[SurveyResult.survey_id],
+        set_={"answers_count": SurveyResult.answers_count + statement.excluded.answers_count},
+    )
+    await session.execute(statement)
+
+
+async def _fold_texts_counts(session: AsyncSession, texts_counts: Counter, max_texts: int) -> None:
+    """
+    Texts already counted for an attribute are added to their rows, new ones get a row while the attribute
+    has fewer than max_texts of them and are added to its other texts row after that. Rows are never removed
+    here (reads skip the ones down to zero), so a text subtracted later finds the row it was added to.
+    """
+    statement = select(SurveyAttributeResult.survey_attr_id, SurveyAttributeResult.text).where(
+        SurveyAttributeResult.survey_attr_id.in_({survey_attr_id for survey_attr_id, _ in texts_counts}),
+        SurveyAttributeResult.text.isnot(None),
+    )
+    result = await session.execute(statement)
+    known_texts = defaultdict(set)
+    for survey_attr_id, text in result.all():
+        known_texts[survey_attr_id].add(text)
+    counted_texts = Counter()
+    others_counts = Counter()
+    # the most frequent new texts of the batch take the free rows first
+    for (survey_attr_id, text), count in sorted(texts_counts.items(), key=lambda item: -item[1]):
+        if not count:
+            continue
+        attr_texts = known_texts[survey_attr_id]
+        if text in attr_texts or len(attr_texts) < max_texts:
+            attr_texts.add(text)
+            counted_texts[(survey_attr_id, text)] += count
+        else:
+            others_counts[survey_attr_id] += count
+    chunk_size = settings.ANSWER_BATCH_CHUNK_SIZE
+    rows = [
+        {"survey_attr_id": survey_attr_id, "text": text, "count": count}
+        for (survey_attr_id, text), count in sorted(counted_texts.items())
+    ]
+    for start in range(0, len(rows), chunk_size):
+        statement = insert(SurveyAttributeResult).values(rows[start:start + chunk_size])
+        statement = statement.on_conflict_do_update(
+            constraint="uq_surveyattributeresult_survey_attr_id_text",
+            set_={"count": SurveyAttributeResult.count + statement.excluded.count},
+        )
+        await session.execute(statement)
+    rows = [
+        {"survey_attr_id": survey_attr_id, "count": count}
+        for survey_attr_id, count in sorted(others_counts.items()) if count
+    ]
+    for start in range(0, len(rows), chunk_size):
+        statement = insert(SurveyAttributeResult).values(rows[start:start + chunk_size])
+        statement = statement.on_conflict_do_update(
+            index_elements=[SurveyAttributeResult.survey_attr_id],
+            index_where=SurveyAttributeResult.text.is_(None),
+            set_={"count": SurveyAttributeResult.count + statement.excluded.count},
+        )
+        await session.execute(statement)
+
+
+async def fold_results_batch(session: AsyncSession, batch_size: int, max_texts: int) -> int:
+    """
+    Take up to batch_size deltas and add them to the summary tables in one transaction, 0 when there was none.
+    Deltas locked by another worker are skipped.
+    """
+    claimed = select(SurveyResultDelta.id).limit(batch_size).with_for_update(skip_locked=True)
+    statement = delete(SurveyResultDelta).where(SurveyResultDelta.id.in_(claimed)).returning(
+        SurveyResultDelta.survey_id,
+        SurveyResultDelta.survey_attr_id,
+        SurveyResultDelta.text,
+        SurveyResultDelta.count,
+    ).execution_options(synchronize_session=False)
+    result = await session.execute(statement)
+    deltas = result.all()
+    if not deltas:
+        return 0
+    answers_counts = Counter()
+    texts_counts = Counter()
+    for survey_id, survey_attr_id, text, count in deltas:
+        if survey_attr_id is None:
+            answers_counts[survey_id] += count
+        else:
+            texts_counts[(survey_attr_id, text)] += count
+    await _fold_answers_counts(session=session, answers_counts=answers_counts)
+    if texts_counts:
+        await _fold_texts_counts(session=session, texts_counts=texts_counts, max_texts=max_texts)
+    await session.commit()
+    return len(deltas)
+
+
+async def rebuild_survey_results(session: AsyncSession, survey_id: UUID) -> None:
+    """
+    Recount the results of a survey from its answers, e.g. to fill the summaries for answers stored before them.
+    Answer writers wait for the rebuild, so every statement sees the same answers and deltas.
+    """
+    await lock_survey_results(session=session, survey_id=survey_id, exclusive=True)
+    survey_attr_ids = select(SurveyAttribute.id).where(SurveyAttribute.survey_id == survey_id)
+    # the recount covers the answers these deltas were appended for
+    await session.execute(
+        delete(SurveyResultDelta).where(
+            or_(SurveyResultDelta.survey_id == survey_id, SurveyResultDelta.survey_attr_id.in_(survey_attr_ids))
+        ).execution_options(synchronize_session=False)
+    )
+    await session.execute(delete(SurveyResult).where(SurveyResult.survey_id == survey_id))
+    await session.execute(
+        delete(SurveyAttributeResult).where(
+            SurveyAttributeResult.survey_attr_id.in_(survey_attr_ids)
+        ).execution_options(synchronize_session=False)
+    )
+    # Python side uuid4 defaults don't apply to INSERT ... SELECT
+    answers_count = select(func.gen_random_uuid(), Answer.survey_id, func.count()).where(
+        Answer.survey_id == survey_id,
+    ).group_by(Answer.survey_id)
+    await session.execute(
+        insert(SurveyResult).from_select(
+            [SurveyResult.id, SurveyResult.survey_id, SurveyResult.answers_count],
+            answers_count,
+        )
+    )
+    # a bound "" is a separate parameter in SELECT and GROUP BY, Postgres wouldn't match the two expressions
+    text = func.coalesce(AnswerAttribute.text, literal_column("''"))
+    distributions = select(
+        AnswerAttribute.survey_attr_id,
+        text.label("text"),
+        func.count().label("count"),
+    ).join(
+        SurveyAttribute, SurveyAttribute.id == AnswerAttribute.survey_attr_id,
+    ).where(
+        SurveyAttribute.survey_id == survey_id,
+    ).group_by(AnswerAttribute.survey_attr_id, text).subquery()
+    ranked = select(
+        distributions,
+        func.row_number().over(
+            partition_by=distributions.c.survey_attr_id,
+            order_by=(distributions.c.count.desc(), distributions.c.text),
+        ).label("position"),
+    ).subquery()
+    max_texts = settings.SURVEY_RESULTS_MAX_TEXTS
+    await session.execute(
+        insert(SurveyAttributeResult).from_select(
+            [
+                SurveyAttributeResult.id,
+                SurveyAttributeResult.survey_attr_id,
+                SurveyAttributeResult.text,
+                SurveyAttributeResult.count,
+            ],
+            select(func.gen_random_uuid(), ranked.c.survey_attr_id, ranked.c.text, ranked.c.count).where(
+                ranked.c.position <= max_texts,
+            ),
+        )
+    )
+    await session.execute(
+        insert(SurveyAttributeResult).from_select(
+            [SurveyAttributeResult.id, SurveyAttributeResult.survey_attr_id, SurveyAttributeResult.count],
+            select(func.gen_random_uuid(), ranked.c.survey_attr_id, func.sum(ranked.c.count)).where(
+                ranked.c.position > max_texts,
+            ).group_by(ranked.c.survey_attr_id),
+        )
+    )
+    await commit(session)
+
+
+async def _get_survey_answers_count(session: AsyncSession, survey_id: UUID, user: User) -> int:
+    statement = select(Survey.user_id, SurveyResult.answers_count).outerjoin(
+        SurveyResult, SurveyResult.survey_id == Survey.id,
+    ).where(Survey.id == survey_id)
+    result = await session.execute(statement)
+    try:
+        owner_id, answers_count = result.one()
+    except NoResultFound:
+        await raise_404()
+    if owner_id != user.id and not user.is_superuser:
+        raise HTTPException(status_code=403, detail="Only the author of the survey can see its results.")
+    return answers_count or 0
+
+
+async def get_survey_results(session: AsyncSession, survey_id: UUID, user: User, top: int) -> schemas.SurveyResults:
+    """
+    Read the results of a survey from the summary tables, so the cost depends on the number of questions
+    and top, not on the number of answers. Answers given in the last SURVEY_RESULTS_POLL_INTERVAL seconds
+    may not be counted yet.
+    """
+    answers_count = await _get_survey_answers_count(session=session, survey_id=survey_id, user=user)
+    partition_by = SurveyAttributeResult.survey_attr_id
+    ranked = select(
+        SurveyAttributeResult.survey_attr_id,
+        SurveyAttributeResult.text,
+        SurveyAttributeResult.count,
+        func.sum(SurveyAttributeResult.count).over(partition_by=partition_by).label("responses"),
+        func.sum(
+            case((SurveyAttributeResult.text.is_(None), SurveyAttributeResult.count), else_=0)
+        ).over(partition_by=partition_by).label("others"),
+        func.row_number().over(
+            partition_by=partition_by,
+            # the other texts row goes last
+            order_by=(
+                SurveyAttributeResult.text.is_(None),
+                SurveyAttributeResult.count.desc(),
+                SurveyAttributeResult.text,
+            ),
+        ).label("position"),
+    ).join(
+        SurveyAttribute, SurveyAttribute.id == SurveyAttributeResult.survey_attr_id,
+    ).where(SurveyAttribute.survey_id == survey_id, SurveyAttributeResult.count > 0).subquery()
+    statement = select(
+        SurveyAttribute.id,
+        SurveyAttribute.question,
+        ranked.c.text,
+        ranked.c.count,
+        ranked.c.responses,
+        ranked.c.others,
+    ).outerjoin(
+        ranked, (ranked.c.survey_attr_id == SurveyAttribute.id) & (ranked.c.position <= top),
+    ).where(SurveyAttribute.survey_id == survey_id).order_by(SurveyAttribute.id, ranked.c.position)
+    result = await session.execute(statement)
+    attrs: List[schemas.SurveyAttributeResults] = list()
+    for survey_attr_id, question, text, count, responses, others in result.all():
+        if not attrs or attrs[-1].survey_attr_id != survey_attr_id:
+            attrs.append(
+                schemas.SurveyAttributeResults(
+                    survey_attr_id=survey_attr_id,
+                    question=question,
+                    responses=responses or 0,
+                    others=others or 0,
+                    answers=list(),
+                )
+            )
+        if text is not None:
+            attrs[-1].answers.append(schemas.AnswerTextCount(text=text, count=count))
+    return schemas.SurveyResults(survey_id=survey_id, answers_count=answers_count, attrs=attrs)
@@ -1,40 +1,91 @@
-from typing import List, Union, Optional
+from datetime import datetime
+from functools import partial
+from typing import List, NamedTuple, Union, Optional
 from uuid import UUID
 
 from fastapi import HTTPException
-from sqlalchemy import select, delete
+from fastapi_pagination.bases import AbstractPage, AbstractParams
+from sqlalchemy import select, delete, insert, true, update
+from sqlalchemy.engine import Row
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import subqueryload
 from sqlalchemy.orm.collections import InstrumentedList
+from sqlalchemy.sql import Delete, Select, Update
 
+from app.core.cache import Cache, LRUCacheBackend
+from app.core.deletions import request_deletion
 from app.core.exceptions import raise_404
-from app.models import Survey, SurveyAttribute, User
+from app.core.serialization import serialize_object
+from app.core.settings import get_settings
+from app.db.base import commit, run_after_commit
+from app.models import DeletionJob, Survey, SurveyAttribute, User
 from app.schemas import survey as schemas
+from app.schemas.pagination import CursorPage, CursorParams
 from app.services import base as base_services
 from app.services.base import update_object
+from app.services.pagination import paginate_by_keyset, paginate_by_offset
+
+settings = get_settings()
+
+SURVEY_ORDERING = (Survey.name, Survey.created_at, Survey.id)
+# Lists select only what SurveyOut needs, as rows instead of Survey objects
+SURVEY_LIST_COLUMNS = (Survey.id, Survey.name, Survey.description, Survey.created_at, Survey.user_id)
+
+# Keyed by survey id. Lists aren't cached, they are paginated by the database.
+survey_cache = Cache(
+    namespace="survey",
+    backend=LRUCacheBackend(maxsize=settings.SURVEY_CACHE_MAXSIZE),
+    ttl=settings.SURVEY_CACHE_TTL,
+    enabled=settings.SURVEY_CACHE_ENABLED,
+)
+
+
+class CachedSurvey(NamedTuple):
+    """
+    What everyone but the owner gets for a survey, with the validators for conditional GETs.
+    """
+    id: UUID
+    user_id: UUID
+    available: bool
+    version: int
+    updated_at: datetime
+    data: dict
+
+
+def _bump_version_values() -> dict:
+    return {"version": Survey.version + 1, "updated_at": datetime.now()}
 
 
 async def create_survey(session: AsyncSession, user_id: UUID, survey: schemas.SurveyCreate) -> Survey:
     data = survey.dict()
     attrs = data.pop("attrs")
     data["user_id"] = user_id
-    survey = await base_services.insert_object(
-        session=session,
-        model=Survey,
-        to_insert=data,
-    )
-    attrs = await create_survey_attrs(session=session, survey_id=survey.id, attrs=attrs)
+    result = await session.execute(insert(Survey).values(**data).returning(Survey))
+    survey = Survey(**dict(result.one()))
+    attrs = await insert_survey_attrs(session=session, survey_id=survey.id, attrs=attrs)
+    await commit(session)
     survey.__dict__["attrs"] = InstrumentedList(attrs)
     return survey
 
 
-async def create_survey_attrs(session: AsyncSession, survey_id: UUID, attrs: List[dict]) -> List[SurveyAttribute]:
+async def insert_survey_attrs(session: AsyncSession, survey_id: UUID, attrs: List[dict]) -> List[SurveyAttribute]:
+    if not attrs:
+        return list()
     for attr in attrs:
         attr["survey_id"] = survey_id
-    attrs = [SurveyAttribute(**attr) for attr in attrs]
-    session.add_all(attrs)
-    await session.commit()
+        if attr.get("available") is None:
+            attr["available"] = True
+    statement = insert(SurveyAttribute).values(attrs).returning(SurveyAttribute)
+    result = await session.execute(statement)
+    return [SurveyAttribute(**dict(row)) for row in result.all()]
+
+
+async def create_survey_attrs(session: AsyncSession, survey_id: UUID, attrs: List[dict]) -> List[SurveyAttribute]:
+    attrs = await insert_survey_attrs(session=session, survey_id=survey_id, attrs=attrs)
+    await session.execute(update(Survey).where(Survey.id == survey_id).values(**_bump_version_values()))
+    await commit(session)
+    await run_after_commit(session, partial(survey_cache.invalidate, survey_id))
     return attrs
 
 
@@ -49,13 +100,64 @@ async def get_survey(session: AsyncSession, id_: UUID, user: Optional[User] = No
     return survey
 
 
-async def get_surveys(session: AsyncSession) -> Union[List, List[Survey]]:
-    statement = select(Survey).order_by(Survey.name, Survey.created_at, Survey.id).where(Survey.available == True)
-    result = await session.execute(statement=statement)
-    surveys = result.scalars().all()
+async def get_survey_validators(session: AsyncSession, id_: UUID) -> Row:
+    """
+    Only the columns needed to answer a conditional GET, so a 304 doesn't load the attributes.
+    """
+    statement = select(Survey.id, Survey.user_id, Survey.available, Survey.version, Survey.updated_at) \
+        .where(Survey.id == id_)
+    result = await session.execute(statement)
+    validators = result.one_or_none()
+    if validators is None:
+        await raise_404()
+    return validators
+
+
+async def get_cached_survey(id_: UUID) -> Optional[CachedSurvey]:
+    return await survey_cache.get(id_)
+
+
+async def cache_survey(survey: Survey) -> CachedSurvey:
+    """
+    Cache the representation of survey for non owners, its attrs have to be loaded without unavailable ones.
+    """
+    cached_survey = CachedSurvey(
+        id=survey.id,
+        user_id=survey.user_id,
+        available=survey.available,
+        version=survey.version,
+        updated_at=survey.updated_at,
+        data=serialize_object(survey, schemas.SurveyRetrieve),
+    )
+    await survey_cache.set(survey.id, cached_survey)
+    return cached_survey
+
+
+def _get_surveys_statement() -> Select:
+    return select(*SURVEY_LIST_COLUMNS).order_by(*SURVEY_ORDERING).where(Survey.available.is_(True))
+
+
+async def get_surveys(session: AsyncSession) -> Union[List, List[Row]]:
+    result = await session.execute(statement=_get_surveys_statement())
+    surveys = result.all()
     return surveys
 
 
+async def get_surveys_offset_page(session: AsyncSession, params: Optional[AbstractParams] = None) -> AbstractPage:
+    page = await paginate_by_offset(session=session, statement=_get_surveys_statement(), params=params)
+    return page
+
+
+async def get_surveys_page(session: AsyncSession, params: CursorParams) -> CursorPage:
+    page = await paginate_by_keyset(
+        session=session,
+        statement=_get_surveys_statement(),
+        ordering=SURVEY_ORDERING,
+        params=params,
+    )
+    return page
+
+
 async def update_survey(session: AsyncSession, user: User, id_: UUID, to_update: schemas.SurveyUpdate) -> Survey:
     survey = await get_survey(session=session, user=user, id_=id_)
     if user.id != survey.user_id:
@@ -64,96 +166,167 @@ async def update_survey(session: AsyncSession, user: User, id_: UUID, to_update:
         session=session,
         model=Survey,
         where_statements=[Survey.id == id_],
-        to_update=to_update.dict(exclude_unset=True)
+        to_update={**to_update.dict(exclude_unset=True, exclude_none=True), **_bump_version_values()},
     )
+    await run_after_commit(session, partial(survey_cache.invalidate, id_))
     return survey
 
 
+def _owned_survey_attr_statement(statement: Union[Update, Delete], user: User, id_: UUID) -> Select:
+    """
+    Run the UPDATE/DELETE of a survey attribute only if user owns its survey, in one statement.
+    The owner CTE tells the cases apart: no row means a missing attribute, a row without changed columns
+    an attribute of another user.
+    The survey version is bumped for the changed attribute by the same statement.
+    """
+    owner = select(Survey.user_id).join(SurveyAttribute, SurveyAttribute.survey_id == Survey.id).where(
+        SurveyAttribute.id == id_,
+    ).cte("owner")
+    changed = statement.where(
+        SurveyAttribute.id == id_,
+        SurveyAttribute.survey_id == Survey.id,
+        Survey.user_id == user.id,
+        Survey.deleted_at.is_(None),
+    ).returning(*SurveyAttribute.__table__.columns).cte("changed")
+    bumped = update(Survey).where(Survey.id == changed.c.survey_id).values(**_bump_version_values()) \
+        .returning(Survey.id).cte("bumped")
+    return select(owner.c.user_id, *changed.c).select_from(
+        owner.outerjoin(changed, true()).outerjoin(bumped, true())
+    )
+
+
+async def _execute_owned_survey_attr_statement(
+        session: AsyncSession,
+        statement: Select,
+        forbidden_detail: Optional[str] = None,
+) -> SurveyAttribute:
+    """
+    Without forbidden_detail the attribute of another user is reported as missing.
+    """
+    result = await session.execute(statement)
+    row = result.one_or_none()
+    if row is None:
+        await raise_404()
+    if row.id is None:
+        if forbidden_detail is None:
+            await raise_404()
+        raise HTTPException(status_code=403, detail=forbidden_detail)
+    await commit(session)
+    await run_after_commit(session, partial(survey_cache.invalidate, row.survey_id))
+    return SurveyAttribute(**{column.name: row._mapping[column.name] for column in SurveyAttribute.__table__.columns})
+
+
 async def update_survey_attribute(
         session: AsyncSession,
         user: User,
         id_: UUID,
         to_update: schemas.SurveyAttributeUpdate
 ) -> SurveyAttribute:
-    statement = select(SurveyAttribute.survey_id).where(SurveyAttribute.id == id_)
-    result = await session.execute(statement=statement)
-    try:
-        survey_id = result.scalars().one()
-    except NoResultFound:
-        await raise_404()
-    statement = select(Survey.user_id).where(Survey.id == survey_id)
-    result = await session.execute(statement=statement)
-    try:
-        user_id = result.scalars().one()
-    except NoResultFound:
-        await raise_404()
-    if user.id != user_id:
-        raise HTTPException(status_code=403, detail="You can't edit this survey attr.")
-    survey_attr = await base_services.update_object(
+    statement = _owned_survey_attr_statement(
+        statement=update(SurveyAttribute).values(**to_update.dict(exclude_unset=True)),
+        user=user,
+        id_=id_,
+    )
+    survey_attr = await _execute_owned_survey_attr_statement(
         session=session,
-        model=SurveyAttribute,
-        where_statements=[SurveyAttribute.id == id_],
-        to_update=to_update.dict(exclude_unset=True)
+        statement=statement,
+        forbidden_detail="You can't edit this survey attr.",
     )
     return survey_attr
 
 
+def _get_current_user_surveys_statement(user: User, available: Optional[bool] = None) -> Select:
+    statement = select(*SURVEY_LIST_COLUMNS).order_by(*SURVEY_ORDERING).where(Survey.user_id == user.id)
+    if isinstance(available, bool):
+        statement = statement.where(Survey.available == available)
+    return statement
+
+
 async def get_current_user_surveys(
         session: AsyncSession,
         user: User,
         available: Optional[bool] = None
-) -> Union[list, List[Survey]]:
-    statement = select(Survey).order_by(Survey.name, Survey.created_at, Survey.id).where(Survey.user_id == user.id)
-    if isinstance(available, bool):
-        statement = statement.where(Survey.available == available)
+) -> Union[list, List[Row]]:
+    statement = _get_current_user_surveys_statement(user=user, available=available)
     result = await session.execute(statement=statement)
-    surveys = result.scalars().all()
+    surveys = result.all()
     return surveys
 
 
-async def get_user_surveys(
+async def get_current_user_surveys_page(
         session: AsyncSession,
-        user_id: UUID,
-) -> Union[list, List[Survey]]:
-    if not await base_services.is_object_exists(session=session, where_statement=select(User).where(User.id == user_id)):
+        user: User,
+        params: CursorParams,
+        available: Optional[bool] = None
+) -> CursorPage:
+    page = await paginate_by_keyset(
+        session=session,
+        statement=_get_current_user_surveys_statement(user=user, available=available),
+        ordering=SURVEY_ORDERING,
+        params=params,
+    )
+    return page
+
+
+async def _get_user_surveys_statement(session: AsyncSession, user_id: UUID) -> Select:
+    user_exists = await base_services.is_object_exists(
+        session=session,
+        where_statement=select(User).where(User.id == user_id),
+    )
+    if not user_exists:
         await raise_404()
-    statement = select(Survey).order_by(Survey.name, Survey.created_at, Survey.id).where(
+    return select(*SURVEY_LIST_COLUMNS).order_by(*SURVEY_ORDERING).where(
         Survey.user_id == user_id,
-        Survey.available is True
+        Survey.available.is_(True),
     )
+
+
+async def get_user_surveys(
+        session: AsyncSession,
+        user_id: UUID,
+) -> Union[list, List[Row]]:
+    statement = await _get_user_surveys_statement(session=session, user_id=user_id)
     result = await session.execute(statement=statement)
-    surveys = result.scalars().all()
+    surveys = result.all()
     return surveys
 
 
-async def delete_survey(session: AsyncSession, user: User, id_: UUID) -> Survey:
-    statement = delete(Survey).where(Survey.id == id_, Survey.user_id == user.id).returning(Survey)
+async def get_user_surveys_page(
+        session: AsyncSession,
+        user_id: UUID,
+        params: CursorParams,
+) -> CursorPage:
+    page = await paginate_by_keyset(
+        session=session,
+        statement=await _get_user_surveys_statement(session=session, user_id=user_id),
+        ordering=SURVEY_ORDERING,
+        params=params,
+    )
+    return page
+
+
+async def delete_survey(session: AsyncSession, user: User, id_: UUID) -> DeletionJob:
+    """
+    Hide the survey right away, its answers and attributes are purged in batches by the deletion worker.
+    """
+    statement = update(Survey).where(
+        Survey.id == id_,
+        Survey.user_id == user.id,
+        Survey.deleted_at.is_(None),
+    ).values(deleted_at=datetime.now()).returning(Survey.id)
     result = await session.execute(statement)
-    await session.commit()
-    try:
-        survey = Survey(**dict(result.one()))
-        return survey
-    except NoResultFound:
+    if result.one_or_none() is None:
         await raise_404()
+    job = await request_deletion(session=session, target="survey", target_id=id_, user_id=user.id)
+    await run_after_commit(session, partial(survey_cache.invalidate, id_))
+    return job
 
 
 async def delete_survey_attribute(session: AsyncSession, user: User, id_: UUID) -> SurveyAttribute:
-    statement = select(SurveyAttribute).join(
-        SurveyAttribute.survey.and_(Survey.user_id == user.id)
-    ).where(SurveyAttribute.id == id_)
-    if not await base_services.is_object_exists(
-            session=session,
-            where_statement=statement
-    ):
-        await raise_404()
-    statement = delete(SurveyAttribute).where(SurveyAttribute.id == id_).returning(SurveyAttribute)
-    result = await session.execute(statement)
-    await session.commit()
-    try:
-        survey_attr = SurveyAttribute(**dict(result.one()))
-        return survey_attr
-    except NoResultFound:
-        await raise_404()
+    statement = _owned_survey_attr_statement(statement=delete(SurveyAttribute), user=user, id_=id_)
+    # deleting the attribute of another user is a 404, as it always was
+    survey_attr = await _execute_owned_survey_attr_statement(session=session, statement=statement)
+    return survey_attr
 
 
 async def get_survey_attribute(session: AsyncSession, id_: UUID, user: User = None) -> SurveyAttribute:
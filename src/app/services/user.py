@@ -1,56 +1,130 @@
+from datetime import datetime
+from functools import partial
 from typing import Optional, List
+from uuid import UUID
 
 from fastapi.exceptions import HTTPException
-from sqlalchemy import or_, select
+from sqlalchemy import delete, func, insert, or_, select, true, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Row
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
-from starlette.background import BackgroundTasks
+from sqlalchemy.sql import Executable
 
+from app.core.cache import Cache, LRUCacheBackend
+from app.core.deletions import request_deletion
 from app.core.emails import send_new_account_email
 from app.core.exceptions import raise_404
-from app.core.security import get_password_hash, verify_password
-from app.models import User
+from app.core.security import generate_verification_token, get_password_hash_async, verify_password_async
+from app.core.settings import get_settings
+from app.db.base import commit, run_after_commit
+from app.models import DeletionJob, Survey, User, Verification
 from app.schemas.auth import PasswordChange
+from app.schemas.pagination import CursorPage, CursorParams
 from app.schemas.user import UserRegistrationIn
-from app.services import auth as auth_services
 from app.services import base as base_services
+from app.services.pagination import paginate_by_keyset
+from app.services.survey import survey_cache
 
+settings = get_settings()
 
-async def create_user(session: AsyncSession, new_user: UserRegistrationIn, task: BackgroundTasks) -> User:
+# Lists select only what UserList needs, the password hash and the rest of the row aren't read
+USER_LIST_COLUMNS = (User.id, User.username, User.email)
+
+user_cache = Cache(
+    namespace="user",
+    backend=LRUCacheBackend(maxsize=settings.USER_CACHE_MAXSIZE),
+    ttl=settings.USER_CACHE_TTL,
+    enabled=settings.USER_CACHE_ENABLED,
+)
+
+
+def _insert_user_statement(to_insert: dict, with_verification: bool = True) -> Executable:
+    """
+    Insert the user and its Verification in one statement. A taken username or email makes
+    ON CONFLICT DO NOTHING skip the user, then no row is returned and no Verification is inserted.
+    Without with_verification only the user is inserted, the confirmation link carries a signed token.
+    """
+    to_insert = base_services.with_column_defaults(model=User, values=to_insert)
+    insert_user = pg_insert(User).values(**to_insert).on_conflict_do_nothing() \
+        .returning(*User.__table__.columns)
+    if not with_verification:
+        return insert_user
+    new_user = insert_user.cte("new_user")
+    verification = insert(Verification).from_select(
+        [Verification.id, Verification.user_id],
+        select(func.gen_random_uuid(), new_user.c.id),
+    ).returning(Verification.id).cte("verification")
+    return select(new_user, verification.c.id.label("verification_id")).select_from(
+        new_user.join(verification, true())
+    )
+
+
+async def create_user(session: AsyncSession, new_user: UserRegistrationIn) -> User:
     if new_user.password != new_user.password_repeat:
         raise HTTPException(status_code=400, detail="password and password_repeat doesn't match")
-    statement = select(User).where(or_(User.username == new_user.username, User.email == new_user.email))
-    is_object_exists = await base_services.is_object_exists(session=session, where_statement=statement)
-    if is_object_exists:
+    to_insert = new_user.dict()
+    raw_password = to_insert.pop("password_repeat")
+    to_insert["password"] = await get_password_hash_async(raw_password)
+    stateless = settings.EMAIL_VERIFICATION_STATELESS
+    result = await session.execute(_insert_user_statement(to_insert=to_insert, with_verification=not stateless))
+    row = result.one_or_none()
+    if row is None:
         raise HTTPException(
             status_code=409,
             detail=f"User with username: {new_user.username} or email: {new_user.email} exists.",
         )
-    new_user = new_user.dict()
-    raw_password = new_user.pop("password_repeat")
-    new_user["password"] = get_password_hash(raw_password)
-    user = await base_services.insert_object(
+    user = User(**{column.name: row._mapping[column.name] for column in User.__table__.columns})
+    if stateless:
+        verification_code = generate_verification_token(user_id=user.id)
+    else:
+        verification_code = str(row.verification_id)
+    await send_new_account_email(
         session=session,
-        model=User,
-        to_insert=new_user,
-    )
-    verification = await auth_services.create_verification(session=session, user_id=user.id)
-    task.add_task(
-        send_new_account_email,
-        new_user.get("email"),
-        new_user.get("username"),
-        raw_password,
-        str(verification.id),
+        email_to=user.email,
+        username=user.username,
+        verification_code=verification_code,
     )
+    await commit(session)
     return user
 
 
+async def activate_user(session: AsyncSession, user_id: UUID) -> None:
+    """
+    Activate the user with a single conditional UPDATE, an unknown or already active user is a 404.
+    """
+    statement = update(User).where(User.id == user_id, User.is_active.is_(False), User.deleted_at.is_(None)) \
+        .values(is_active=True).returning(User.id)
+    result = await session.execute(statement)
+    if result.one_or_none() is None:
+        await raise_404()
+    await invalidate_cached_user(session=session, user_id=user_id)
+    await commit(session)
+
+
 async def get_user(session: AsyncSession, where_statements: list) -> User:
     statement = select(User).where(*where_statements)
     user = await base_services.get_object(session=session, statement=statement)
     return user
 
 
+async def get_cached_user(session: AsyncSession, user_id: UUID) -> User:
+    data = await user_cache.get(user_id)
+    if data is not None:
+        return User(**data)
+    user = await get_user(session=session, where_statements=[User.id == user_id])
+    # the password hash isn't cached, whoever needs it reads it from the primary
+    await user_cache.set(
+        user_id,
+        {column.name: getattr(user, column.name) for column in User.__table__.columns if column.name != "password"},
+    )
+    return user
+
+
+async def invalidate_cached_user(session: AsyncSession, user_id: UUID) -> None:
+    await run_after_commit(session, partial(user_cache.invalidate, user_id))
+
+
 async def update_user(
     session: AsyncSession,
     to_update: dict,
@@ -62,11 +136,14 @@ async def update_user(
         where_statements=where_statements,
         to_update=to_update,
     )
+    await invalidate_cached_user(session=session, user_id=user.id)
     return user
 
 
 async def change_user_password(session: AsyncSession, password_change: PasswordChange, user: User) -> None:
-    if not verify_password(password_change.current_password, user.passoword):
+    # user may come from the cache, which doesn't keep the password
+    password = await session.scalar(select(User.password).where(User.id == user.id))
+    if not await verify_password_async(password_change.current_password, password):
         raise HTTPException(
             status_code=400,
             detail="Provided password is incorrect",
@@ -78,38 +155,56 @@ async def change_user_password(session: AsyncSession, password_change: PasswordC
     await update_user(
         session=session,
         to_update={
-            "password": get_password_hash(password=password_change.new_password)
+            "password": await get_password_hash_async(password=password_change.new_password)
         },
         where_statements=[User.id == user.id]
     )
 
 
-async def get_users(session: AsyncSession) -> List[User]:
-    users = await base_services.get_objects(session=session, model=User)
+async def get_users(session: AsyncSession) -> List[Row]:
+    users = await base_services.get_objects(session=session, model=User, columns=USER_LIST_COLUMNS)
     return users
 
 
-async def delete_user(session: AsyncSession, login: str, password: str) -> User:
-    statement = select(User.is_active, User.password).where(or_(User.username == login, User.email == login))
+async def get_users_page(session: AsyncSession, params: CursorParams) -> CursorPage:
+    page = await paginate_by_keyset(
+        session=session,
+        statement=select(*USER_LIST_COLUMNS),
+        ordering=(User.id,),
+        params=params,
+    )
+    return page
+
+
+async def delete_user(session: AsyncSession, login: str, password: str) -> DeletionJob:
+    """
+    Hide the user and its surveys right away, they are purged in batches by the deletion worker.
+    """
+    statement = select(User.id, User.is_active, User.password).where(or_(User.username == login, User.email == login))
     result = await session.execute(statement)
     try:
-        is_active, user_password = result.one()
-        if not is_active:
-            raise HTTPException(
-                status_code=400,
-                detail="The user is not active",
-            )
-        if not verify_password(password, user_password):
-            raise HTTPException(
-                status_code=400,
-                detail="Provided password is incorrect",
-            )
-        user = await base_services.delete_object(
-            session=session,
-            model=User,
-            where_statements=[or_(User.username == login, User.email == login)],
-            return_object=True
-        )
-        return user
+        user_id, is_active, user_password = result.one()
     except NoResultFound:
         await raise_404()
+    if not is_active:
+        raise HTTPException(
+            status_code=400,
+            detail="The user is not active",
+        )
+    if not await verify_password_async(password, user_password):
+        raise HTTPException(
+            status_code=400,
+            detail="Provided password is incorrect",
+        )
+    now = datetime.now()
+    await session.execute(update(User).where(User.id == user_id).values(deleted_at=now))
+    statement = update(Survey).where(Survey.user_id == user_id, Survey.deleted_at.is_(None)) \
+        .values(deleted_at=now).returning(Survey.id)
+    result = await session.execute(statement)
+    survey_ids = result.scalars().all()
+    # a pending confirmation link must not activate the deleted user
+    await session.execute(delete(Verification).where(Verification.user_id == user_id))
+    job = await request_deletion(session=session, target="user", target_id=user_id, user_id=user_id)
+    await invalidate_cached_user(session=session, user_id=user_id)
+    await run_after_commit(session, partial(survey_cache.invalidate, *survey_ids))
+    return job
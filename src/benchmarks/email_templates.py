@@ -0,0 +1,59 @@
+"""
+Compare the cost of rendering the email templates with a new Jinja environment per email
+(how send_email used to work) and with the shared, precompiled one.
+
+    python -m benchmarks.email_templates --number 2000
+"""
+import argparse
+import timeit
+
+from jinja2 import Environment, FileSystemLoader
+
+from app.core.emails import compile_templates, render_template
+from app.core.settings import get_settings
+
+settings = get_settings()
+
+TEMPLATES = {
+    "new_account.html": {
+        "project_name": settings.PROJECT_NAME,
+        "username": "username",
+        "email": "user@example.com",
+        "link": f"{settings.BASE_APP_URI}/auth/confirm-registration/uuid",
+    },
+    "reset_password.html": {
+        "project_name": settings.PROJECT_NAME,
+        "username": "username",
+        "email": "user@example.com",
+        "valid_minutes": settings.EMAIL_RESET_TOKEN_EXPIRE,
+        "token": "token",
+    },
+}
+
+
+def render_with_new_environment(template_name: str, environment: dict) -> str:
+    env = Environment(loader=FileSystemLoader(settings.EMAIL_TEMPLATES_DIR))
+    template = env.get_template(template_name)
+    return template.render(environment)
+
+
+def main(arguments: argparse.Namespace) -> None:
+    compile_templates()
+    for template_name, environment in TEMPLATES.items():
+        print(template_name)
+        for name, render in (("new environment", render_with_new_environment), ("precompiled", render_template)):
+            seconds = min(
+                timeit.repeat(
+                    lambda: render(template_name, environment),
+                    number=arguments.number,
+                    repeat=arguments.repeat,
+                )
+            )
+            print(f"  {name:16} {seconds / arguments.number * 1_000_000:9.1f} us per render")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=1000, help="renders per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="measurements, the best one is printed")
+    main(parser.parse_args())
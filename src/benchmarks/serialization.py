@@ -0,0 +1,84 @@
+"""
+Compare the CPU time spent serializing a page of surveys by FastAPI's default path
+(validation against the response model, jsonable_encoder and json.dumps) with the direct one
+(page_response with the stdlib encoder and with orjson), for several page sizes.
+
+    python -m benchmarks.serialization --sizes 10 50 100
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Callable, List
+from unittest import mock
+from uuid import uuid4
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from fastapi_pagination import Page, Params, paginate
+from fastapi_pagination.api import set_page
+
+from app.api.responses import page_response, raw_pages
+from app.schemas.survey import SurveyOut
+
+RESPONSE_FIELD = create_response_field(name="response", type_=Page[SurveyOut])
+
+
+def build_surveys(count: int) -> List[SimpleNamespace]:
+    # ORM-like objects, as the services return them
+    return [
+        SimpleNamespace(
+            id=uuid4(),
+            name=f"survey {index}",
+            description="description " * 20,
+            created_at=datetime.now(),
+            user_id=uuid4(),
+        )
+        for index in range(count)
+    ]
+
+
+async def default_path(surveys: List[SimpleNamespace], params: Params) -> bytes:
+    with set_page(Page[SurveyOut]):
+        page = paginate(surveys, params=params)
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=page)
+    return JSONResponse(content=content).body
+
+
+async def direct_path(surveys: List[SimpleNamespace], params: Params) -> bytes:
+    with raw_pages():
+        page = paginate(surveys, params=params)
+    return page_response(page=page, schema=SurveyOut).body
+
+
+async def measure(path: Callable, surveys: List[SimpleNamespace], params: Params, number: int) -> float:
+    started_at = time.process_time()
+    for _ in range(number):
+        await path(surveys, params)
+    return (time.process_time() - started_at) / number
+
+
+async def main(arguments: argparse.Namespace) -> None:
+    for size in arguments.sizes:
+        surveys = build_surveys(size)
+        params = Params(page=1, size=size)
+        number = max(1, arguments.items // size)
+        print(f"{size} surveys per page")
+        for name, path, orjson_responses in (
+            ("default", default_path, False),
+            ("direct, json", direct_path, False),
+            ("direct, orjson", direct_path, True),
+        ):
+            with mock.patch("app.api.responses.settings.ORJSON_RESPONSES", orjson_responses):
+                seconds = min([await measure(path, surveys, params, number) for _ in range(arguments.repeat)])
+            print(f"  {name:16} {seconds * 1000:9.3f} ms CPU per request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100], help="surveys per page, at most 100")
+    parser.add_argument("--items", type=int, default=20_000, help="surveys serialized per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="measurements, the best one is printed")
+    asyncio.run(main(parser.parse_args()))
@@ -21,8 +21,8 @@ from app.models import Base, User, Survey, SurveyAttribute, Answer
 from app.schemas import survey as survey_schemas
 from app.services.answer import create_answer_attrs
 from app.services.base import is_object_exists
-from app.services.survey import create_survey_attrs
-from app.services.user import get_user
+from app.services.survey import create_survey_attrs, survey_cache
+from app.services.user import get_user, user_cache
 from tests.factories import UserFactory, SurveyAttributeFactory, SurveyFactory, AnswerAttributeFactory, AnswerFactory
 from tests.utils import build_answer_attrs_with_survey_attrs
 
@@ -45,13 +45,24 @@ def event_loop():
 @pytest.fixture(scope="session", autouse=True)
 async def patch_send_email() -> None:
     """
-    Patch send_email function to not send emails during tests
+    Patch SMTP delivery to not send emails during tests
     :return: None
     """
-    with mock.patch("app.core.emails.send_email"):
+    with mock.patch("app.core.emails.SMTPPool._send", new_callable=mock.AsyncMock):
         yield
 
 
+@pytest.fixture(scope="function", autouse=True)
+async def clear_caches() -> None:
+    """
+    Drop cached values between tests, tables are recreated for every test
+    :return: None
+    """
+    await user_cache.clear()
+    await survey_cache.clear()
+    yield
+
+
 @pytest.fixture(scope="session")
 async def engine() -> Engine:
     return create_async_engine(settings.SQLALCHEMY_DATABASE_URI)
@@ -91,13 +102,6 @@ async def admin_user_data() -> dict:
     return get_admin_user_data()
 
 
-@pytest.fixture(scope="function")
-async def task() -> mock.Mock:
-    task = mock.Mock()
-    task.add_task = mock.MagicMock()
-    return task
-
-
 @pytest.fixture(scope="function")
 async def factory_users(request, session: AsyncSession, user_factory: UserFactory) -> Union[User, List[User]]:
     users: List[User] = user_factory.build_batch(request.param)
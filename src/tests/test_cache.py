@@ -0,0 +1,39 @@
+from unittest import mock
+
+from app.core.cache import Cache, LRUCacheBackend
+
+
+async def test_lru_eviction():
+    backend = LRUCacheBackend(maxsize=2)
+    await backend.set("first", 1, ttl=60)
+    await backend.set("second", 2, ttl=60)
+    await backend.get("first")
+    await backend.set("third", 3, ttl=60)
+    assert await backend.get("second") is None
+    assert await backend.get("first") == 1
+    assert await backend.get("third") == 3
+
+
+async def test_ttl_expiration():
+    backend = LRUCacheBackend(maxsize=2)
+    with mock.patch("app.core.cache.time.monotonic", return_value=100):
+        await backend.set("key", "value", ttl=10)
+    with mock.patch("app.core.cache.time.monotonic", return_value=111):
+        assert await backend.get("key") is None
+    assert len(backend) == 0
+
+
+async def test_hit_miss_counters():
+    cache = Cache(namespace="test", backend=LRUCacheBackend(maxsize=10), ttl=60)
+    await cache.get("key")
+    await cache.set("key", "value")
+    assert await cache.get("key") == "value"
+    await cache.invalidate("key")
+    assert await cache.get("key") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "hit_ratio": 1 / 3}
+
+
+async def test_disabled_cache():
+    cache = Cache(namespace="test", backend=LRUCacheBackend(maxsize=10), ttl=60, enabled=False)
+    await cache.set("key", "value")
+    assert await cache.get("key") is None
@@ -9,12 +9,13 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.settings import get_settings
-from app.models import Survey, Answer, AnswerAttribute
+from app.models import Survey, Answer, AnswerAttribute, User
 from app.schemas import survey as schemas
 from app.schemas.survey import AnswerRetrieve
 from app.services import base as base_services
 from tests.factories import AnswerAttributeFactory
 from tests.test_endpoints.utils import uuid_to_str, serialize_uuid_to_str
+from tests.utils import build_answer_attrs_with_survey_attrs
 
 settings = get_settings()
 
@@ -152,3 +153,33 @@ class TestGetAnswer:
     async def test_not_exists_answer_and_without_user(self, session: AsyncSession, test_client: AsyncClient):
         response = await test_client.get(f"/answer/{uuid4()}")
         assert response.status_code == 404
+
+
+class TestAddAnswersBatch:
+    @pytest.mark.parametrize("factory_users", [2], indirect=True)
+    async def test_json_array(self, auth_test_client: AsyncClient, factory_survey: Survey, factory_users: List[User]):
+        attrs = await build_answer_attrs_with_survey_attrs(survey=factory_survey)
+        items = [{"available": True, "attrs": attrs, "user_id": str(user.id)} for user in factory_users]
+        response = await auth_test_client.post(f"/answer/{factory_survey.id}/batch", json=items)
+        report = json.loads(response.content.decode("utf-8"))
+        assert response.status_code == 200
+        assert report["created"] == 2
+
+    @pytest.mark.parametrize("factory_users", [2], indirect=True)
+    async def test_ndjson(self, auth_test_client: AsyncClient, factory_survey: Survey, factory_users: List[User]):
+        attrs = await build_answer_attrs_with_survey_attrs(survey=factory_survey)
+        lines = [json.dumps({"available": True, "attrs": attrs, "user_id": str(user.id)}) for user in factory_users]
+        lines.append("not json")
+        response = await auth_test_client.post(
+            f"/answer/{factory_survey.id}/batch",
+            content="\n".join(lines).encode("utf-8"),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        report = json.loads(response.content.decode("utf-8"))
+        assert response.status_code == 200
+        assert report["created"] == 2
+        assert report["items"][2]["status_code"] == 422
+
+    async def test_not_array(self, auth_test_client: AsyncClient, factory_survey: Survey):
+        response = await auth_test_client.post(f"/answer/{factory_survey.id}/batch", json={"attrs": []})
+        assert response.status_code == 422
@@ -1,10 +1,10 @@
 import json
-from unittest import mock
 
 import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.security import generate_verification_token
 from app.core.settings import get_settings
 from app.models import User
 from app.services import auth as auth_services
@@ -88,6 +88,16 @@ class TestConfirmEmail:
         )
         assert response.status_code == 200
 
+    @pytest.mark.parametrize("admin_user", [{"is_active": False}], indirect=True)
+    async def test_with_token(self, tables, admin_user: User, test_client: AsyncClient):
+        token = generate_verification_token(user_id=admin_user.id)
+        response = await test_client.get(f"auth/confirm-registration/{token}")
+        assert response.status_code == 200
+
+    async def test_with_invalid_token(self, tables, test_client: AsyncClient):
+        response = await test_client.get("auth/confirm-registration/token")
+        assert response.status_code == 400
+
 
 class TestRecoverPassword:
     async def test_for_exists_user(self, admin_user: User, test_client: AsyncClient):
@@ -104,12 +114,10 @@ class TestResetPassword:
             self,
             admin_user: User,
             session: AsyncSession,
-            task: mock.Mock,
             test_client: AsyncClient
     ):
         reset_token = await auth_services.recover_password(
             session=session,
-            task=task,
             email=admin_user.email,
         )
         response = await test_client.post(
@@ -129,13 +137,11 @@ class TestResetPassword:
     async def test_for_inactive_user(
             self,
             admin_user: User,
-            task: mock.Mock,
             session: AsyncSession,
             test_client: AsyncClient
     ):
         reset_token = await auth_services.recover_password(
             session=session,
-            task=task,
             email=admin_user.email,
         )
         response = await test_client.post("auth/reset-password", json={"reset_token": reset_token, "new_password": "password"})
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+from httpx import AsyncClient
+
+
+class TestGetPool:
+    async def test_for_superuser(self, auth_test_client: AsyncClient):
+        response = await auth_test_client.get("/monitoring/pool")
+        pool = json.loads(response.content.decode("utf-8"))
+        assert response.status_code == 200
+        assert pool["checkouts"] >= 1
+        assert pool["checked_out"] >= 0
+
+    @pytest.mark.parametrize("user_and_its_pass", [{"is_active": True, "is_superuser": False}], indirect=True)
+    async def test_for_not_superuser(self, user_auth_test_client: AsyncClient):
+        response = await user_auth_test_client.get("/monitoring/pool")
+        assert response.status_code == 400
+
+
+class TestGetReplicas:
+    async def test_without_replicas(self, auth_test_client: AsyncClient):
+        response = await auth_test_client.get("/monitoring/replicas")
+        assert response.status_code == 200
+        assert json.loads(response.content.decode("utf-8")) == []
+
+
+class TestGetCaches:
+    async def test_survey_cache_hit(self, test_client: AsyncClient, auth_test_client: AsyncClient, factory_survey):
+        await test_client.get(f"/survey/{factory_survey.id}")
+        await test_client.get(f"/survey/{factory_survey.id}")
+        response = await auth_test_client.get("/monitoring/caches")
+        caches = {cache["namespace"]: cache for cache in json.loads(response.content.decode("utf-8"))}
+        assert response.status_code == 200
+        assert caches["survey"]["hits"] >= 1
+        assert 0 < caches["survey"]["hit_ratio"] <= 1
+
+
+class TestGetDeletions:
+    async def test_unfinished_job_is_listed(self, auth_test_client: AsyncClient, factory_survey):
+        await auth_test_client.delete(f"/survey/{factory_survey.id}")
+        response = await auth_test_client.get("/monitoring/deletions")
+        jobs = json.loads(response.content.decode("utf-8"))
+        assert response.status_code == 200
+        assert [job["target_id"] for job in jobs] == [str(factory_survey.id)]
+
+
+class TestGetMetrics:
+    async def test_prometheus_format(self, test_client: AsyncClient):
+        await test_client.get("/monitoring/pool")
+        response = await test_client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'route="/monitoring/pool",status="401"' in response.text
@@ -1,3 +1,5 @@
+import csv
+import io
 import json
 import random
 from typing import Dict, List
@@ -8,10 +10,12 @@ from faker import Faker
 from httpx import AsyncClient
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 
-from app.models import User, Survey, SurveyAttribute
+from app.models import Answer, User, Survey, SurveyAttribute
 from app.schemas.survey import SurveyOut, SurveyAttributeRetrieve
 from app.services import base as base_services
+from tests.utils import build_deletion_worker
 
 fake = Faker()
 
@@ -72,6 +76,51 @@ class TestGetSurvey:
         factory_surveys = [SurveyOut.from_orm(survey).dict() for survey in factory_surveys]
         assert filter(lambda survey: survey["available"] is False, factory_surveys) not in surveys
 
+    async def test_not_modified(self, test_client: AsyncClient, factory_survey: Survey):
+        response = await test_client.get(f"/survey/{factory_survey.id}")
+        etag = response.headers["etag"]
+        response = await test_client.get(f"/survey/{factory_survey.id}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert not response.content
+
+    async def test_not_modified_since(self, test_client: AsyncClient, factory_survey: Survey):
+        response = await test_client.get(f"/survey/{factory_survey.id}")
+        response = await test_client.get(
+            f"/survey/{factory_survey.id}",
+            headers={"If-Modified-Since": response.headers["last-modified"]},
+        )
+        assert response.status_code == 304
+
+    async def test_etag_changes_on_update(
+            self,
+            test_client: AsyncClient,
+            auth_test_client: AsyncClient,
+            factory_survey: Survey,
+    ):
+        response = await test_client.get(f"/survey/{factory_survey.id}")
+        etag = response.headers["etag"]
+        await auth_test_client.patch(f"/survey/attr/{factory_survey.attrs[0].id}", json={"question": fake.text()})
+        response = await test_client.get(f"/survey/{factory_survey.id}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    async def test_owner_is_not_cached_publicly(self, auth_test_client: AsyncClient, factory_survey: Survey):
+        response = await auth_test_client.get(f"/survey/{factory_survey.id}")
+        assert response.headers["cache-control"] == "private, no-cache"
+
+    async def test_cached_survey_is_invalidated_on_update(
+            self,
+            test_client: AsyncClient,
+            auth_test_client: AsyncClient,
+            factory_survey: Survey,
+    ):
+        await test_client.get(f"/survey/{factory_survey.id}")
+        name = fake.name()
+        await auth_test_client.patch(f"/survey/{factory_survey.id}", json={"name": name})
+        response = await test_client.get(f"/survey/{factory_survey.id}")
+        assert json.loads(response.content.decode("utf-8"))["name"] == name
+
 
 class TestGetSurveys:
     @pytest.mark.parametrize("factory_surveys", [5], indirect=True)
@@ -92,6 +141,29 @@ class TestGetSurveys:
         assert len(surveys) == 2
 
 
+class TestGetSurveysByCursor:
+    @pytest.mark.parametrize("factory_surveys", [5], indirect=True)
+    async def test_for_exists(self, test_client: AsyncClient, factory_surveys: List[Survey]):
+        response = await test_client.get("/survey/cursor")
+        surveys = json.loads(response.content.decode("utf-8"))["items"]
+        assert response.status_code == 200
+        assert len(surveys) == len([survey for survey in factory_surveys if survey.available])
+
+    @pytest.mark.parametrize("factory_surveys", [10], indirect=True)
+    async def test_next_page(self, test_client: AsyncClient, factory_surveys: List[Survey]):
+        response = await test_client.get("/survey/cursor?size=1")
+        content = json.loads(response.content.decode("utf-8"))
+        if content["next_cursor"]:
+            response = await test_client.get(f"/survey/cursor?size=1&cursor={content['next_cursor']}")
+            next_content = json.loads(response.content.decode("utf-8"))
+            assert response.status_code == 200
+            assert next_content["items"] != content["items"]
+
+    async def test_invalid_cursor(self, test_client: AsyncClient, tables):
+        response = await test_client.get("/survey/cursor?cursor=cursor")
+        assert response.status_code == 400
+
+
 class TestUpdateSurvey:
     async def test_for_exists(self, auth_test_client: AsyncClient, factory_survey: Survey):
         to_update = fake.name()
@@ -274,7 +346,8 @@ class TestDeleteSurvey:
         response = await auth_test_client.delete(
             f"/survey/{factory_surveys[2].id}"
         )
-        assert response.status_code == 204
+        assert response.status_code == 202
+        assert json.loads(response.content.decode("utf-8"))["status"] == "pending"
         assert not await base_services.is_object_exists(
             session=session,
             where_statement=select(Survey).where(Survey.id == factory_surveys[2].id)
@@ -285,15 +358,25 @@ class TestDeleteSurvey:
         assert response.status_code == 404
 
     @pytest.mark.parametrize("factory_surveys", [5], indirect=True)
-    async def test_cascade_deletion(self, session: AsyncSession, auth_test_client, factory_surveys: List[Survey]):
+    async def test_cascade_deletion(
+            self,
+            session: AsyncSession,
+            session_maker: sessionmaker,
+            auth_test_client,
+            factory_surveys: List[Survey],
+    ):
         response = await auth_test_client.delete(
             f"/survey/{factory_surveys[2].id}"
         )
-        assert response.status_code == 204
+        assert response.status_code == 202
+        await build_deletion_worker(session_maker=session_maker).run_job()
         assert not await base_services.is_object_exists(
             session=session,
             where_statement=select(SurveyAttribute).where(SurveyAttribute.id == factory_surveys[2].attrs[0].id)
         )
+        response = await auth_test_client.get(f"/deletion/{json.loads(response.content.decode('utf-8'))['id']}")
+        assert response.status_code == 200
+        assert json.loads(response.content.decode("utf-8"))["status"] == "done"
 
     @pytest.mark.parametrize("factory_surveys", [5], indirect=True)
     async def test_not_author(
@@ -306,6 +389,11 @@ class TestDeleteSurvey:
         )
         assert response.status_code == 404
 
+    @pytest.mark.parametrize("factory_surveys", [5], indirect=True)
+    async def test_attr_of_not_author(self, factory_surveys: List[Survey], user_auth_test_client: AsyncClient):
+        response = await user_auth_test_client.delete(f"survey/attr/{factory_surveys[0].attrs[0].id}")
+        assert response.status_code == 404
+
 
 class TestDeleteSurveyAttribute:
     @pytest.mark.parametrize("factory_surveys", [5], indirect=True)
@@ -430,3 +518,78 @@ class TestGetSurveyAttribute:
                 continue
         response = await test_client.get(f"/survey/attr/{expected_attr.id}")
         assert response.status_code == 404
+
+
+class TestGetSurveyResults:
+    async def test_for_owner(self, auth_test_client: AsyncClient, factory_survey: Survey):
+        response = await auth_test_client.get(f"/survey/{factory_survey.id}/results?top=5")
+        results = json.loads(response.content.decode("utf-8"))
+        assert response.status_code == 200
+        assert results["answers_count"] == 0
+        assert {attr["survey_attr_id"] for attr in results["attrs"]} == {str(attr.id) for attr in factory_survey.attrs}
+
+    @pytest.mark.parametrize("user_and_its_pass", [{"is_active": True, "is_superuser": False}], indirect=True)
+    async def test_for_not_owner(self, factory_survey: Survey, user_auth_test_client: AsyncClient):
+        response = await user_auth_test_client.get(f"/survey/{factory_survey.id}/results")
+        assert response.status_code == 403
+
+    async def test_for_not_exists_survey(self, auth_test_client: AsyncClient):
+        response = await auth_test_client.get(f"/survey/{uuid4()}/results")
+        assert response.status_code == 404
+
+
+class TestGetSurveyAnswers:
+    @pytest.mark.parametrize("factory_answer", [True], indirect=True)
+    async def test_for_owner(self, auth_test_client: AsyncClient, factory_survey: Survey, factory_answer: Answer):
+        response = await auth_test_client.get(f"/survey/{factory_survey.id}/answers?size=10")
+        page = json.loads(response.content.decode("utf-8"))
+        assert response.status_code == 200
+        assert [answer["id"] for answer in page["items"]] == [str(factory_answer.id)]
+        assert len(page["items"][0]["attrs"]) == len(factory_answer.attrs)
+        assert page["next_cursor"] is None
+
+    @pytest.mark.parametrize("user_and_its_pass", [{"is_active": True, "is_superuser": False}], indirect=True)
+    async def test_for_not_owner(self, factory_survey: Survey, user_auth_test_client: AsyncClient):
+        response = await user_auth_test_client.get(f"/survey/{factory_survey.id}/answers")
+        assert response.status_code == 403
+
+
+class TestExportSurveyAnswers:
+    @pytest.mark.parametrize("factory_answer", [True], indirect=True)
+    async def test_csv(self, auth_test_client: AsyncClient, factory_survey: Survey, factory_answer: Answer):
+        response = await auth_test_client.get(f"/survey/{factory_survey.id}/export")
+        rows = list(csv.reader(io.StringIO(response.content.decode("utf-8"))))
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert rows[0][:3] == ["id", "user_id", "created_at"]
+        assert len(rows) == 2
+        assert rows[1][0] == str(factory_answer.id)
+        assert sorted(rows[1][3:]) == sorted(attr.text for attr in factory_answer.attrs)
+
+    @pytest.mark.parametrize("factory_answer", [True], indirect=True)
+    async def test_ndjson(self, auth_test_client: AsyncClient, factory_survey: Survey, factory_answer: Answer):
+        response = await auth_test_client.get(f"/survey/{factory_survey.id}/export?format=ndjson")
+        lines = [json.loads(line) for line in response.content.decode("utf-8").splitlines()]
+        assert response.status_code == 200
+        assert len(lines) == 1
+        assert lines[0]["id"] == str(factory_answer.id)
+        assert lines[0]["attrs"] == {str(attr.survey_attr_id): attr.text for attr in factory_answer.attrs}
+
+    @pytest.mark.parametrize("factory_answer", [True], indirect=True)
+    async def test_unavailable_answer_isnt_exported(
+            self,
+            session: AsyncSession,
+            auth_test_client: AsyncClient,
+            factory_survey: Survey,
+            factory_answer: Answer,
+    ):
+        factory_answer.available = False
+        await session.commit()
+        response = await auth_test_client.get(f"/survey/{factory_survey.id}/export?format=ndjson")
+        assert response.status_code == 200
+        assert not response.content.decode("utf-8").splitlines()
+
+    @pytest.mark.parametrize("user_and_its_pass", [{"is_active": True, "is_superuser": False}], indirect=True)
+    async def test_for_not_owner(self, factory_survey: Survey, user_auth_test_client: AsyncClient):
+        response = await user_auth_test_client.get(f"/survey/{factory_survey.id}/export")
+        assert response.status_code == 403
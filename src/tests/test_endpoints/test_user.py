@@ -75,6 +75,19 @@ class TestGetUsers:
         assert len(users) == 3
 
 
+class TestGetUsersByCursor:
+    @pytest.mark.parametrize("factory_users", [5], indirect=True)
+    async def test_with_pagination(self, test_client: AsyncClient, factory_users: List[User]):
+        response = await test_client.get("user/cursor?size=3")
+        content = json.loads(response.content.decode("utf-8"))
+        assert response.status_code == 200
+        assert len(content["items"]) == 3
+        response = await test_client.get(f"user/cursor?size=3&cursor={content['next_cursor']}")
+        next_content = json.loads(response.content.decode("utf-8"))
+        assert len(next_content["items"]) == 2
+        assert next_content["next_cursor"] is None
+
+
 class TestGetUser:
     @pytest.mark.parametrize("factory_users", [5], indirect=True)
     async def test_for_exists_user(
@@ -134,7 +147,7 @@ class TestDeleteUser:
             "user",
             data={"login": user_and_its_pass["user"].username, "password": user_and_its_pass["password"]}
         )
-        assert response.status_code == 204
+        assert response.status_code == 202
         assert not await base_services.is_object_exists(
             session=session,
             where_statement=select(User).where(User.id == user_and_its_pass["user"].id)
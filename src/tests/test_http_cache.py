@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+
+from starlette.requests import Request
+
+from app.core.http_cache import is_not_modified, make_etag, to_http_date
+
+
+def build_request(headers: dict) -> Request:
+    return Request({
+        "type": "http",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def test_if_none_match():
+    etag = make_etag("id", 2, "public")
+    assert is_not_modified(build_request({"If-None-Match": f'"other", {etag}'}), etag, datetime.now())
+    assert is_not_modified(build_request({"If-None-Match": '"id-2-public"'}), etag, datetime.now())
+    assert not is_not_modified(build_request({"If-None-Match": make_etag("id", 1, "public")}), etag, datetime.now())
+
+
+def test_if_none_match_takes_precedence():
+    last_modified = datetime.now()
+    request = build_request({"If-None-Match": '"other"', "If-Modified-Since": to_http_date(last_modified)})
+    assert not is_not_modified(request, make_etag("id", 1), last_modified)
+
+
+def test_if_modified_since():
+    last_modified = datetime.now()
+    etag = make_etag("id", 1)
+    assert is_not_modified(build_request({"If-Modified-Since": to_http_date(last_modified)}), etag, last_modified)
+    request = build_request({"If-Modified-Since": to_http_date(last_modified - timedelta(seconds=5))})
+    assert not is_not_modified(request, etag, last_modified)
+    assert not is_not_modified(build_request({"If-Modified-Since": "invalid"}), etag, last_modified)
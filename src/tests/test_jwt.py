@@ -2,6 +2,7 @@ import jwt
 from httpx import AsyncClient
 
 from app.core import jwt as auth_jwt
+from app.core.security import generate_verification_token
 from app.core.settings import get_settings
 from app.models import User
 
@@ -23,3 +24,9 @@ async def test_create_jwt_token(admin_user: User):
     token = auth_jwt.create_access_token(user_id=admin_user.id).get("access_token")
     decoded_access_token = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.TOKEN_ENCODE_ALGORITHM])
     assert decoded_access_token.get("user_id") == str(admin_user.id)
+
+
+async def test_verification_token_isnt_access_token(admin_user: User, test_client: AsyncClient):
+    token = generate_verification_token(user_id=admin_user.id)
+    response = await test_client.get("user/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 403
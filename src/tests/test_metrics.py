@@ -0,0 +1,65 @@
+from fastapi import FastAPI
+from httpx import AsyncClient
+from sqlalchemy import create_engine, text
+
+from app.core.metrics import (
+    Histogram, MetricsMiddleware, RequestMetrics, current_request_metrics, request_db_statements, request_duration,
+)
+
+engine = create_engine("sqlite://")
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/item/{id_}")
+    async def get_item(id_: int):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+        return {"id": id_}
+
+    return app
+
+
+def test_histogram_render():
+    histogram = Histogram(name="test", documentation="Test.", labelnames=("route",), buckets=(1, 5))
+    histogram.observe(("/",), 0.5)
+    histogram.observe(("/",), 3)
+    histogram.observe(("/",), 10)
+    assert histogram.render() == [
+        "# HELP test Test.",
+        "# TYPE test histogram",
+        'test_bucket{route="/",le="1"} 1',
+        'test_bucket{route="/",le="5"} 2',
+        'test_bucket{route="/",le="+Inf"} 3',
+        'test_sum{route="/"} 13.5',
+        'test_count{route="/"} 3',
+    ]
+
+
+def test_statements_are_counted():
+    request_metrics = RequestMetrics()
+    token = current_request_metrics.set(request_metrics)
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    finally:
+        current_request_metrics.reset(token)
+    assert request_metrics.statements == 1
+    assert request_metrics.db_seconds > 0
+
+
+async def test_middleware_records_route_template():
+    request_duration.clear()
+    request_db_statements.clear()
+    async with AsyncClient(app=build_app(), base_url="http://testserver") as client:
+        await client.get("/item/1")
+        await client.get("/item/2")
+        await client.get("/not-found")
+    assert 'http_request_duration_seconds_count{method="GET",route="/item/{id_}",status="200"} 2' in \
+        request_duration.render()
+    assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1' in \
+        request_duration.render()
+    assert 'http_request_db_statements_sum{method="GET",route="/item/{id_}"} 4.0' in request_db_statements.render()
@@ -0,0 +1,45 @@
+import time
+from unittest import mock
+
+import pytest
+from sqlalchemy import exc
+from sqlalchemy.util import greenlet_spawn
+
+from app.db.base import InstrumentedQueuePool
+
+
+def slow_connect() -> mock.Mock:
+    time.sleep(0.05)
+    return mock.Mock()
+
+
+def failed_connect() -> mock.Mock:
+    raise ConnectionRefusedError()
+
+
+async def test_connect_time_isnt_counted_as_wait():
+    pool = InstrumentedQueuePool(slow_connect, pool_size=1, max_overflow=0)
+    connection = await greenlet_spawn(pool.connect)
+    assert pool.stats.checkouts == 1
+    assert pool.stats.connects == 1
+    assert pool.stats.max_connect_seconds >= 0.05
+    assert pool.stats.max_wait_seconds < 0.05
+    connection.close()
+
+
+async def test_checkout_timeout():
+    pool = InstrumentedQueuePool(mock.Mock, pool_size=1, max_overflow=0, timeout=0.05)
+    connection = await greenlet_spawn(pool.connect)
+    with pytest.raises(exc.TimeoutError):
+        await greenlet_spawn(pool.connect)
+    assert pool.stats.timeouts == 1
+    assert pool.stats.max_wait_seconds >= 0.05
+    connection.close()
+
+
+async def test_connect_error_isnt_a_timeout():
+    pool = InstrumentedQueuePool(failed_connect, pool_size=1, max_overflow=0)
+    with pytest.raises(ConnectionRefusedError):
+        await greenlet_spawn(pool.connect)
+    assert pool.stats.timeouts == 0
+    assert pool.stats.connect_errors == 1
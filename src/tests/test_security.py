@@ -1,6 +1,39 @@
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
 from app.core import security
 
 
 def test_password_hashing():
     hashed_password = security.get_password_hash(password="password")
-    assert security.verify_password(plain_password="password", hashed_password=hashed_password)
\ No newline at end of file
+    assert security.verify_password(plain_password="password", hashed_password=hashed_password)
+
+
+async def test_async_password_hashing():
+    hashed_password = await security.get_password_hash_async(password="password")
+    assert await security.verify_password_async(plain_password="password", hashed_password=hashed_password)
+    assert not await security.verify_password_async(plain_password="another", hashed_password=hashed_password)
+
+
+async def test_password_hasher_rejects_over_queue_limit():
+    hasher = security.PasswordHasher(workers=1, max_queue=0)
+    hasher.in_flight = 1
+    with pytest.raises(HTTPException) as exception_info:
+        await hasher.hash("password")
+    assert exception_info.value.status_code == 503
+    assert hasher.stats()["rejected"] == 1
+    hasher.shutdown()
+
+
+def test_verification_token():
+    user_id = uuid4()
+    token = security.generate_verification_token(user_id=user_id)
+    assert security.verify_verification_token(token) == user_id
+
+
+def test_verification_token_is_rejected_when_tampered():
+    token = security.generate_verification_token(user_id=uuid4())
+    assert security.verify_verification_token(token[:-2]) is None
+    assert security.verify_verification_token("token") is None
@@ -0,0 +1,47 @@
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
+from uuid import uuid4
+
+import pytest
+from fastapi_pagination import Page, Params, paginate
+from fastapi_pagination.api import set_page
+
+from app.api.responses import page_response, raw_pages
+from app.core.serialization import serialize_object
+from app.schemas.survey import SurveyOut, SurveyRetrieve
+
+
+def build_survey() -> SimpleNamespace:
+    attr = SimpleNamespace(id=uuid4(), question="question", required=True, available=True)
+    return SimpleNamespace(
+        id=uuid4(),
+        name="name",
+        description="description",
+        created_at=datetime.now(),
+        user_id=uuid4(),
+        attrs=[attr],
+    )
+
+
+def test_serialize_object_matches_from_orm():
+    survey = build_survey()
+    assert serialize_object(survey, SurveyRetrieve) == SurveyRetrieve.from_orm(survey).dict()
+
+
+def test_serialize_object_from_mapping():
+    survey = SurveyOut.from_orm(build_survey()).dict()
+    assert serialize_object(survey, SurveyOut) == survey
+
+
+@pytest.mark.parametrize("orjson_responses", [True, False])
+def test_page_response_matches_validated_page(orjson_responses: bool):
+    surveys = [build_survey() for _ in range(3)]
+    with raw_pages():
+        page = paginate(surveys, params=Params(page=1, size=2))
+    with set_page(Page[SurveyOut]):
+        expected = paginate(surveys, params=Params(page=1, size=2))
+    with mock.patch("app.api.responses.settings.ORJSON_RESPONSES", orjson_responses):
+        response = page_response(page=page, schema=SurveyOut)
+    assert json.loads(response.body) == json.loads(expected.json())
@@ -1,4 +1,5 @@
 import random
+from datetime import timedelta
 from typing import List
 from uuid import uuid4
 
@@ -9,6 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import AnswerAttribute, User, Survey, Answer
 from app.schemas import survey as schemas
+from app.schemas.pagination import CursorParams
 from app.services import answer as answer_services
 from app.services import base as base_services
 from tests.factories import AnswerAttributeFactory
@@ -52,6 +54,42 @@ class TestCreateAnswer:
             ).execute()
             assert exception.value.status_code == 404
 
+    async def test_400_duplicate_survey_attr(
+            self,
+            admin_user: User,
+            session: AsyncSession,
+            factory_survey: Survey,
+            build_answer: Answer
+    ):
+        expected_answer = schemas.BaseAnswer.from_orm(build_answer)
+        expected_answer.attrs.append(expected_answer.attrs[0])
+        with pytest.raises(HTTPException) as exception:
+            await answer_services.CreateAnswer(
+                session=session,
+                answer=expected_answer,
+                user_id=admin_user.id,
+                survey_id=factory_survey.id
+            ).execute()
+        assert exception.value.status_code == 400
+
+    @pytest.mark.parametrize("factory_surveys", [2], indirect=True)
+    async def test_404_attr_of_another_survey(
+            self,
+            admin_user: User,
+            session: AsyncSession,
+            factory_surveys: List[Survey],
+    ):
+        attrs = await build_answer_attrs_with_survey_attrs(survey=factory_surveys[1])
+        answer = schemas.BaseAnswer(available=True, attrs=attrs)
+        with pytest.raises(HTTPException) as exception:
+            await answer_services.CreateAnswer(
+                session=session,
+                answer=answer,
+                user_id=admin_user.id,
+                survey_id=factory_surveys[0].id
+            ).execute()
+        assert exception.value.status_code == 404
+
     async def test_409(
             self,
             admin_user: User,
@@ -68,7 +106,9 @@ class TestCreateAnswer:
                 user_id=admin_user.id,
                 survey_id=factory_answer.survey_id
             ).execute()
-            assert exception.value.status_code == 409
+        assert exception.value.status_code == 409
+        # only the savepoint is rolled back, objects loaded by the session aren't expired
+        assert factory_answer.survey_id == factory_survey.id
 
     async def test_not_exists_survey(
             self,
@@ -88,6 +128,54 @@ class TestCreateAnswer:
             assert exception.value.status_code == 404
 
 
+class TestCreateAnswerBatch:
+    @pytest.mark.parametrize("factory_users", [3], indirect=True)
+    async def test_report(
+            self,
+            admin_user: User,
+            session: AsyncSession,
+            factory_survey: Survey,
+            factory_users: List[User]
+    ):
+        attrs = await build_answer_attrs_with_survey_attrs(survey=factory_survey)
+        items = [{"available": True, "attrs": attrs, "user_id": str(user.id)} for user in factory_users]
+        items.append({"available": True, "attrs": attrs, "user_id": str(factory_users[0].id)})
+        items.append({"available": True, "attrs": attrs, "user_id": str(uuid4())})
+        items.append({"available": True, "attrs": attrs + attrs[:1], "user_id": str(admin_user.id)})
+        items.append({"attrs": "attrs"})
+        report = await answer_services.CreateAnswerBatch(
+            session=session,
+            items=items,
+            survey_id=factory_survey.id,
+            user=admin_user,
+        ).execute()
+        assert report.created == 3
+        assert report.failed == 4
+        assert [item.status_code for item in report.items] == [201, 201, 201, 409, 404, 400, 422]
+        result = await session.execute(select(Answer).where(Answer.survey_id == factory_survey.id))
+        assert {answer.id for answer in result.scalars().all()} == {item.id for item in report.items[:3]}
+
+    async def test_not_owner(self, session: AsyncSession, factory_survey: Survey, user_and_its_pass: dict):
+        with pytest.raises(HTTPException) as exception:
+            await answer_services.CreateAnswerBatch(
+                session=session,
+                items=list(),
+                survey_id=factory_survey.id,
+                user=user_and_its_pass["user"],
+            ).execute()
+        assert exception.value.status_code == 403
+
+    async def test_not_exists_survey(self, session: AsyncSession, admin_user: User):
+        with pytest.raises(HTTPException) as exception:
+            await answer_services.CreateAnswerBatch(
+                session=session,
+                items=list(),
+                survey_id=uuid4(),
+                user=admin_user,
+            ).execute()
+        assert exception.value.status_code == 404
+
+
 class TestCreateAnswerAttributes:
     @pytest.mark.parametrize("factory_answer", [False], indirect=True)
     async def test_success(
@@ -208,3 +296,98 @@ class TestGetAnswer:
                 answer_id=uuid4(),
             )
             assert exception.value.status_code == 404
+
+
+class TestGetSurveyAnswersPage:
+    @pytest.mark.parametrize("factory_users", [3], indirect=True)
+    async def test_pages_in_order(
+            self,
+            session: AsyncSession,
+            admin_user: User,
+            factory_survey: Survey,
+            factory_users: List[User],
+    ):
+        attrs = [schemas.AnswerAttribute(**attr) for attr in await build_answer_attrs_with_survey_attrs(factory_survey)]
+        answers = [
+            await answer_services.CreateAnswer(
+                session=session,
+                answer=schemas.BaseAnswer(available=True, attrs=attrs),
+                user_id=user.id,
+                survey_id=factory_survey.id,
+            ).execute()
+            for user in factory_users
+        ]
+        first_page = await answer_services.get_survey_answers_page(
+            session=session,
+            survey_id=factory_survey.id,
+            user=admin_user,
+            params=CursorParams(size=2),
+            filter=schemas.AnswerFilter(),
+        )
+        second_page = await answer_services.get_survey_answers_page(
+            session=session,
+            survey_id=factory_survey.id,
+            user=admin_user,
+            params=CursorParams(size=2, cursor=first_page.next_cursor),
+            filter=schemas.AnswerFilter(),
+        )
+        expected = sorted(answers, key=lambda answer: (answer.created_at, answer.id))
+        assert [answer.id for answer in first_page.items + second_page.items] == [answer.id for answer in expected]
+        assert second_page.next_cursor is None
+        assert all(len(answer.attrs) == len(attrs) for answer in first_page.items + second_page.items)
+
+    @pytest.mark.parametrize("factory_answers", [False], indirect=True)
+    async def test_date_range(self, session: AsyncSession, admin_user: User, factory_answers: List[Answer]):
+        survey_id = factory_answers[0].survey_id
+        factory_answers[0].available = True
+        await session.commit()
+        page = await answer_services.get_survey_answers_page(
+            session=session,
+            survey_id=survey_id,
+            user=admin_user,
+            params=CursorParams(),
+            filter=schemas.AnswerFilter(created_from=factory_answers[0].created_at + timedelta(seconds=1)),
+        )
+        assert not page.items
+        page = await answer_services.get_survey_answers_page(
+            session=session,
+            survey_id=survey_id,
+            user=admin_user,
+            params=CursorParams(),
+            filter=schemas.AnswerFilter(created_to=factory_answers[0].created_at),
+        )
+        assert [answer.id for answer in page.items] == [factory_answers[0].id]
+
+    async def test_unavailable_answers_are_hidden(
+            self,
+            session: AsyncSession,
+            admin_user: User,
+            factory_survey: Survey,
+            user_and_its_pass: dict,
+    ):
+        attrs = [schemas.AnswerAttribute(**attr) for attr in await build_answer_attrs_with_survey_attrs(factory_survey)]
+        answer = await answer_services.CreateAnswer(
+            session=session,
+            answer=schemas.BaseAnswer(available=False, attrs=attrs),
+            user_id=user_and_its_pass["user"].id,
+            survey_id=factory_survey.id,
+        ).execute()
+        page = await answer_services.get_survey_answers_page(
+            session=session,
+            survey_id=factory_survey.id,
+            user=admin_user,
+            params=CursorParams(),
+            filter=schemas.AnswerFilter(),
+        )
+        assert answer.id not in [item.id for item in page.items]
+
+    async def test_not_owner(self, session: AsyncSession, factory_survey: Survey, user_and_its_pass: dict):
+        with pytest.raises(HTTPException) as exception:
+            await answer_services.get_survey_answers_page(
+                session=session,
+                survey_id=factory_survey.id,
+                user=user_and_its_pass["user"],
+                params=CursorParams(),
+                filter=schemas.AnswerFilter(),
+            )
+        assert exception.value.status_code == 403
@@ -1,4 +1,3 @@
-from unittest import mock
 from uuid import uuid4
 
 import pytest
@@ -7,10 +6,11 @@ from fastapi import HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import verify_password
+from app.core.security import generate_verification_token, verify_password
 from app.models import Verification, User
 from app.services import auth as auth_services
 from app.services import base as base_services
+from app.services import user as user_services
 
 
 class TestAuthenticate:
@@ -108,11 +108,31 @@ class TestVerifyRegistrationUser:
             assert exception_info.value.status_code == 404
 
 
+@pytest.mark.parametrize("admin_user", [{"is_active": False}], indirect=True)
+class TestVerifyRegistrationToken:
+    async def test_for_inactive_user(self, session: AsyncSession, admin_user: User):
+        token = generate_verification_token(user_id=admin_user.id)
+        await auth_services.verify_registration_token(session=session, token=token)
+        user = await user_services.get_user(session=session, where_statements=[User.id == admin_user.id])
+        assert user.is_active
+
+    async def test_for_already_active_user(self, session: AsyncSession, admin_user: User):
+        token = generate_verification_token(user_id=admin_user.id)
+        await auth_services.verify_registration_token(session=session, token=token)
+        with pytest.raises(HTTPException) as exception_info:
+            await auth_services.verify_registration_token(session=session, token=token)
+        assert exception_info.value.status_code == 404
+
+    async def test_for_invalid_token(self, session: AsyncSession, admin_user: User):
+        with pytest.raises(HTTPException) as exception_info:
+            await auth_services.verify_registration_token(session=session, token="token")
+        assert exception_info.value.status_code == 400
+
+
 class TestVerifyPasswordResetToken:
-    async def test_for_valid_reset_token(self, session: AsyncSession, admin_user: User, task: mock.Mock):
+    async def test_for_valid_reset_token(self, session: AsyncSession, admin_user: User):
         reset_token = await auth_services.recover_password(
             session=session,
-            task=task,
             email=admin_user.email,
         )
         email = auth_services.verify_password_reset_token(token=reset_token)
@@ -124,29 +144,26 @@ class TestVerifyPasswordResetToken:
 
 
 class TestRecoverPassword:
-    async def test_for_exists_user(self, session: AsyncSession, task: mock.Mock, admin_user: User):
+    async def test_for_exists_user(self, session: AsyncSession, admin_user: User):
         reset_token = await auth_services.recover_password(
             session=session,
-            task=task,
             email=admin_user.email,
         )
         assert auth_services.verify_password_reset_token(token=reset_token)
 
-    async def test_for_not_exists_user(self, session: AsyncSession, task: mock.Mock):
+    async def test_for_not_exists_user(self, session: AsyncSession):
         with pytest.raises(HTTPException) as exception_info:
             await auth_services.recover_password(
                 session=session,
-                task=task,
                 email="some_email@gmail.com",
             )
             assert exception_info.value.status_code == 404
 
 
 class TestResetPassword:
-    async def test_for_valid_reset_token(self, session: AsyncSession, task: mock.Mock, admin_user: User):
+    async def test_for_valid_reset_token(self, session: AsyncSession, admin_user: User):
         reset_token = await auth_services.recover_password(
             session=session,
-            task=task,
             email=admin_user.email,
         )
         updated_user = await auth_services.reset_password(
@@ -165,7 +182,7 @@ class TestResetPassword:
             )
         assert exception_info.value.status_code == 400
 
-    async def test_for_inactive_user(self, session: AsyncSession, task: mock.Mock, admin_user_data: dict):
+    async def test_for_inactive_user(self, session: AsyncSession, admin_user_data: dict):
         admin_user_data["is_active"] = False
         await base_services.insert_object(
             session=session,
@@ -175,7 +192,6 @@ class TestResetPassword:
         )
         reset_token = await auth_services.recover_password(
             session=session,
-            task=task,
             email=admin_user_data.get("email"),
         )
         with pytest.raises(HTTPException) as exception_info:
@@ -1,11 +1,14 @@
 from copy import copy
+from unittest import mock
 
 import pytest
 from fastapi import HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 
 from app.core.settings import get_settings
+from app.db.base import run_after_commit, unit_of_work
 from app.models import User
 from app.services import base as base_services
 
@@ -110,3 +113,43 @@ class TestGetObjects:
     async def test_for_not_exists_objects(self, session: AsyncSession):
         objects = await base_services.get_objects(session=session, model=User)
         assert objects == []
+
+
+class TestUnitOfWork:
+    async def test_committed_at_exit(self, session: AsyncSession, session_maker: sessionmaker, admin_user: User):
+        async with unit_of_work(session_maker=session_maker) as uow_session:
+            await base_services.update_object(
+                session=uow_session,
+                model=User,
+                where_statements=[User.id == admin_user.id],
+                to_update={"first_name": "first_name"},
+            )
+            assert uow_session.in_transaction()
+        user = await base_services.get_object(
+            session=session,
+            statement=select(User).where(User.id == admin_user.id).execution_options(populate_existing=True),
+        )
+        assert user.first_name == "first_name"
+
+    async def test_rolled_back_on_exception(self, session: AsyncSession, session_maker: sessionmaker, admin_user: User):
+        with pytest.raises(RuntimeError):
+            async with unit_of_work(session_maker=session_maker) as uow_session:
+                await base_services.update_object(
+                    session=uow_session,
+                    model=User,
+                    where_statements=[User.id == admin_user.id],
+                    to_update={"first_name": "first_name"},
+                )
+                raise RuntimeError
+        user = await base_services.get_object(
+            session=session,
+            statement=select(User).where(User.id == admin_user.id).execution_options(populate_existing=True),
+        )
+        assert user.first_name == admin_user.first_name
+
+    async def test_after_commit_callbacks(self, session_maker: sessionmaker):
+        callback = mock.AsyncMock()
+        async with unit_of_work(session_maker=session_maker) as uow_session:
+            await run_after_commit(uow_session, callback)
+            callback.assert_not_awaited()
+        callback.assert_awaited_once()
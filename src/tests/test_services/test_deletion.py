@@ -0,0 +1,140 @@
+from datetime import datetime
+from typing import List
+from unittest import mock
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Answer, DeletionJob, Survey, SurveyResult, User
+from app.models.base import INCLUDE_DELETED
+from app.schemas import survey as schemas
+from app.services import answer as answer_services
+from app.services import deletion as deletion_services
+from app.services import survey as survey_services
+from app.services import user as user_services
+from tests.utils import build_deletion_worker, fold_survey_results
+
+
+async def get_job(session: AsyncSession, job: DeletionJob) -> DeletionJob:
+    result = await session.execute(
+        select(DeletionJob).where(DeletionJob.id == job.id).execution_options(populate_existing=True)
+    )
+    return result.scalar_one()
+
+
+async def is_row_left(session: AsyncSession, model, id_) -> bool:
+    statement = select(model.id).where(model.id == id_).execution_options(**{INCLUDE_DELETED: True})
+    result = await session.execute(statement)
+    return result.scalar_one_or_none() is not None
+
+
+async def create_answer(session: AsyncSession, survey: Survey, user: User) -> Answer:
+    attrs = [schemas.AnswerAttribute(text="yes", survey_attr_id=survey_attr.id) for survey_attr in survey.attrs]
+    return await answer_services.CreateAnswer(
+        session=session,
+        answer=schemas.BaseAnswer(available=True, attrs=attrs),
+        user_id=user.id,
+        survey_id=survey.id,
+    ).execute()
+
+
+class TestSoftDelete:
+    @pytest.mark.parametrize("factory_surveys", [3], indirect=True)
+    async def test_deleted_survey_is_hidden(
+            self,
+            session: AsyncSession,
+            admin_user: User,
+            factory_surveys: List[Survey],
+    ):
+        await survey_services.delete_survey(session=session, user=admin_user, id_=factory_surveys[0].id)
+        surveys = await survey_services.get_current_user_surveys(session=session, user=admin_user)
+        assert factory_surveys[0].id not in {survey.id for survey in surveys}
+        assert await is_row_left(session=session, model=Survey, id_=factory_surveys[0].id)
+        with pytest.raises(HTTPException) as exception_info:
+            await survey_services.get_survey(session=session, id_=factory_surveys[0].id, user=admin_user)
+        assert exception_info.value.status_code == 404
+
+    async def test_deleted_survey_cant_be_answered(
+            self,
+            session: AsyncSession,
+            admin_user: User,
+            factory_survey: Survey,
+    ):
+        await survey_services.delete_survey(session=session, user=admin_user, id_=factory_survey.id)
+        with pytest.raises(HTTPException) as exception_info:
+            await create_answer(session=session, survey=factory_survey, user=admin_user)
+        assert exception_info.value.status_code == 404
+
+
+class TestDeletionWorker:
+    async def test_survey_is_purged(
+            self,
+            session: AsyncSession,
+            session_maker: sessionmaker,
+            admin_user: User,
+            factory_survey: Survey,
+    ):
+        answer = await create_answer(session=session, survey=factory_survey, user=admin_user)
+        job = await survey_services.delete_survey(session=session, user=admin_user, id_=factory_survey.id)
+        assert await build_deletion_worker(session_maker=session_maker).run_job()
+        job = await get_job(session=session, job=job)
+        assert job.status == "done"
+        assert job.finished_at
+        assert job.deleted_surveys == 1
+        assert job.deleted_survey_attrs == len(factory_survey.attrs)
+        assert job.deleted_answers == 1
+        assert job.deleted_answer_attrs == len(answer.attrs)
+        assert not await is_row_left(session=session, model=Survey, id_=factory_survey.id)
+        assert not await is_row_left(session=session, model=Answer, id_=answer.id)
+
+    async def test_user_is_purged(
+            self,
+            session: AsyncSession,
+            session_maker: sessionmaker,
+            admin_user: User,
+            factory_survey: Survey,
+            user_and_its_pass: dict,
+    ):
+        user = user_and_its_pass["user"]
+        await create_answer(session=session, survey=factory_survey, user=user)
+        job = await user_services.delete_user(
+            session=session,
+            login=user.username,
+            password=user_and_its_pass["password"],
+        )
+        assert await build_deletion_worker(session_maker=session_maker).run_job()
+        job = await get_job(session=session, job=job)
+        assert job.status == "done"
+        assert job.deleted_answers == 1
+        assert not await is_row_left(session=session, model=User, id_=user.id)
+        # the answer given to the survey of another user is subtracted from its results
+        await fold_survey_results(session_maker=session_maker)
+        result = await session.execute(
+            select(SurveyResult.answers_count).where(SurveyResult.survey_id == factory_survey.id)
+        )
+        assert result.scalar_one() == 0
+
+    async def test_nothing_to_do(self, tables, session_maker: sessionmaker):
+        assert not await build_deletion_worker(session_maker=session_maker).run_job()
+
+    async def test_failed_job_is_retried_later(
+            self,
+            session: AsyncSession,
+            session_maker: sessionmaker,
+            admin_user: User,
+            factory_survey: Survey,
+    ):
+        job = await survey_services.delete_survey(session=session, user=admin_user, id_=factory_survey.id)
+        purge = mock.AsyncMock(side_effect=RuntimeError("purge failed"))
+        with mock.patch.object(deletion_services, "purge_deletion_job_batch", purge):
+            with pytest.raises(RuntimeError):
+                await build_deletion_worker(session_maker=session_maker).run_job()
+        job = await get_job(session=session, job=job)
+        assert job.status == "pending"
+        assert job.attempts == 1
+        assert job.last_error
+        assert job.next_attempt_at > datetime.now()
+        assert not await build_deletion_worker(session_maker=session_maker).run_job()
@@ -0,0 +1,133 @@
+import asyncio
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from unittest import mock
+
+import aiosmtplib
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.emails import EmailOutboxWorker, SMTPPool, compile_templates, send_email, template_environment
+from app.core.settings import get_settings
+from app.models import EmailOutbox
+from app.services import email as email_services
+
+settings = get_settings()
+
+
+async def enqueue_test_email(session: AsyncSession) -> EmailOutbox:
+    return await send_email(
+        session=session,
+        email_to=settings.EMAIL_TEST_USER,
+        subject="Test email",
+        template_name="test_email.html",
+        environment={"project_name": settings.PROJECT_NAME, "email": settings.EMAIL_TEST_USER},
+    )
+
+
+def build_worker(session_maker: sessionmaker, send: mock.AsyncMock, pool_size: int = 4) -> EmailOutboxWorker:
+    pool = mock.Mock(size=pool_size, send_timeout=1)
+    pool.send = send
+    return EmailOutboxWorker(session_maker=session_maker, pool=pool, batch_size=10, poll_interval=1)
+
+
+async def get_email(session: AsyncSession, email: EmailOutbox) -> EmailOutbox:
+    result = await session.execute(
+        select(EmailOutbox).where(EmailOutbox.id == email.id).execution_options(populate_existing=True)
+    )
+    return result.scalar_one()
+
+
+class TestTemplateEnvironment:
+    def test_templates_are_compiled_once(self):
+        compile_templates()
+        template = template_environment.get_template("new_account.html")
+        assert template_environment.get_template("new_account.html") is template
+
+
+class TestSendEmail:
+    async def test_is_enqueued(self, session: AsyncSession):
+        email = await enqueue_test_email(session=session)
+        email = await get_email(session=session, email=email)
+        assert email.status == "pending"
+        assert email.attempts == 0
+        assert email.email_to == settings.EMAIL_TEST_USER
+
+
+class TestEmailOutboxWorker:
+    async def test_delivered(self, session: AsyncSession, session_maker: sessionmaker):
+        email = await enqueue_test_email(session=session)
+        send = mock.AsyncMock()
+        delivered = await build_worker(session_maker=session_maker, send=send).deliver_batch()
+        email = await get_email(session=session, email=email)
+        assert delivered == 1
+        assert send.await_count == 1
+        assert email.status == "sent"
+        assert email.sent_at
+        assert email.body is None
+
+    async def test_retry_is_scheduled(self, session: AsyncSession, session_maker: sessionmaker):
+        email = await enqueue_test_email(session=session)
+        send = mock.AsyncMock(side_effect=aiosmtplib.SMTPServerDisconnected("disconnected"))
+        await build_worker(session_maker=session_maker, send=send).deliver_batch()
+        email = await get_email(session=session, email=email)
+        assert email.status == "pending"
+        assert email.attempts == 1
+        assert email.body
+        assert email.last_error
+        assert email.next_attempt_at > datetime.now()
+
+    async def test_failed_after_last_attempt(self, session: AsyncSession, session_maker: sessionmaker):
+        email = await enqueue_test_email(session=session)
+        await session.execute(
+            update(EmailOutbox).where(EmailOutbox.id == email.id).values(attempts=settings.EMAIL_MAX_ATTEMPTS - 1)
+        )
+        await session.commit()
+        send = mock.AsyncMock(side_effect=aiosmtplib.SMTPServerDisconnected("disconnected"))
+        await build_worker(session_maker=session_maker, send=send).deliver_batch()
+        email = await get_email(session=session, email=email)
+        assert email.status == "failed"
+        assert email.body is None
+
+    async def test_not_due_email_is_skipped(self, session: AsyncSession, session_maker: sessionmaker):
+        await enqueue_test_email(session=session)
+        send = mock.AsyncMock(side_effect=aiosmtplib.SMTPServerDisconnected("disconnected"))
+        worker = build_worker(session_maker=session_maker, send=send)
+        await worker.deliver_batch()
+        assert await worker.deliver_batch() == 0
+        assert send.await_count == 1
+
+    async def test_lease_covers_batch_larger_than_pool(self, session: AsyncSession, session_maker: sessionmaker):
+        for _ in range(3):
+            await enqueue_test_email(session=session)
+        leases = list()
+
+        async def send(message: EmailMessage) -> None:
+            async with session_maker() as other_session:
+                leases.append(await other_session.scalar(select(func.min(EmailOutbox.next_attempt_at))))
+
+        claimed_at = datetime.now()
+        worker = build_worker(session_maker=session_maker, send=mock.AsyncMock(side_effect=send), pool_size=2)
+        assert await worker.deliver_batch() == 3
+        # a batch of 10 takes 5 rounds of 1 second sends through 2 connections
+        assert worker.lease_seconds > 5
+        assert all(lease >= claimed_at + timedelta(seconds=5) for lease in leases)
+
+
+class TestSMTPPool:
+    async def test_send_is_cut_after_send_timeout(self):
+        async def send(message: EmailMessage) -> None:
+            await asyncio.sleep(1)
+
+        pool = SMTPPool(size=1, send_timeout=0.01)
+        with mock.patch.object(pool, "_send", side_effect=send):
+            with pytest.raises(asyncio.TimeoutError):
+                await pool.send(EmailMessage())
+
+
+@pytest.mark.parametrize("attempts", [1, 2, 100])
+def test_retry_delay(attempts: int):
+    delay = email_services.get_retry_delay(attempts)
+    assert settings.EMAIL_RETRY_BASE_DELAY <= delay <= settings.EMAIL_RETRY_MAX_DELAY
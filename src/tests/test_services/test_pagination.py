@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import List
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from fastapi_pagination import Params
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Survey, User
+from app.schemas.pagination import CursorParams
+from app.services import pagination as pagination_services
+from app.services import survey as survey_services
+from app.services import user as user_services
+
+
+class TestCursor:
+    async def test_encode_decode(self):
+        values = ["name", datetime.now(), uuid4()]
+        cursor = pagination_services.encode_cursor(values)
+        assert pagination_services.decode_cursor(cursor=cursor, ordering=survey_services.SURVEY_ORDERING) == values
+
+    async def test_invalid_cursor(self):
+        with pytest.raises(HTTPException) as exception_info:
+            pagination_services.decode_cursor(cursor="cursor", ordering=survey_services.SURVEY_ORDERING)
+        assert exception_info.value.status_code == 400
+
+    async def test_cursor_for_another_ordering(self):
+        cursor = pagination_services.encode_cursor([str(uuid4())])
+        with pytest.raises(HTTPException) as exception_info:
+            pagination_services.decode_cursor(cursor=cursor, ordering=survey_services.SURVEY_ORDERING)
+        assert exception_info.value.status_code == 400
+
+
+class TestPaginateByKeyset:
+    @pytest.mark.parametrize("factory_surveys", [7], indirect=True)
+    @pytest.mark.parametrize("columns", [(Survey,), (Survey.id, Survey.user_id), survey_services.SURVEY_LIST_COLUMNS])
+    async def test_walk_all_pages(self, session: AsyncSession, factory_surveys: List[Survey], columns: tuple):
+        statement = select(*columns).order_by(*survey_services.SURVEY_ORDERING)
+        result = await session.execute(select(Survey.id).order_by(*survey_services.SURVEY_ORDERING))
+        expected_ids = result.scalars().all()
+        ids = list()
+        params = CursorParams(size=3)
+        while True:
+            page = await pagination_services.paginate_by_keyset(
+                session=session,
+                statement=statement,
+                ordering=survey_services.SURVEY_ORDERING,
+                params=params,
+            )
+            assert len(page.items) <= 3
+            ids.extend(survey.id for survey in page.items)
+            if not page.next_cursor:
+                break
+            params = CursorParams(size=3, cursor=page.next_cursor)
+        assert ids == expected_ids
+
+    async def test_for_not_exists(self, session: AsyncSession):
+        page = await pagination_services.paginate_by_keyset(
+            session=session,
+            statement=select(Survey),
+            ordering=survey_services.SURVEY_ORDERING,
+            params=CursorParams(),
+        )
+        assert not page.items
+        assert page.next_cursor is None
+
+
+class TestPaginateByOffset:
+    @pytest.mark.parametrize("factory_surveys", [7], indirect=True)
+    async def test_second_page(self, session: AsyncSession, factory_surveys: List[Survey]):
+        statement = select(Survey).order_by(*survey_services.SURVEY_ORDERING)
+        result = await session.execute(statement)
+        expected_ids = [survey.id for survey in result.scalars().all()]
+        page = await pagination_services.paginate_by_offset(
+            session=session,
+            statement=statement,
+            params=Params(page=2, size=3),
+        )
+        assert page.total == 7
+        assert [survey.id for survey in page.items] == expected_ids[3:6]
+
+
+class TestGetUsersPage:
+    @pytest.mark.parametrize("factory_users", [5], indirect=True)
+    async def test_for_exists(self, session: AsyncSession, factory_users: List[User]):
+        page = await user_services.get_users_page(session=session, params=CursorParams(size=2))
+        assert len(page.items) == 2
+        assert page.next_cursor
+        assert page.items[0].id < page.items[1].id
@@ -0,0 +1,195 @@
+import asyncio
+from typing import List
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app import rebuild_results
+from app.models import Answer, User, Survey
+from app.schemas import survey as schemas
+from app.services import answer as answer_services
+from app.services import result as result_services
+from tests.utils import fold_survey_results
+
+
+async def create_answer(session: AsyncSession, survey: Survey, user: User, text: str) -> Answer:
+    attrs = [schemas.AnswerAttribute(text=text, survey_attr_id=survey_attr.id) for survey_attr in survey.attrs]
+    return await answer_services.CreateAnswer(
+        session=session,
+        answer=schemas.BaseAnswer(available=True, attrs=attrs),
+        user_id=user.id,
+        survey_id=survey.id,
+    ).execute()
+
+
+class TestGetSurveyResults:
+    @pytest.mark.parametrize("factory_users", [2], indirect=True)
+    async def test_counts_answers(
+            self,
+            session: AsyncSession,
+            session_maker: sessionmaker,
+            admin_user: User,
+            factory_survey: Survey,
+            factory_users: List[User],
+    ):
+        await create_answer(session=session, survey=factory_survey, user=factory_users[0], text="yes")
+        await create_answer(session=session, survey=factory_survey, user=factory_users[1], text="yes")
+        await create_answer(session=session, survey=factory_survey, user=admin_user, text="no")
+        await fold_survey_results(session_maker=session_maker)
+        results = await result_services.get_survey_results(
+            session=session,
+            survey_id=factory_survey.id,
+            user=admin_user,
+            top=10,
+        )
+        assert results.answers_count == 3
+        assert len(results.attrs) == len(factory_survey.attrs)
+        for attr in results.attrs:
+            assert attr.responses == 3
+            assert attr.answers == [
+                schemas.AnswerTextCount(text="yes", count=2),
+                schemas.AnswerTextCount(text="no", count=1),
+            ]
+
+    @pytest.mark.parametrize("factory_users", [2], indirect=True)
+    async def test_top(
+            self,
+            session: AsyncSession,
+            session_maker: sessionmaker,
+            admin_user: User,
+            factory_survey: Survey,
+            factory_users: List[User],
+    ):
+        await create_answer(session=session, survey=factory_survey, user=factory_users[0], text="yes")
+        await create_answer(session=session, survey=factory_survey, user=factory_users[1], text="yes")
+        await create_answer(session=session, survey=factory_survey, user=admin_user, text="no")
+        await fold_survey_results(session_maker=session_maker)
+        results = await result_services.get_survey_results(
+            session=session,
+            survey_id=factory_survey.id,
+            user=admin_user,
+            top=1,
+        )
+        for attr in results.attrs:
+            assert attr.responses == 3
+            assert attr.answers == [schemas.AnswerTextCount(text="yes", count=2)]
+
+    async def test_deleted_answer_is_subtracted(
+            self,
+            session: AsyncSession,
+            session_maker: sessionmaker,
+            admin_user: User,
+            factory_survey: Survey,
+    ):
+        answer = await create_answer(session=session, survey=factory_survey, user=admin_user, text="yes")
+        await fold_survey_results(session_maker=session_maker)
+        await answer_services.delete_answer(session=session, user=admin_user, answer_id=answer.id)
+        await fold_survey_results(session_maker=session_maker)
+        results = await result_services.get_survey_results(
+            session=session,
+            survey_id=factory_survey.id,
+            user=admin_user,
+            top=10,
+        )
+        assert results.answers_count == 0
+        assert all([attr.responses == 0 and not attr.answers for attr in results.attrs])
+
+    @pytest.mark.parametrize("factory_users", [1], indirect=True)
+    async def test_rebuild_matches_incremental(
+            self,
+            session: AsyncSession,
+            session_maker: sessionmaker,
+            admin_user: User,
+            factory_survey: Survey,
+            factory_users: List[User],
+    ):
+        await create_answer(session=session, survey=factory_survey, user=factory_users[0], text="yes")
+        await create_answer(session=session, survey=factory_survey, user=admin_user, text="no")
+        await fold_survey_results(session_maker=session_maker)
+        expected = await result_services.get_survey_results(
+            session=session,
+            survey_id=factory_survey.id,
+            user=admin_user,
+            top=10,
+        )
+        await result_services.rebuild_survey_results(session=session, survey_id=factory_survey.id)
+        results = await result_services.get_survey_results(
+            session=session,
+            survey_id=factory_survey.id,
+            user=admin_user,
+            top=10,
+        )
+        assert results == expected
+
+    @pytest.mark.parametrize("factory_users", [1], indirect=True)
+    async def test_rebuild_waits_for_answer_writers(
+            self,
+            session: AsyncSession,
+            session_maker: sessionmaker,
+            admin_user: User,
+            factory_survey: Survey,
+            factory_users: List[User],
+    ):
+        await create_answer(session=session, survey=factory_survey, user=factory_users[0], text="yes")
+        async with session_maker() as writer_session:
+            await result_services.lock_survey_results(session=writer_session, survey_id=factory_survey.id)
+            rebuild = asyncio.create_task(
+                rebuild_results.main(survey_ids=[factory_survey.id], session_maker=session_maker)
+            )
+            await asyncio.sleep(0.5)
+            assert not rebuild.done()
+            await writer_session.rollback()
+        await rebuild
+        # the rebuild counted the answer and dropped its deltas, folding them mustn't count it twice
+        await fold_survey_results(session_maker=session_maker)
+        results = await result_services.get_survey_results(
+            session=session,
+            survey_id=factory_survey.id,
+            user=admin_user,
+            top=10,
+        )
+        assert results.answers_count == 1
+        assert all(attr.answers == [schemas.AnswerTextCount(text="yes", count=1)] for attr in results.attrs)
+
+    @pytest.mark.parametrize("factory_users", [2], indirect=True)
+    async def test_texts_past_limit_are_counted_as_others(
+            self,
+            session: AsyncSession,
+            session_maker: sessionmaker,
+            admin_user: User,
+            factory_survey: Survey,
+            factory_users: List[User],
+    ):
+        await create_answer(session=session, survey=factory_survey, user=factory_users[0], text="yes")
+        await create_answer(session=session, survey=factory_survey, user=factory_users[1], text="yes")
+        await fold_survey_results(session_maker=session_maker, max_texts=1)
+        await create_answer(session=session, survey=factory_survey, user=admin_user, text="no")
+        await fold_survey_results(session_maker=session_maker, max_texts=1)
+        results = await result_services.get_survey_results(
+            session=session,
+            survey_id=factory_survey.id,
+            user=admin_user,
+            top=10,
+        )
+        for attr in results.attrs:
+            assert attr.responses == 3
+            assert attr.others == 1
+            assert attr.answers == [schemas.AnswerTextCount(text="yes", count=2)]
+
+    async def test_403_not_owner(self, session: AsyncSession, factory_survey: Survey):
+        with pytest.raises(HTTPException) as exception_info:
+            await result_services.get_survey_results(
+                session=session,
+                survey_id=factory_survey.id,
+                user=User(id=uuid4(), is_superuser=False),
+                top=10,
+            )
+        assert exception_info.value.status_code == 403
+
+    async def test_404(self, session: AsyncSession, admin_user: User):
+        with pytest.raises(HTTPException) as exception_info:
+            await result_services.get_survey_results(session=session, survey_id=uuid4(), user=admin_user, top=10)
+        assert exception_info.value.status_code == 404
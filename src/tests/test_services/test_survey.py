@@ -5,14 +5,17 @@ from typing import List
 import pytest
 from faker import Faker
 from fastapi import HTTPException
-from sqlalchemy import select
+from fastapi_pagination import Params
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 
 from app.models import User, SurveyAttribute, Survey
 from app.schemas.survey import SurveyCreate, SurveyUpdate, SurveyAttributeUpdate, SurveyFilter
 from app.services import base as base_services
 from app.services import survey as survey_services
 from app.services.filtering.survey import filter_surveys
+from tests.utils import build_deletion_worker
 
 fake = Faker()
 
@@ -31,6 +34,20 @@ class TestCreateSurvey:
         created_survey = await survey_services.create_survey(session=session, survey=survey, user_id=admin_user.id)
         assert survey == SurveyCreate(**created_survey.as_dict())
 
+    @pytest.mark.parametrize("build_survey_attrs", [3], indirect=True)
+    async def test_attrs_are_stored(
+            self,
+            admin_user: User,
+            session: AsyncSession,
+            build_surveys: Survey,
+            build_survey_attrs: List[SurveyAttribute]
+    ):
+        attrs = list(attr.as_dict() for attr in build_survey_attrs)
+        survey = SurveyCreate(**build_surveys.as_dict(), attrs=attrs)
+        created_survey = await survey_services.create_survey(session=session, survey=survey, user_id=admin_user.id)
+        result = await session.execute(select(SurveyAttribute).where(SurveyAttribute.survey_id == created_survey.id))
+        assert {attr.id for attr in result.scalars().all()} == {attr.id for attr in created_survey.attrs}
+
 
 class TestGetSurvey:
     @pytest.mark.parametrize("factory_surveys", [2], indirect=True)
@@ -67,12 +84,19 @@ class TestGetSurveys:
     @pytest.mark.parametrize("factory_surveys", [5], indirect=True)
     async def test_for_exists(self, session: AsyncSession, factory_surveys: List[Survey]):
         surveys = await survey_services.get_surveys(session=session)
-        assert all(survey.available is True for survey in surveys)
+        assert {survey.id for survey in surveys} == {survey.id for survey in factory_surveys if survey.available}
 
     async def test_for_not_exists(self, session: AsyncSession):
         surveys = await survey_services.get_surveys(session=session)
         assert not surveys
 
+    @pytest.mark.parametrize("factory_surveys", [5], indirect=True)
+    async def test_offset_page(self, session: AsyncSession, factory_surveys: List[Survey]):
+        surveys = await survey_services.get_surveys(session=session)
+        page = await survey_services.get_surveys_offset_page(session=session, params=Params(page=1, size=2))
+        assert page.total == len(surveys)
+        assert [survey.id for survey in page.items] == [survey.id for survey in surveys[:2]]
+
 
 class TestUpdateSurvey:
     async def test_for_exists(self, session: AsyncSession, admin_user: User, factory_survey: Survey):
@@ -86,6 +110,26 @@ class TestUpdateSurvey:
         )
         assert survey.name == name
 
+    async def test_version_is_bumped(self, session: AsyncSession, admin_user: User, factory_survey: Survey):
+        validators = await survey_services.get_survey_validators(session=session, id_=factory_survey.id)
+        survey = await survey_services.update_survey(
+            session=session,
+            user=admin_user,
+            id_=factory_survey.id,
+            to_update=SurveyUpdate(name=fake.name()),
+        )
+        assert survey.version == validators.version + 1
+        assert survey.updated_at > validators.updated_at
+
+    async def test_null_name_is_ignored(self, session: AsyncSession, admin_user: User, factory_survey: Survey):
+        survey = await survey_services.update_survey(
+            session=session,
+            user=admin_user,
+            id_=factory_survey.id,
+            to_update=SurveyUpdate(name=None),
+        )
+        assert survey.name == factory_survey.name
+
     async def test_for_not_exists(self, session: AsyncSession, admin_user: User):
         to_update = SurveyUpdate(name="another name")
         with pytest.raises(HTTPException) as exception:
@@ -116,6 +160,28 @@ class TestUpdateSurveyAttribute:
             )
             assert exception_info.value.status_code == 404
 
+    async def test_for_not_owner(
+            self,
+            session: AsyncSession,
+            admin_user: User,
+            factory_survey: Survey,
+            user_and_its_pass: dict,
+    ):
+        with pytest.raises(HTTPException) as exception_info:
+            await survey_services.update_survey_attribute(
+                session=session,
+                user=user_and_its_pass["user"],
+                id_=factory_survey.attrs[0].id,
+                to_update=SurveyAttributeUpdate(question="text"),
+            )
+        assert exception_info.value.status_code == 403
+        survey_attr = await survey_services.get_survey_attribute(
+            session=session,
+            id_=factory_survey.attrs[0].id,
+            user=admin_user,
+        )
+        assert survey_attr.question == factory_survey.attrs[0].question
+
 
 class TestGetCurrentUserSurveys:
     @pytest.mark.parametrize("factory_surveys", [5], indirect=True)
@@ -127,13 +193,15 @@ class TestGetCurrentUserSurveys:
         surveys = await survey_services.get_current_user_surveys(session=session, user=admin_user)
         assert not surveys
 
-    async def test_if_available_is_true(self, session: AsyncSession, admin_user: User):
+    @pytest.mark.parametrize("factory_surveys", [5], indirect=True)
+    async def test_if_available_is_true(self, session: AsyncSession, admin_user: User, factory_surveys: List[Survey]):
         surveys = await survey_services.get_current_user_surveys(session=session, user=admin_user, available=True)
-        assert all(survey.available is True for survey in surveys)
+        assert {survey.id for survey in surveys} == {survey.id for survey in factory_surveys if survey.available}
 
-    async def test_if_available_is_false(self, session: AsyncSession, admin_user: User):
+    @pytest.mark.parametrize("factory_surveys", [5], indirect=True)
+    async def test_if_available_is_false(self, session: AsyncSession, admin_user: User, factory_surveys: List[Survey]):
         surveys = await survey_services.get_current_user_surveys(session=session, user=admin_user, available=False)
-        assert all(survey.available is False for survey in surveys)
+        assert {survey.id for survey in surveys} == {survey.id for survey in factory_surveys if not survey.available}
 
 
 class TestGetUserSurveys:
@@ -180,29 +248,77 @@ class TestGetSurveysWithFiltering:
         surveys = await filter_surveys(session=session, filter=SurveyFilter(name="name"))
         assert not surveys
 
+    @pytest.mark.parametrize("factory_surveys", [5], indirect=True)
+    async def test_searching_by_word_prefix(self, session: AsyncSession, factory_surveys: List[Survey]):
+        last_word = factory_surveys[0].name.split()[-1]
+        surveys = await filter_surveys(session=session, filter=SurveyFilter(name=last_word[:3]))
+        assert factory_surveys[0].id in [survey.id for survey in surveys]
+        assert all([last_word[:3] in survey.name for survey in surveys])
+
+    @pytest.mark.parametrize("factory_surveys", [2], indirect=True)
+    async def test_words_are_matched_in_their_column(self, session: AsyncSession, factory_surveys: List[Survey]):
+        await session.execute(
+            update(Survey).where(Survey.id == factory_surveys[0].id).values(description="zebra crossing")
+        )
+        await session.execute(update(Survey).where(Survey.id == factory_surveys[1].id).values(name="Zebra survey"))
+        await session.commit()
+        surveys = await filter_surveys(session=session, filter=SurveyFilter(description="zebra"))
+        assert [survey.id for survey in surveys] == [factory_surveys[0].id]
+        surveys = await filter_surveys(session=session, filter=SurveyFilter(name="Zebra"))
+        assert [survey.id for survey in surveys] == [factory_surveys[1].id]
+
+    @pytest.mark.parametrize("factory_surveys", [2], indirect=True)
+    async def test_searching_inside_words(self, session: AsyncSession, factory_surveys: List[Survey]):
+        await session.execute(update(Survey).where(Survey.id == factory_surveys[0].id).values(name="Daily question"))
+        await session.commit()
+        surveys = await filter_surveys(session=session, filter=SurveyFilter(name="ail"))
+        assert factory_surveys[0].id in [survey.id for survey in surveys]
+        assert all(["ail" in survey.name for survey in surveys])
+
+    @pytest.mark.parametrize("factory_surveys", [2], indirect=True)
+    async def test_searching_words_in_any_case(self, session: AsyncSession, factory_surveys: List[Survey]):
+        await session.execute(update(Survey).where(Survey.id == factory_surveys[0].id).values(name="Daily question"))
+        await session.commit()
+        surveys = await filter_surveys(session=session, filter=SurveyFilter(name="daily QUEST"))
+        assert [survey.id for survey in surveys] == [factory_surveys[0].id]
+
 
 class TestDeleteSurvey:
     @pytest.mark.parametrize("factory_surveys", [5], indirect=True)
     async def test_success(self, session: AsyncSession, admin_user: User, factory_surveys: List[Survey]):
-        deleted_survey = await survey_services.delete_survey(
+        job = await survey_services.delete_survey(
             session=session,
             user=admin_user,
             id_=factory_surveys[2].id
         )
-        assert deleted_survey == factory_surveys[2]
+        assert job.target == "survey"
+        assert job.target_id == factory_surveys[2].id
         assert not await base_services.is_object_exists(
             session=session,
             where_statement=select(Survey).where(Survey.id == factory_surveys[2].id)
         )
 
     @pytest.mark.parametrize("factory_surveys", [5], indirect=True)
-    async def test_cascade_deletion(self, session: AsyncSession, admin_user: User, factory_surveys: List[Survey]):
+    async def test_cascade_deletion(
+            self,
+            session: AsyncSession,
+            session_maker: sessionmaker,
+            admin_user: User,
+            factory_surveys: List[Survey],
+    ):
         await survey_services.delete_survey(session=session, user=admin_user, id_=factory_surveys[2].id)
+        await build_deletion_worker(session_maker=session_maker).run_job()
         assert not await base_services.is_object_exists(
             session=session,
             where_statement=select(SurveyAttribute).where(SurveyAttribute.id == factory_surveys[2].attrs[0].id)
         )
 
+    async def test_version_is_bumped(self, session: AsyncSession, admin_user: User, factory_survey: Survey):
+        validators = await survey_services.get_survey_validators(session=session, id_=factory_survey.id)
+        await survey_services.delete_survey_attribute(session=session, user=admin_user, id_=factory_survey.attrs[0].id)
+        assert (await survey_services.get_survey_validators(session=session, id_=factory_survey.id)).version == \
+            validators.version + 1
+
     async def test_404(self, session: AsyncSession, admin_user: User):
         with pytest.raises(HTTPException) as exception:
             await survey_services.delete_survey(session=session, user=admin_user, id_=uuid.uuid4())
@@ -245,7 +361,7 @@ class TestDeleteSurveyAttribute:
                 user=user_and_its_pass["user"],
                 id_=random.choice(random.choice(factory_surveys).attrs).id
                 )
-            assert exception.value.status_code == 404
+        assert exception.value.status_code == 404
 
 
 class TestGetSurveyAttribute:
@@ -347,3 +463,22 @@ class TestGetSurveyAttribute:
                 id_=expected_attr.id
             )
             assert exception.value.status_code == 404
+
+
+class TestSurveyCache:
+    async def test_survey_is_invalidated_on_attr_update(
+            self,
+            session: AsyncSession,
+            admin_user: User,
+            factory_survey: Survey,
+    ):
+        survey = await survey_services.get_survey(session=session, id_=factory_survey.id)
+        await survey_services.cache_survey(survey=survey)
+        assert await survey_services.get_cached_survey(id_=factory_survey.id)
+        await survey_services.update_survey_attribute(
+            session=session,
+            user=admin_user,
+            id_=factory_survey.attrs[0].id,
+            to_update=SurveyAttributeUpdate(question=fake.text()),
+        )
+        assert await survey_services.get_cached_survey(id_=factory_survey.id) is None
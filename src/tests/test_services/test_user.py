@@ -1,5 +1,4 @@
 from typing import List
-from unittest import mock
 from uuid import uuid4
 
 import pytest
@@ -7,8 +6,10 @@ from fastapi import HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.security import verify_password
 from app.core.settings import get_settings
-from app.models import User
+from app.models import User, Verification
+from app.schemas.auth import PasswordChange
 from app.schemas.user import UserRegistrationIn, UserFilter
 from app.services import base as base_services
 from app.services import user as user_services
@@ -18,22 +19,44 @@ settings = get_settings()
 
 
 class TestCreateUser:
-    async def test_create_user(self, session: AsyncSession, admin_user_data: dict, task: mock.Mock):
+    async def test_create_user(self, session: AsyncSession, admin_user_data: dict):
         admin_user_data["password_repeat"] = settings.ADMIN_FIXTURE_PASSWORD
         user_to_insert = UserRegistrationIn(**admin_user_data)
         user = await user_services.create_user(
             session=session,
             new_user=user_to_insert,
-            task=task,
         )
         assert user
 
+    async def test_verification_is_created(self, session: AsyncSession, admin_user_data: dict):
+        admin_user_data["password_repeat"] = settings.ADMIN_FIXTURE_PASSWORD
+        user = await user_services.create_user(session=session, new_user=UserRegistrationIn(**admin_user_data))
+        assert not user.is_active
+        assert await base_services.is_object_exists(
+            session=session,
+            where_statement=select(Verification).where(Verification.user_id == user.id),
+        )
+
+    async def test_verification_isnt_created_when_stateless(
+            self,
+            session: AsyncSession,
+            admin_user_data: dict,
+            monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setattr(settings, "EMAIL_VERIFICATION_STATELESS", True)
+        admin_user_data["password_repeat"] = settings.ADMIN_FIXTURE_PASSWORD
+        user = await user_services.create_user(session=session, new_user=UserRegistrationIn(**admin_user_data))
+        assert not user.is_active
+        assert not await base_services.is_object_exists(
+            session=session,
+            where_statement=select(Verification).where(Verification.user_id == user.id),
+        )
+
     async def test_create_user_with_exists_username(
             self,
             session: AsyncSession,
             admin_user: User,
-            admin_user_data: dict,
-            task: mock.Mock
+            admin_user_data: dict
     ):
         admin_user_data["password_repeat"] = settings.ADMIN_FIXTURE_PASSWORD
         admin_user_data["email"] = "someanotheremail@gmail.com"
@@ -42,7 +65,6 @@ class TestCreateUser:
             await user_services.create_user(
                 session=session,
                 new_user=user_to_insert,
-                task=task,
             )
         assert exception_info.value.status_code == 409
 
@@ -50,8 +72,7 @@ class TestCreateUser:
             self,
             session: AsyncSession,
             admin_user: User,
-            admin_user_data: dict,
-            task: mock.Mock
+            admin_user_data: dict
     ):
         admin_user_data["password_repeat"] = settings.ADMIN_FIXTURE_PASSWORD
         admin_user_data["username"] = "username"
@@ -60,11 +81,51 @@ class TestCreateUser:
             await user_services.create_user(
                 session=session,
                 new_user=user_to_insert,
-                task=task,
             )
         assert exception_info.value.status_code == 409
 
 
+class TestGetCachedUser:
+    async def test_second_call_is_hit(self, session: AsyncSession, admin_user: User):
+        hits = user_services.user_cache.hits
+        await user_services.get_cached_user(session=session, user_id=admin_user.id)
+        user = await user_services.get_cached_user(session=session, user_id=admin_user.id)
+        assert user_services.user_cache.hits == hits + 1
+        assert user.password is None
+        user.password = admin_user.password
+        assert user == admin_user
+
+    async def test_password_is_changed_for_cached_user(self, session: AsyncSession, admin_user: User):
+        await user_services.get_cached_user(session=session, user_id=admin_user.id)
+        user = await user_services.get_cached_user(session=session, user_id=admin_user.id)
+        await user_services.change_user_password(
+            session=session,
+            password_change=PasswordChange(
+                current_password=settings.ADMIN_FIXTURE_PASSWORD,
+                new_password="new_password",
+                new_password_repeated="new_password",
+            ),
+            user=user,
+        )
+        password = await session.scalar(select(User.password).where(User.id == admin_user.id))
+        assert verify_password(plain_password="new_password", hashed_password=password)
+
+    async def test_update_invalidates(self, session: AsyncSession, admin_user: User):
+        await user_services.get_cached_user(session=session, user_id=admin_user.id)
+        await user_services.update_user(
+            session=session,
+            where_statements=[User.id == admin_user.id],
+            to_update={"first_name": "first_name"},
+        )
+        user = await user_services.get_cached_user(session=session, user_id=admin_user.id)
+        assert user.first_name == "first_name"
+
+    async def test_for_not_exists(self, session: AsyncSession):
+        with pytest.raises(HTTPException) as exception_info:
+            await user_services.get_cached_user(session=session, user_id=uuid4())
+        assert exception_info.value.status_code == 404
+
+
 class TestGetUser:
     async def test_exists_user_search_by_id(self, session: AsyncSession, admin_user: User):
         user = await user_services.get_user(session=session, where_statements=[User.id == admin_user.id])
@@ -147,15 +208,21 @@ class TestGetUsersWithSearching:
         users = await filter_users(session=session, filter=UserFilter(username="user"))
         assert not users
 
+    @pytest.mark.parametrize("factory_users", [5], indirect=True)
+    async def test_closer_match_is_ranked_first(self, session: AsyncSession, factory_users: List[User]):
+        users = await filter_users(session=session, filter=UserFilter(username=factory_users[0].username))
+        assert users[0].id == factory_users[0].id
+
 
 class TestDeleteUser:
     async def test_success(self, session: AsyncSession, user_and_its_pass: dict):
-        user = await user_services.delete_user(
+        job = await user_services.delete_user(
             session=session,
             login=user_and_its_pass["user"].email,
             password=user_and_its_pass["password"]
         )
-        assert user == user_and_its_pass["user"]
+        assert job.target == "user"
+        assert job.target_id == user_and_its_pass["user"].id
         assert not await base_services.is_object_exists(
             session=session,
             where_statement=select(User).where(User.id == user_and_its_pass["user"].id)
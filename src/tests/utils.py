@@ -1,5 +1,9 @@
 from typing import List
 
+from sqlalchemy.orm import sessionmaker
+
+from app.core.deletions import DeletionWorker
+from app.core.results import SurveyResultWorker
 from app.models import Survey
 from tests.factories import AnswerAttributeFactory
 
@@ -11,3 +15,14 @@ async def build_answer_attrs_with_survey_attrs(survey: Survey) -> List[dict]:
         answer_attr.survey_attr_id = str(survey_attr.id)
         attrs.append(answer_attr.as_dict())
     return attrs
+
+
+def build_deletion_worker(session_maker: sessionmaker) -> DeletionWorker:
+    # one row per batch, so every purge takes several batches
+    return DeletionWorker(session_maker=session_maker, batch_size=1, batch_pause=0, poll_interval=1, lease_seconds=60)
+
+
+async def fold_survey_results(session_maker: sessionmaker, max_texts: int = 100) -> None:
+    worker = SurveyResultWorker(session_maker=session_maker, batch_size=1000, poll_interval=1, max_texts=max_texts)
+    while await worker.fold_batch():
+        pass